@@ -0,0 +1,128 @@
+// Sincronización incremental de los editores de Unposer.
+// Calcula un parche (rango + reemplazo) respecto al último texto confirmado por el
+// servidor, de forma que el tráfico por pulsación no crece con el tamaño del documento.
+(function () {
+  const MAX_PENDING = 8;
+  const docs = {};
+  let seq = 0;
+
+  function entry(id) {
+    if (!docs[id]) {
+      docs[id] = { pending: new Map(), latest: "", last: 0 };
+    }
+    return docs[id];
+  }
+
+  function isLowSurrogate(code) {
+    return code >= 0xdc00 && code <= 0xdfff;
+  }
+
+  function isHighSurrogate(code) {
+    return code >= 0xd800 && code <= 0xdbff;
+  }
+
+  // Convierte un índice UTF-16 en un índice de puntos de código (como en Python).
+  function codePointIndex(text, index) {
+    let count = 0;
+    for (let i = 0; i < index; i++) {
+      if (!(isLowSurrogate(text.charCodeAt(i)) && i > 0 && isHighSurrogate(text.charCodeAt(i - 1)))) {
+        count++;
+      }
+    }
+    return count;
+  }
+
+  // Guarda el texto de cada parche calculado. diff() se ejecuta en cada pulsación, antes
+  // de que el debounce descarte los eventos, así que al superar MAX_PENDING nunca se
+  // descarta la base confirmada (keep) ni el último texto: se descarta el texto que antes
+  // se sustituyó por otro, que es el que con más probabilidad no llegó a enviarse.
+  function remember(doc, value, keep) {
+    seq += 1;
+    const now = Date.now();
+    doc.latest = value;
+    doc.pending.set(seq, { value: value, at: now, replacedAt: Infinity });
+    if (doc.pending.has(doc.last)) {
+      doc.pending.get(doc.last).replacedAt = now;
+    }
+    doc.last = seq;
+    while (doc.pending.size > MAX_PENDING) {
+      let victim = null;
+      let shortest = Infinity;
+      for (const [key, item] of doc.pending) {
+        const lifetime = item.replacedAt - item.at;
+        if (key !== keep && key !== seq && lifetime < shortest) {
+          victim = key;
+          shortest = lifetime;
+        }
+      }
+      if (victim === null) {
+        break;
+      }
+      doc.pending.delete(victim);
+    }
+    return seq;
+  }
+
+  function fullPatch(value, current) {
+    return { seq: current, base: -1, full: true, start: 0, end: 0, text: value };
+  }
+
+  function diff(id, value, version, ack, fullText, fullVersion) {
+    const doc = entry(id);
+    let base;
+    if (version === fullVersion) {
+      base = fullText;
+    } else if (doc.pending.has(ack)) {
+      base = doc.pending.get(ack).value;
+    }
+    for (const key of Array.from(doc.pending.keys())) {
+      if (key < ack) {
+        doc.pending.delete(key);
+      }
+    }
+    const current = remember(doc, value, ack);
+    if (base === undefined || base === null) {
+      return fullPatch(value, current);
+    }
+
+    const max = Math.min(base.length, value.length);
+    let start = 0;
+    while (start < max && base.charCodeAt(start) === value.charCodeAt(start)) {
+      start++;
+    }
+    if (start > 0 && isHighSurrogate(base.charCodeAt(start - 1))) {
+      start--;
+    }
+    let suffix = 0;
+    while (
+      suffix < max - start &&
+      base.charCodeAt(base.length - 1 - suffix) === value.charCodeAt(value.length - 1 - suffix)
+    ) {
+      suffix++;
+    }
+    if (suffix > 0 && isLowSurrogate(base.charCodeAt(base.length - suffix))) {
+      suffix--;
+    }
+
+    const startCp = codePointIndex(base, start);
+    const replaced = base.slice(start, base.length - suffix);
+    const text = value.slice(start, value.length - suffix);
+    return {
+      seq: current,
+      base: version,
+      full: false,
+      start: startCp,
+      end: startCp + codePointIndex(replaced, replaced.length),
+      text: text,
+      length: codePointIndex(value, value.length),
+    };
+  }
+
+  function full(id) {
+    const doc = entry(id);
+    const current = remember(doc, doc.latest);
+    return fullPatch(doc.latest, current);
+  }
+
+  window.unposerSync = { diff: diff, full: full };
+})();
@@ -0,0 +1,171 @@
+"""
+Suite de benchmarks del conversor sobre el corpus sintético de benchmarks/corpus.py.
+
+Mide parse_docker_compose, generate_unraid_template, extract_ports,
+extract_registry_from_image y la extracción del Docker Compose de un README para
+cada tamaño del corpus. Cada caso se calibra para que una ronda dure al menos
+--min-time segundos y se repite --rounds veces; se guarda la mediana, el mínimo
+y la media por llamada.
+
+Uso:
+    python benchmarks/converter_suite.py [--sizes tiny,small,...] [--output resultados.json]
+    python benchmarks/converter_suite.py --baseline base.json [--threshold 0.10]
+
+Con --baseline se comparan las medianas con las de una ejecución anterior y el
+proceso termina con código 1 si algún caso empeora más que --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Sin logs de depuración (el nivel se fija al importar el conversor)
+os.environ["DEBUG"] = "0"
+
+from benchmarks.corpus import IMAGES, SIZES, build_compose, build_readme  # noqa: E402
+from unposer.utils.converter import UnraidTemplateConverter  # noqa: E402
+from unposer.utils.readme import extract_docker_compose_from_readme  # noqa: E402
+
+APP_FIELDS = {
+    'Icon': 'https://example.com/icon.png',
+    'Overview': 'Plantilla de ejemplo',
+    'Support': 'https://example.com/soporte',
+    'Project': 'https://example.com',
+    'Category': 'Tools',
+}
+
+
+def build_cases(converter: UnraidTemplateConverter, sizes: List[str]) -> List[Tuple[str, Callable[[], object]]]:
+    """Devuelve los casos (nombre, función sin argumentos) a medir."""
+    cases = []
+    for size in sizes:
+        compose_text = build_compose(size)
+        readme_text = build_readme(size)
+        service = converter.parse_docker_compose(compose_text)
+
+        cases.append((f"parse_docker_compose[{size}]", lambda text=compose_text: converter.parse_docker_compose(text)))
+        cases.append((
+            f"generate_unraid_template[{size}]",
+            lambda svc=service: converter.generate_unraid_template(svc, web_port="8000:8000", app_fields=APP_FIELDS, installed_at=0),
+        ))
+        cases.append((f"extract_ports[{size}]", lambda svc=service: converter.extract_ports(svc)))
+        cases.append((
+            f"extract_docker_compose_from_readme[{size}]",
+            lambda text=readme_text: extract_docker_compose_from_readme(text, converter),
+        ))
+
+    cases.append((
+        "extract_registry_from_image[mixed]",
+        lambda: [converter.extract_registry_from_image(image) for image in IMAGES],
+    ))
+    return cases
+
+
+def calibrate(fn: Callable[[], object], min_time: float) -> int:
+    """Número de llamadas necesario para que una ronda dure al menos min_time."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        # Con una décima del tiempo objetivo la estimación ya es fiable
+        if elapsed >= min_time / 10:
+            return max(int(number * min_time / elapsed), 1)
+        number *= 2
+
+
+def measure(fn: Callable[[], object], rounds: int, min_time: float) -> Dict[str, float]:
+    """Mide una función y devuelve las estadísticas por llamada en microsegundos."""
+    number = calibrate(fn, min_time)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "median_us": statistics.median(timings),
+        "min_us": min(timings),
+        "mean_us": statistics.fmean(timings),
+        "stdev_us": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "rounds": rounds,
+        "number": number,
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Imprime la comparación con la referencia y devuelve los casos que empeoran."""
+    regressions = []
+    print(f"\n{'caso':<48} {'referencia':>12} {'actual':>12} {'cambio':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<48} {'-':>12} {result['median_us']:>10.1f}us {'nuevo':>9}")
+            continue
+        change = result['median_us'] / base['median_us'] - 1
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = "  <-- regresión"
+        print(f"{name:<48} {base['median_us']:>10.1f}us {result['median_us']:>10.1f}us {change:>+8.1%}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(SIZES), help="Tamaños del corpus separados por comas")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Duración mínima (s) de cada ronda")
+    parser.add_argument("--filter", default="", help="Solo los casos cuyo nombre contiene este texto")
+    parser.add_argument("--output", help="Fichero JSON donde guardar los resultados")
+    parser.add_argument("--baseline", help="Fichero JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Empeoramiento máximo admitido de la mediana (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    sizes = [size for size in args.sizes.split(",") if size]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"Tamaños desconocidos: {', '.join(unknown)}")
+
+    converter = UnraidTemplateConverter()
+    results = {}
+    for name, fn in build_cases(converter, sizes):
+        if args.filter and args.filter not in name:
+            continue
+        result = measure(fn, args.rounds, args.min_time)
+        results[name] = result
+        print(f"{name:<48} {result['median_us']:>12.1f}us  (mín {result['min_us']:.1f}us, ±{result['stdev_us']:.1f}us, {result['number']}x{result['rounds']})")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mapping_version": converter.mapping_version,
+            "timestamp": int(time.time()),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} casos empeoran más de un {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Corpus sintético de Docker Compose y README para los benchmarks.
+
+Los ficheros se generan de forma determinista a partir de un tamaño con nombre
+(tiny, small, medium, large, huge), de modo que dos ejecuciones del benchmark
+miden exactamente la misma entrada. Los tamaños grandes quedan por debajo de los
+límites por defecto de COMPOSE_MAX_BYTES y COMPOSE_MAX_NODES.
+"""
+from typing import Dict, List
+
+# Número de elementos de cada sección del servicio principal por tamaño
+SIZES: Dict[str, Dict[str, int]] = {
+    "tiny":   {"environment": 0,    "labels": 0,    "volumes": 1,   "ports": 1,   "devices": 0,   "services": 1,  "readme_sections": 2},
+    "small":  {"environment": 10,   "labels": 5,    "volumes": 3,   "ports": 2,   "devices": 1,   "services": 1,  "readme_sections": 10},
+    "medium": {"environment": 50,   "labels": 40,   "volumes": 15,  "ports": 10,  "devices": 5,   "services": 4,  "readme_sections": 50},
+    "large":  {"environment": 250,  "labels": 200,  "volumes": 60,  "ports": 50,  "devices": 20,  "services": 15, "readme_sections": 250},
+    "huge":   {"environment": 1500, "labels": 1000, "volumes": 300, "ports": 250, "devices": 100, "services": 50, "readme_sections": 1500},
+}
+
+IMAGES: List[str] = [
+    "nginx",
+    "nginx:1.27-alpine",
+    "linuxserver/sonarr:latest",
+    "lscr.io/linuxserver/sonarr:latest",
+    "ghcr.io/home-assistant/home-assistant:stable",
+    "quay.io/prometheus/node-exporter:v1.8.1",
+    "registry.gitlab.com/grupo/proyecto/app:1.0",
+    "mcr.microsoft.com/dotnet/aspnet:8.0",
+    "public.ecr.aws/docker/library/redis:7",
+    "localhost:5000/mi-imagen:dev",
+]
+
+
+def _main_service(counts: Dict[str, int]) -> List[str]:
+    lines = [
+        "  app:",
+        "    image: lscr.io/linuxserver/sonarr:latest",
+        "    container_name: sonarr",
+        "    restart: unless-stopped",
+        "    network_mode: bridge",
+    ]
+    if counts["environment"]:
+        lines.append("    environment:")
+        lines.extend(f"      - VARIABLE_{i}=valor_{i}" for i in range(counts["environment"]))
+    if counts["labels"]:
+        lines.append("    labels:")
+        lines.extend(f"      - com.example.etiqueta{i}=valor de la etiqueta {i}" for i in range(counts["labels"]))
+    if counts["volumes"]:
+        lines.append("    volumes:")
+        lines.extend(f"      - /mnt/user/appdata/sonarr/datos{i}:/datos{i}" for i in range(counts["volumes"]))
+    if counts["ports"]:
+        lines.append("    ports:")
+        lines.extend(
+            f"      - {8000 + i}:{8000 + i}/udp" if i % 3 == 2 else f"      - {8000 + i}:{8000 + i}"
+            for i in range(counts["ports"])
+        )
+    if counts["devices"]:
+        lines.append("    devices:")
+        lines.extend(f"      - /dev/dri/renderD{128 + i}:/dev/dri/renderD{128 + i}" for i in range(counts["devices"]))
+    return lines
+
+
+def _extra_service(index: int) -> List[str]:
+    return [
+        f"  servicio{index}:",
+        f"    image: {IMAGES[index % len(IMAGES)]}",
+        "    restart: unless-stopped",
+        "    environment:",
+        f"      - SERVICIO={index}",
+        "    volumes:",
+        f"      - /mnt/user/appdata/servicio{index}:/config",
+    ]
+
+
+def build_compose(size: str) -> str:
+    """Genera el texto de un Docker Compose del tamaño indicado."""
+    counts = SIZES[size]
+    lines = ["services:"]
+    lines.extend(_main_service(counts))
+    for index in range(1, counts["services"]):
+        lines.extend(_extra_service(index))
+    return "\n".join(lines) + "\n"
+
+
+def build_readme(size: str) -> str:
+    """
+    Genera un README largo con el Docker Compose al final, precedido de secciones
+    de texto y bloques de código que no son un compose (shell, JSON).
+    """
+    counts = SIZES[size]
+    parts = ["# Proyecto de ejemplo", "", "Descripción del proyecto.", ""]
+    for i in range(counts["readme_sections"]):
+        parts.extend([
+            f"## Sección {i}",
+            "",
+            f"Texto de la sección {i} con una explicación larga sobre la configuración del contenedor, "
+            "las variables de entorno disponibles y los volúmenes recomendados.",
+            "",
+        ])
+        if i % 5 == 0:
+            parts.extend(["```bash", f"docker run -d --name ejemplo{i} -p {8000 + i}:80 nginx", "```", ""])
+        if i % 7 == 0:
+            parts.extend(["```json", f'{{"clave": "valor {i}", "lista": [1, 2, 3]}}', "```", ""])
+    parts.extend(["## Docker Compose", "", "```yaml", build_compose(size).rstrip(), "```", ""])
+    return "\n".join(parts)
@@ -0,0 +1,142 @@
+"""
+Benchmark de la búsqueda del Docker Compose en GitHub contra el servidor local de
+benchmarks/github_standin.py, sin acceso a Internet.
+
+Para cada repositorio de las instantáneas se ejecuta la misma búsqueda que la
+importación de la aplicación (GithubComposeFinder con las rutas, ramas y reglas de
+MainState) y se informa de la estrategia que encontró el compose, las peticiones
+por búsqueda y el tiempo total. Al final se agrupan los resultados por estrategia.
+
+Uso:
+    python benchmarks/github_discovery.py [--repeat N] [--latency MS] [--jitter MS]
+        [--not-found REGEX] [--ratelimit N] [--truncate N] [--images] [--output resultados.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.github_standin import (  # noqa: E402
+    FIXTURES_DIR,
+    Standin,
+    add_standin_arguments,
+    load_snapshots,
+    standin_config,
+    start_standin,
+)
+
+STRATEGIES = {
+    "Buscando en las rutas prioritarias": "priority_paths",
+    "Buscando en el README": "readme",
+    "Buscando en otros directorios": "tree",
+}
+
+
+async def lookup(finder_class, main_state, repo: str, images: bool) -> dict:
+    """Ejecuta una búsqueda y devuelve sus medidas."""
+    finder = finder_class(
+        f"https://github.com/{repo}",
+        main_state._priority_compose_paths,
+        main_state._priority_branches,
+        main_state._compose_validation_priority,
+    )
+    start = time.perf_counter()
+    best = await finder.find()
+    strategy = STRATEGIES.get(finder.stage, finder.stage) if best else "not_found"
+    if best and images:
+        await finder.find_images()
+    elapsed = time.perf_counter() - start
+    return {
+        "strategy": strategy,
+        "path": best['path'] if best else None,
+        "requests": finder.requests,
+        "seconds": elapsed,
+    }
+
+
+async def run(args, standin: Standin) -> dict:
+    # La configuración se lee al importar: los módulos se cargan tras fijar las URLs
+    from unposer.state.MainState import MainState
+    from unposer.utils.github import GithubComposeFinder
+
+    repos = sorted(snapshot["repo"] for snapshot in standin.snapshots.values())
+
+    # Calentamiento (arranque del ejecutor del conversor)
+    await lookup(GithubComposeFinder, MainState, repos[0], False)
+
+    results = {}
+    for repo in repos:
+        runs = []
+        server_hits = []
+        for _ in range(args.repeat):
+            standin.reset_counters()
+            runs.append(await lookup(GithubComposeFinder, MainState, repo, args.images))
+            server_hits.append(sum(standin.hits.values()))
+        wall_ms = [measure["seconds"] * 1000 for measure in runs]
+        results[repo] = {
+            "strategy": runs[-1]["strategy"],
+            "path": runs[-1]["path"],
+            "requests": runs[-1]["requests"],
+            "server_requests": server_hits[-1],
+            "median_ms": statistics.median(wall_ms),
+            "min_ms": min(wall_ms),
+        }
+        print(f"{repo:<30} {results[repo]['strategy']:<15} {results[repo]['requests']:>4} peticiones "
+              f"({server_hits[-1]} en el servidor) {results[repo]['median_ms']:>9.1f} ms  {results[repo]['path'] or '-'}")
+    return results
+
+
+def summarize(results: dict) -> dict:
+    """Agrupa los resultados por estrategia."""
+    strategies = {}
+    for result in results.values():
+        strategies.setdefault(result["strategy"], []).append(result)
+
+    summary = {}
+    print(f"\n{'estrategia':<15} {'búsquedas':>9} {'peticiones/búsqueda':>20} {'mediana (ms)':>13}")
+    for strategy, items in sorted(strategies.items()):
+        summary[strategy] = {
+            "lookups": len(items),
+            "requests_per_lookup": statistics.fmean(item["requests"] for item in items),
+            "median_ms": statistics.median(item["median_ms"] for item in items),
+        }
+        print(f"{strategy:<15} {len(items):>9} {summary[strategy]['requests_per_lookup']:>20.1f} {summary[strategy]['median_ms']:>13.1f}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="*", default=[FIXTURES_DIR])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--images", action="store_true", help="Incluir la búsqueda de imágenes del repositorio")
+    parser.add_argument("--output", help="Fichero JSON donde guardar los resultados")
+    add_standin_arguments(parser)
+    args = parser.parse_args()
+
+    standin = Standin(load_snapshots(args.fixtures), standin_config(args))
+    server = start_standin(standin)
+    base = f"http://127.0.0.1:{server.server_port}"
+    os.environ["GITHUB_API_URL"] = f"{base}/api"
+    os.environ["GITHUB_RAW_URL"] = f"{base}/raw"
+    os.environ.setdefault("DEBUG", "0")
+
+    try:
+        results = asyncio.run(run(args, standin))
+    finally:
+        server.shutdown()
+    summary = summarize(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results, "strategies": summary}, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Servidor local que sustituye a GitHub en las pruebas y benchmarks de la importación.
+
+Sirve, a partir de instantáneas de repositorios guardadas en JSON, las rutas que
+usa la búsqueda del Docker Compose:
+
+    /api/repos/{owner}/{repo}                         datos del repositorio
+    /api/repos/{owner}/{repo}/git/trees/{rama}        árbol de ficheros (recursivo)
+    /raw/{owner}/{repo}/{rama}/{ruta}                 contenido de un fichero
+
+La aplicación se apunta al servidor con GITHUB_API_URL=http://host:puerto/api y
+GITHUB_RAW_URL=http://host:puerto/raw. Se puede simular latencia, respuestas 404
+para rutas concretas, el límite de peticiones de la API y árboles truncados.
+
+Formato de una instantánea:
+
+    {
+      "repo": "owner/repo",
+      "default_branch": "main",
+      "description": "...",
+      "branches": {"main": {"tree": ["ruta", ...], "files": {"ruta": "contenido"}}}
+    }
+
+Si falta "tree" se usan las rutas de "files". Las rutas del árbol sin contenido
+grabado responden 404.
+
+Uso:
+    python benchmarks/github_standin.py serve [--port 8787] [fixtures...]
+    python benchmarks/github_standin.py record https://github.com/owner/repo -o fichero.json
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "github")
+
+
+@dataclass
+class StandinConfig:
+    """Comportamiento simulado del servidor."""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # Expresiones regulares sobre la ruta de la petición que responden 404
+    not_found: List[str] = field(default_factory=list)
+    # Límite de peticiones a la API (None = sin límite)
+    ratelimit: Optional[int] = None
+    # Número máximo de entradas del árbol (None = árbol completo)
+    truncate: Optional[int] = None
+
+
+class Standin:
+    """Estado compartido del servidor: instantáneas, configuración y contadores."""
+
+    def __init__(self, snapshots: Dict[str, Dict[str, Any]], config: StandinConfig = None):
+        self.snapshots = snapshots
+        self.config = config or StandinConfig()
+        self._not_found = [re.compile(pattern) for pattern in self.config.not_found]
+        self._lock = threading.Lock()
+        self.remaining = self.config.ratelimit
+        self.hits: Dict[str, int] = {}
+
+    def count(self, kind: str):
+        with self._lock:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+
+    def reset_counters(self):
+        with self._lock:
+            self.hits = {}
+            self.remaining = self.config.ratelimit
+
+    def take_ratelimit(self) -> Optional[int]:
+        """Descuenta una petición a la API; devuelve las restantes (None sin límite, -1 agotado)."""
+        with self._lock:
+            if self.remaining is None:
+                return None
+            if self.remaining <= 0:
+                return -1
+            self.remaining -= 1
+            return self.remaining
+
+    def is_forced_not_found(self, path: str) -> bool:
+        return any(pattern.search(path) for pattern in self._not_found)
+
+    def delay(self):
+        latency = self.config.latency_ms + random.uniform(0, self.config.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+
+def load_snapshots(paths: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Carga instantáneas desde ficheros JSON o directorios con ficheros JSON."""
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path])
+
+    snapshots = {}
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        for branch in snapshot.get("branches", {}).values():
+            branch.setdefault("tree", sorted(branch.get("files", {})))
+        snapshots[snapshot["repo"].lower()] = snapshot
+    return snapshots
+
+
+def _tree_entries(paths: List[str]) -> List[Dict[str, str]]:
+    """Entradas del árbol de la API de GitHub, con los directorios intermedios."""
+    directories = set()
+    for path in paths:
+        parts = path.split("/")[:-1]
+        directories.update("/".join(parts[:i]) for i in range(1, len(parts) + 1))
+    entries = [{"path": directory, "type": "tree", "mode": "040000"} for directory in directories]
+    entries.extend({"path": path, "type": "blob", "mode": "100644"} for path in paths)
+    return sorted(entries, key=lambda entry: entry["path"])
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server_version = "unposer-github-standin"
+    standin: Standin = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Dict[str, str] = None, head: bool = False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _send_json(self, status: int, data: Any, headers: Dict[str, str] = None, head: bool = False):
+        self._send(status, json.dumps(data).encode("utf-8"), "application/json; charset=utf-8", headers, head)
+
+    def do_HEAD(self):
+        self._handle(head=True)
+
+    def do_GET(self):
+        self._handle(head=False)
+
+    def _handle(self, head: bool):
+        standin = self.standin
+        path = unquote(urlsplit(self.path).path)
+        standin.delay()
+
+        if path.startswith("/api/"):
+            self._handle_api(path[len("/api"):], head)
+        elif path.startswith("/raw/"):
+            self._handle_raw(path[len("/raw"):], head)
+        else:
+            standin.count("other")
+            self._send(404, b"404: Not Found", "text/plain; charset=utf-8", head=head)
+
+    def _handle_api(self, path: str, head: bool):
+        standin = self.standin
+        remaining = standin.take_ratelimit()
+        headers = {}
+        if remaining is not None:
+            headers = {
+                "X-RateLimit-Limit": str(standin.config.ratelimit),
+                "X-RateLimit-Remaining": str(max(remaining, 0)),
+                "X-RateLimit-Resource": "core",
+                "X-RateLimit-Reset": str(int(time.time()) + 3600),
+            }
+        if remaining == -1:
+            standin.count("api_ratelimited")
+            self._send_json(403, {"message": "API rate limit exceeded"}, headers, head)
+            return
+
+        match = re.fullmatch(r"/repos/([^/]+)/([^/]+)(/git/trees/(.+))?", path)
+        snapshot = standin.snapshots.get(f"{match.group(1)}/{match.group(2)}".lower()) if match else None
+        if snapshot is None or standin.is_forced_not_found(path):
+            standin.count("api_not_found")
+            self._send_json(404, {"message": "Not Found"}, headers, head)
+            return
+
+        if match.group(3) is None:
+            standin.count("api_repo")
+            owner, name = snapshot["repo"].split("/")
+            self._send_json(200, {
+                "name": name,
+                "full_name": snapshot["repo"],
+                "description": snapshot.get("description"),
+                "default_branch": snapshot.get("default_branch", "main"),
+            }, headers, head)
+            return
+
+        branch = snapshot.get("branches", {}).get(match.group(4))
+        if branch is None:
+            standin.count("api_not_found")
+            self._send_json(404, {"message": "Not Found"}, headers, head)
+            return
+
+        standin.count("api_tree")
+        entries = _tree_entries(branch["tree"])
+        truncated = standin.config.truncate is not None and len(entries) > standin.config.truncate
+        if truncated:
+            entries = entries[:standin.config.truncate]
+        self._send_json(200, {"sha": match.group(4), "tree": entries, "truncated": truncated}, headers, head)
+
+    def _handle_raw(self, path: str, head: bool):
+        standin = self.standin
+        match = re.fullmatch(r"/([^/]+)/([^/]+)/([^/]+)/(.+)", path)
+        snapshot = standin.snapshots.get(f"{match.group(1)}/{match.group(2)}".lower()) if match else None
+        branch = snapshot.get("branches", {}).get(match.group(3)) if snapshot else None
+        content = branch.get("files", {}).get(match.group(4)) if branch else None
+        if content is None or standin.is_forced_not_found(path):
+            standin.count("raw_not_found")
+            self._send(404, b"404: Not Found", "text/plain; charset=utf-8", head=head)
+            return
+        standin.count("raw")
+        self._send(200, content.encode("utf-8"), "text/plain; charset=utf-8", head=head)
+
+
+def start_standin(standin: Standin, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Arranca el servidor en un hilo; la URL base es http://host:server.server_port."""
+    handler = type("Handler", (StandinHandler,), {"standin": standin})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="github-standin", daemon=True).start()
+    return server
+
+
+def record(repo_url: str, output: str, max_files: int):
+    """
+    Graba la instantánea de un repositorio real: datos, árbol de la rama principal y
+    contenido de los README y de los ficheros docker-compose.
+    """
+    import requests
+
+    parts = urlsplit(repo_url).path.strip("/").split("/")
+    repo = f"{parts[0]}/{parts[1]}"
+    session = requests.Session()
+    repo_data = session.get(f"https://api.github.com/repos/{repo}", timeout=30).json()
+    default_branch = repo_data.get("default_branch", "main")
+    tree = session.get(f"https://api.github.com/repos/{repo}/git/trees/{default_branch}?recursive=1", timeout=30).json()
+    paths = [item["path"] for item in tree.get("tree", []) if item.get("type") == "blob"]
+
+    wanted = [path for path in paths if re.search(r"(^|/)(readme\.md|[^/]*compose[^/]*\.ya?ml)$", path, re.IGNORECASE)]
+    files = {}
+    for path in wanted[:max_files]:
+        response = session.get(f"https://raw.githubusercontent.com/{repo}/{default_branch}/{path}", timeout=30)
+        if response.status_code == 200:
+            files[path] = response.text
+
+    snapshot = {
+        "repo": repo,
+        "default_branch": default_branch,
+        "description": repo_data.get("description"),
+        "branches": {default_branch: {"tree": paths, "files": files}},
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+    print(f"{repo}: {len(paths)} ficheros en el árbol, {len(files)} grabados en {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Sirve instantáneas grabadas")
+    serve_parser.add_argument("fixtures", nargs="*", default=[FIXTURES_DIR])
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8787)
+    add_standin_arguments(serve_parser)
+
+    record_parser = subparsers.add_parser("record", help="Graba la instantánea de un repositorio de GitHub")
+    record_parser.add_argument("repo_url")
+    record_parser.add_argument("-o", "--output", required=True)
+    record_parser.add_argument("--max-files", type=int, default=50)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.repo_url, args.output, args.max_files)
+        return
+
+    standin = Standin(load_snapshots(args.fixtures), standin_config(args))
+    server = start_standin(standin, args.host, args.port)
+    base = f"http://{args.host}:{server.server_port}"
+    print(f"{len(standin.snapshots)} repositorios: {', '.join(sorted(standin.snapshots))}")
+    print(f"GITHUB_API_URL={base}/api GITHUB_RAW_URL={base}/raw")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+def add_standin_arguments(parser: argparse.ArgumentParser):
+    """Opciones comunes del comportamiento simulado."""
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia (ms) de cada respuesta")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variación aleatoria (ms) añadida a la latencia")
+    parser.add_argument("--not-found", action="append", default=[], help="Expresión regular de rutas que responden 404")
+    parser.add_argument("--ratelimit", type=int, help="Peticiones permitidas a la API")
+    parser.add_argument("--truncate", type=int, help="Entradas máximas del árbol")
+
+
+def standin_config(args: argparse.Namespace) -> StandinConfig:
+    return StandinConfig(
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        not_found=args.not_found,
+        ratelimit=args.ratelimit,
+        truncate=args.truncate,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,506 @@
+"""
+Prueba de carga del backend de Reflex con varias sesiones simultáneas.
+
+Cada sesión abre su propio websocket (Socket.IO sobre /_event) y repite un
+recorrido realista de la aplicación: pegar el Docker Compose y editarlo, pasar a
+opciones, cambiar campos, generar la plantilla y descargarla. El editor se simula
+como en el navegador: cada cambio se envía a patch_docker_compose como un parche
+con el rango modificado sobre la última versión confirmada, tras el debounce. Con --github la sesión
+importa además el compose desde un repositorio del servidor local de
+benchmarks/github_standin.py.
+
+Se informa de los percentiles de latencia por evento (hasta la actualización
+final del backend), la tasa de errores y, si se conoce el proceso del backend,
+su uso de CPU y memoria (RSS) leídos de /proc.
+
+Uso:
+    # Contra un backend ya arrancado
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --sessions 50 --backend-pid <pid>
+
+    # Arrancando el backend (y GitHub apuntando al servidor local)
+    python benchmarks/load_test.py --start-backend --github --sessions 50
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import simple_websocket
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import build_compose  # noqa: E402
+from unposer.utils.config import SYNC_DEBOUNCE_MS  # noqa: E402
+from benchmarks.github_standin import (  # noqa: E402
+    FIXTURES_DIR,
+    Standin,
+    add_standin_arguments,
+    load_snapshots,
+    standin_config,
+    start_standin,
+)
+
+NAMESPACE = "/_event"
+ROOT_STATE = "reflex___state____state"
+# Nombre completo de MainState (MainState.get_full_name())
+MAIN_STATE = f"{ROOT_STATE}.unposer___state____main_state____main_state"
+ROUTER_DATA = {"pathname": "/", "query": {}, "asPath": "/"}
+
+
+class SessionError(Exception):
+    """Error de transporte o de protocolo en una sesión."""
+
+
+@dataclass
+class Step:
+    """Evento del recorrido: manejador, argumentos y, opcionalmente, la variable a esperar."""
+    name: str
+    handler: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    # Espera hasta que una variable del delta (por prefijo del nombre) toma este valor
+    wait_for: Optional[Tuple[str, Any]] = None
+    # Valor que debe aparecer en el delta antes de la actualización final (si no, es un error)
+    expect: Optional[Tuple[str, Any]] = None
+    # Cambio del editor del Docker Compose (texto actual -> texto nuevo); el payload es su parche
+    edit: Optional[Callable[[str], str]] = None
+    # Pausa antes de enviar el evento (el debounce del editor)
+    delay: float = 0.0
+
+
+class ComposeEditor:
+    """Copia del editor del Docker Compose del navegador (window.unposerSync.diff)."""
+
+    def __init__(self):
+        self.text = ""
+        self.version = 0
+        self.seq = 0
+
+    def track(self, delta: Dict[str, Dict[str, Any]]):
+        """Sigue la versión del servidor y los reemplazos completos del documento."""
+        for substate in delta.values():
+            for name, value in substate.items():
+                if name.startswith("docker_compose_version"):
+                    self.version = value
+                elif name.startswith("docker_compose_text"):
+                    self.text = value
+
+    def patch(self, value: str) -> Dict[str, Any]:
+        """Parche con el rango modificado respecto al último texto enviado."""
+        base = self.text
+        limit = min(len(base), len(value))
+        start = 0
+        while start < limit and base[start] == value[start]:
+            start += 1
+        suffix = 0
+        while suffix < limit - start and base[len(base) - 1 - suffix] == value[len(value) - 1 - suffix]:
+            suffix += 1
+        self.seq += 1
+        self.text = value
+        return {
+            "seq": self.seq,
+            "base": self.version,
+            "full": False,
+            "start": start,
+            "end": len(base) - suffix,
+            "text": value[start:len(value) - suffix],
+            "length": len(value),
+        }
+
+
+def build_scenario(compose_text: str, github_repo: Optional[str]) -> List[Step]:
+    """Recorrido de una sesión."""
+    steps = [
+        Step("validate_tab_change[compose]", f"{MAIN_STATE}.validate_tab_change", {"tab_value": "compose"}),
+        Step("reset_app", f"{MAIN_STATE}.reset_app"),
+    ]
+    if github_repo:
+        steps.append(Step("load_github_repo_url", f"{MAIN_STATE}.load_github_repo_url", {"url": f"https://github.com/{github_repo}"}))
+        steps.append(Step(
+            "load_docker_compose_from_github",
+            f"{MAIN_STATE}.load_docker_compose_from_github",
+            wait_for=("is_loading_compose", False),
+        ))
+    else:
+        # Pegar el compose (un parche con todo el documento) y unas pocas ediciones pequeñas
+        debounce = SYNC_DEBOUNCE_MS / 1000
+        steps.append(Step("patch_docker_compose[paste]", f"{MAIN_STATE}.patch_docker_compose",
+                          edit=lambda text: compose_text, delay=debounce))
+        for line in ("# editado", "# revisado", "# listo"):
+            steps.append(Step("patch_docker_compose[edit]", f"{MAIN_STATE}.patch_docker_compose",
+                              edit=lambda text, line=line: f"{text.rstrip()}\n{line}\n", delay=debounce))
+    steps.extend([
+        Step("validate_tab_change[options]", f"{MAIN_STATE}.validate_tab_change", {"tab_value": "options"}, expect=("active_tab", "options")),
+        Step("set_template_description", f"{MAIN_STATE}.set_template_description", {"description": "Plantilla de prueba de carga"}),
+        Step("set_category", f"{MAIN_STATE}.set_category", {"category": "Tools"}),
+        Step("set_support_url", f"{MAIN_STATE}.set_support_url", {"url": "https://example.com/soporte"}),
+        Step("set_web_port", f"{MAIN_STATE}.set_web_port", {"port": "8000:8000"}),
+        Step("validate_tab_change[template]", f"{MAIN_STATE}.validate_tab_change", {"tab_value": "template"}, expect=("active_tab", "template")),
+        Step("download_template_local", f"{MAIN_STATE}.download_template_local"),
+    ])
+    return steps
+
+
+class ReflexSession:
+    """Cliente mínimo de Socket.IO (Engine.IO v4 sobre websocket) para una sesión de Reflex."""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        scheme = "wss" if parts.scheme == "https" else "ws"
+        self.ws_url = f"{scheme}://{parts.netloc}{NAMESPACE}/?EIO=4&transport=websocket"
+        self.timeout = timeout
+        self.token = str(uuid.uuid4())
+        self.ws = None
+        self.editor = ComposeEditor()
+
+    def connect(self):
+        self.ws = simple_websocket.Client.connect(self.ws_url)
+        packet = self._receive(self.timeout)
+        if not packet.startswith("0"):
+            raise SessionError(f"Apertura inesperada: {packet[:80]}")
+        self.ws.send(f"40{NAMESPACE},")
+        while True:
+            packet = self._receive(self.timeout)
+            if packet.startswith(f"40{NAMESPACE}"):
+                return
+            if packet.startswith(f"44{NAMESPACE}"):
+                raise SessionError(f"Conexión rechazada: {packet[:120]}")
+
+    def close(self):
+        if self.ws is not None:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+
+    def _receive(self, timeout: float) -> str:
+        try:
+            packet = self.ws.receive(timeout=timeout)
+        except simple_websocket.ConnectionClosed as e:
+            raise SessionError("Conexión cerrada por el backend") from e
+        if packet is None:
+            raise SessionError("Tiempo de espera agotado")
+        if packet == "2":
+            # Ping de Engine.IO
+            self.ws.send("3")
+            return self._receive(timeout)
+        return packet if isinstance(packet, str) else packet.decode("utf-8")
+
+    def _updates(self, deadline: float):
+        """Actualizaciones (StateUpdate) recibidas hasta el plazo."""
+        prefix = f"42{NAMESPACE},"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SessionError("Tiempo de espera agotado")
+            packet = self._receive(remaining)
+            if not packet.startswith(prefix):
+                continue
+            event, data = json.loads(packet[len(prefix):])[:2]
+            if event == "event":
+                yield data
+
+    def emit(self, step: Step) -> float:
+        """Envía un evento y espera su actualización final; devuelve la latencia en segundos."""
+        payload, expect = step.payload, step.expect
+        if step.edit is not None:
+            patch = self.editor.patch(step.edit(self.editor.text))
+            # El servidor confirma el parche; si pide una resincronización completa es un error
+            payload, expect = {"patch": patch}, ("docker_compose_ack", patch["seq"])
+        if step.delay > 0:
+            time.sleep(step.delay)
+        event = {"token": self.token, "name": step.handler, "payload": payload, "router_data": ROUTER_DATA}
+        start = time.monotonic()
+        self.ws.send(f"42{NAMESPACE},{json.dumps(['event', event])}")
+        final = False
+        seen = expect is None
+        for update in self._updates(start + self.timeout):
+            self.editor.track(update.get("delta", {}))
+            final = final or update.get("final", False)
+            seen = seen or self._matches(update.get("delta", {}), expect)
+            if step.wait_for and self._matches(update.get("delta", {}), step.wait_for):
+                latency = time.monotonic() - start
+                self._drain()
+                return latency
+            if final and not step.wait_for:
+                if not seen:
+                    raise SessionError(f"No se recibió {expect[0]}={expect[1]!r}")
+                return time.monotonic() - start
+
+    def _drain(self, quiet: float = 0.25):
+        """
+        Descarta las actualizaciones pendientes de una tarea en segundo plano (sus avisos
+        finales) para que no se confundan con la respuesta del siguiente evento.
+        """
+        while True:
+            try:
+                self._receive(quiet)
+            except SessionError:
+                return
+
+    @staticmethod
+    def _matches(delta: Dict[str, Dict[str, Any]], expected: Tuple[str, Any]) -> bool:
+        prefix, value = expected
+        for substate in delta.values():
+            for name, current in substate.items():
+                if name.startswith(prefix) and current == value:
+                    return True
+        return False
+
+
+@dataclass
+class Results:
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, step: str, latency: float):
+        with self.lock:
+            self.latencies.setdefault(step, []).append(latency)
+
+    def error(self, step: str, message: str):
+        with self.lock:
+            step_errors = self.errors.setdefault(step, {})
+            step_errors[message] = step_errors.get(message, 0) + 1
+
+
+def run_session(index: int, args, scenario: List[Step], results: Results, start_at: float):
+    """Ejecuta las iteraciones del recorrido en una sesión."""
+    time.sleep(max(start_at - time.monotonic(), 0))
+    session = ReflexSession(args.url, args.timeout)
+    try:
+        session.connect()
+        session.emit(Step("hydrate", f"{ROOT_STATE}.hydrate"))
+    except Exception as e:
+        results.error("connect", str(e))
+        session.close()
+        return
+
+    try:
+        for _ in range(args.iterations):
+            for step in scenario:
+                try:
+                    results.add(step.name, session.emit(step))
+                except SessionError as e:
+                    results.error(step.name, str(e))
+                    if "cerrada" in str(e):
+                        return
+                if args.think > 0:
+                    time.sleep(random.uniform(0, args.think))
+    finally:
+        session.close()
+
+
+class ProcessSampler(threading.Thread):
+    """Muestrea CPU y RSS de un proceso y sus descendientes desde /proc."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Tuple[float, float]] = []
+        self._finished = threading.Event()
+
+    @staticmethod
+    def _tree(pid: int) -> List[int]:
+        children: Dict[int, List[int]] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+        pids, pending = [], [pid]
+        while pending:
+            current = pending.pop()
+            pids.append(current)
+            pending.extend(children.get(current, []))
+        return pids
+
+    @staticmethod
+    def _read(pids: List[int]) -> Tuple[float, int]:
+        """Tiempo de CPU (s) y RSS (bytes) totales."""
+        ticks = os.sysconf("SC_CLK_TCK")
+        page = os.sysconf("SC_PAGE_SIZE")
+        cpu, rss = 0.0, 0
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                cpu += (int(fields[11]) + int(fields[12])) / ticks
+                rss += int(fields[21]) * page
+            except (OSError, IndexError, ValueError):
+                continue
+        return cpu, rss
+
+    def run(self):
+        last_cpu, _ = self._read(self._tree(self.pid))
+        last_time = time.monotonic()
+        finished = False
+        while not finished:
+            # La última muestra se toma al terminar, aunque la prueba dure menos que el intervalo
+            finished = self._finished.wait(self.interval)
+            cpu, rss = self._read(self._tree(self.pid))
+            now = time.monotonic()
+            self.samples.append(((cpu - last_cpu) / max(now - last_time, 1e-6) * 100, rss))
+            last_cpu, last_time = cpu, now
+
+    def stop(self) -> Dict[str, float]:
+        self._finished.set()
+        self.join()
+        if not self.samples:
+            return {}
+        cpu = [sample[0] for sample in self.samples]
+        rss = [sample[1] / (1024 * 1024) for sample in self.samples]
+        return {"cpu_mean_pct": statistics.fmean(cpu), "cpu_max_pct": max(cpu), "rss_max_mb": max(rss), "rss_last_mb": rss[-1]}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def report(results: Results, elapsed: float, backend: Dict[str, float]) -> Dict[str, Any]:
+    summary = {"elapsed_s": elapsed, "events": {}, "backend": backend}
+    total_events = sum(len(values) for values in results.latencies.values())
+    total_errors = sum(sum(errors.values()) for errors in results.errors.values())
+
+    print(f"\n{'evento':<40} {'n':>6} {'err':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'máx ms':>9}")
+    for step in sorted(set(results.latencies) | set(results.errors)):
+        values = [value * 1000 for value in results.latencies.get(step, [])]
+        errors = sum(results.errors.get(step, {}).values())
+        stats = {"count": len(values), "errors": errors}
+        if values:
+            stats.update({
+                "p50_ms": percentile(values, 50),
+                "p90_ms": percentile(values, 90),
+                "p99_ms": percentile(values, 99),
+                "max_ms": max(values),
+            })
+            print(f"{step:<40} {len(values):>6} {errors:>5} {stats['p50_ms']:>9.1f} {stats['p90_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+        else:
+            print(f"{step:<40} {0:>6} {errors:>5}")
+        summary["events"][step] = stats
+
+    error_rate = total_errors / (total_events + total_errors) if total_events + total_errors else 0.0
+    summary.update({"total_events": total_events, "total_errors": total_errors, "error_rate": error_rate,
+                    "events_per_second": total_events / elapsed if elapsed else 0.0, "errors": results.errors})
+    print(f"\n{total_events} eventos en {elapsed:.1f} s ({summary['events_per_second']:.1f}/s), "
+          f"{total_errors} errores ({error_rate:.2%})")
+    for step, errors in results.errors.items():
+        for message, count in errors.items():
+            print(f"  {step}: {message} (x{count})")
+    if backend:
+        print(f"Backend: CPU media {backend['cpu_mean_pct']:.0f}% (máx {backend['cpu_max_pct']:.0f}%), "
+              f"RSS máx {backend['rss_max_mb']:.0f} MB (final {backend['rss_last_mb']:.0f} MB)")
+    return summary
+
+
+def wait_for_backend(url: str, timeout: float):
+    """Espera a que el backend responda en /ping."""
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/ping", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"El backend no responde en {url}/ping")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL del backend")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=3, help="Repeticiones del recorrido por sesión")
+    parser.add_argument("--ramp", type=float, default=5.0, help="Segundos en los que se abren todas las sesiones")
+    parser.add_argument("--think", type=float, default=0.0, help="Pausa aleatoria máxima (s) entre eventos")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Espera máxima (s) de cada evento")
+    parser.add_argument("--size", default="small", help="Tamaño del compose del corpus (tiny, small, medium...)")
+    parser.add_argument("--github", action="store_true", help="Importar el compose desde el servidor local de GitHub")
+    parser.add_argument("--github-port", type=int, default=8787, help="Puerto del servidor local de GitHub")
+    parser.add_argument("--github-repo", default="ejemplo/priority-path", help="Repositorio de las instantáneas a importar")
+    parser.add_argument("--start-backend", action="store_true", help="Arrancar el backend (reflex run --backend-only)")
+    parser.add_argument("--backend-pid", type=int, help="PID del backend para medir CPU y RSS")
+    parser.add_argument("--output", help="Fichero JSON donde guardar los resultados")
+    add_standin_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.github:
+        standin = Standin(load_snapshots([FIXTURES_DIR]), standin_config(args))
+        server = start_standin(standin, port=args.github_port)
+        print(f"GitHub local en http://127.0.0.1:{server.server_port} "
+              f"(el backend debe usar GITHUB_API_URL=http://127.0.0.1:{server.server_port}/api "
+              f"y GITHUB_RAW_URL=http://127.0.0.1:{server.server_port}/raw)")
+
+    backend = None
+    if args.start_backend:
+        env = dict(os.environ)
+        if server is not None:
+            env["GITHUB_API_URL"] = f"http://127.0.0.1:{server.server_port}/api"
+            env["GITHUB_RAW_URL"] = f"http://127.0.0.1:{server.server_port}/raw"
+        backend = subprocess.Popen(
+            ["reflex", "run", "--env", "prod", "--backend-only"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            # Grupo de procesos propio para terminar también los procesos del servidor ASGI
+            start_new_session=True,
+        )
+        args.backend_pid = backend.pid
+
+    try:
+        wait_for_backend(args.url.rstrip("/"), 120)
+        sampler = ProcessSampler(args.backend_pid) if args.backend_pid else None
+        if sampler:
+            sampler.start()
+
+        scenario = build_scenario(build_compose(args.size), args.github_repo if args.github else None)
+        results = Results()
+        start = time.monotonic()
+        threads = [
+            threading.Thread(
+                target=run_session,
+                args=(index, args, scenario, results, start + args.ramp * index / max(args.sessions, 1)),
+                daemon=True,
+            )
+            for index in range(args.sessions)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+
+        summary = report(results, elapsed, sampler.stop() if sampler else {})
+        summary["config"] = {key: value for key, value in vars(args).items()}
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+            print(f"\nResultados guardados en {args.output}")
+    finally:
+        if backend is not None:
+            os.killpg(backend.pid, signal.SIGTERM)
+            backend.wait(timeout=30)
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Microbenchmark del coste del logging en el conversor: nivel INFO frente a DEBUG.
+
+Cada nivel se mide en un proceso aparte (el nivel se fija al importar el módulo)
+y la salida de los logs se descarta para medir solo el coste de generarlos.
+
+Uso:
+    python benchmarks/logging_overhead.py [--iterations N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMPOSE = """
+services:
+  app:
+    image: lscr.io/linuxserver/sonarr:latest
+    container_name: sonarr
+    environment:
+{environment}
+    labels:
+{labels}
+    volumes:
+      - /mnt/user/appdata/sonarr:/config
+      - /mnt/user/data:/data
+    ports:
+      - 8989:8989
+    devices:
+{devices}
+    restart: unless-stopped
+"""
+
+
+def build_compose() -> str:
+    environment = "\n".join(f"      - VAR_{i}=valor_{i}" for i in range(40))
+    labels = "\n".join(f"      - com.example.label{i}=valor {i}" for i in range(40))
+    devices = "\n".join(f"      - /dev/dri/renderD{128 + i}:/dev/dri/renderD{128 + i}" for i in range(10))
+    return COMPOSE.format(environment=environment, labels=labels, devices=devices)
+
+
+def run_child(iterations: int):
+    """Mide el conversor en el proceso actual e imprime el resultado en JSON."""
+    sys.path.insert(0, ROOT)
+    from unposer.utils.converter import UnraidTemplateConverter
+
+    converter = UnraidTemplateConverter()
+    compose = build_compose()
+    app_fields = {'Icon': 'https://example.com/icon.png', 'Overview': 'Demo', 'Support': '', 'Project': '', 'Category': 'Tools'}
+
+    def measure_loop(fn) -> float:
+        for _ in range(20):  # Calentamiento
+            fn()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return time.perf_counter() - start
+
+    docker_compose = converter.parse_docker_compose(compose)
+    results = {
+        "generate": measure_loop(lambda: converter.generate_unraid_template(docker_compose, app_fields=app_fields, installed_at=0)),
+        "parse_generate": measure_loop(lambda: converter.generate_unraid_template(converter.parse_docker_compose(compose), app_fields=app_fields, installed_at=0)),
+    }
+    print(json.dumps({"iterations": iterations, "seconds": results}))
+
+
+def measure(debug: str, iterations: int) -> dict:
+    env = {**os.environ, "DEBUG": debug}
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", "--iterations", str(iterations)],
+        env=env, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True, text=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.iterations)
+        return
+
+    info = measure("0", args.iterations)
+    debug = measure("1", args.iterations)
+    labels = {"generate": "generate_unraid_template", "parse_generate": "parse + generate"}
+    for key, label in labels.items():
+        info_rate = args.iterations / info["seconds"][key]
+        debug_rate = args.iterations / debug["seconds"][key]
+        print(f"{label}")
+        print(f"  INFO : {info_rate:9.1f} conversiones/s ({1000 / info_rate:.3f} ms)")
+        print(f"  DEBUG: {debug_rate:9.1f} conversiones/s ({1000 / debug_rate:.3f} ms)")
+        print(f"  Coste del logging de depuración: x{info_rate / debug_rate:.2f}")
+
+
+if __name__ == "__main__":
+    main()
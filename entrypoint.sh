@@ -1,5 +1,13 @@
 #!/bin/sh
 set -e
 
+# Varios workers del backend solo si el estado de las sesiones está en Redis
+BACKEND_WORKERS="${BACKEND_WORKERS:-1}"
+if [ "$BACKEND_WORKERS" -gt 1 ] && [ -z "$REDIS_URL" ]; then
+    echo "BACKEND_WORKERS=$BACKEND_WORKERS requiere REDIS_URL; se usa un único worker."
+    BACKEND_WORKERS=1
+fi
+export GRANIAN_WORKERS="$BACKEND_WORKERS"
+
 caddy start
 exec reflex run --env prod --backend-only
\ No newline at end of file
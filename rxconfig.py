@@ -1,3 +1,5 @@
+import os
+
 import reflex as rx
 
 config = rx.Config(
@@ -7,4 +9,8 @@ config = rx.Config(
     backend_port=8000,
     tailwind=None,
     show_built_with_reflex=False,
+    # Con REDIS_URL el estado de las sesiones se guarda en Redis y lo comparten todos los workers
+    redis_url=os.getenv("REDIS_URL") or None,
+    # Caducidad de las sesiones inactivas en Redis (la misma que SESSION_IDLE_TTL en memoria)
+    redis_token_expiration=int(os.getenv("SESSION_IDLE_TTL") or 3600),
 )
\ No newline at end of file
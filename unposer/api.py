@@ -0,0 +1,452 @@
+"""
+Rutas HTTP propias del backend, servidas junto a las de Reflex (/ping, /_event...).
+
+/api/convert convierte un Docker Compose sin sesión ni websocket (para scripts y
+CI) y /api/convert/batch convierte varios documentos y devuelve un resultado por
+servicio en NDJSON a medida que se generan. /api/convert/zip, /api/bundle/<ticket>
+y /api/templates.zip devuelven varias plantillas en un ZIP construido por bloques.
+/api/library busca en el índice de la carpeta de plantillas. /api/reverse y
+/api/templates/compose hacen la conversión inversa (plantillas a Docker Compose).
+"""
+import hmac
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import yaml
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import reflex as rx
+
+from unposer.state.MainState import MainState
+from unposer.utils.bundle import directory_entries, get_ticket, stream_zip
+from unposer.utils.cache import generate_template_cached
+from unposer.utils.config import API_MAX_DOCUMENTS, API_TOKEN, COMPOSE_MAX_BYTES, PROFILING_ADMIN_TOKEN, TEMPLATES_DIR
+from unposer.utils.executor import ConverterBusy, ConverterTimeout, reverse_template_job, run_converter, split_services_job
+from unposer.utils.library import library
+from unposer.utils.limits import ComposeLimitError, check_size
+from unposer.utils.metrics import REGISTRY, Counter, render_metrics
+from unposer.utils.profiling import profiler
+from unposer.utils.reverse import ReverseError, dump_compose, service_fragment, unique_key
+from unposer.utils.sessions import reaper
+from unposer.utils.utils import generate_trace_id, setup_logger, template_filename
+
+logger = setup_logger(__name__)
+
+# Campos de la petición y etiquetas de la aplicación que rellenan (como MainState._get_app_fields)
+APP_FIELD_NAMES = {
+    "icon_url": "Icon",
+    "description": "Overview",
+    "support_url": "Support",
+    "project_url": "Project",
+    "category": "Category",
+}
+# Margen para el JSON y los campos de la aplicación sobre el tamaño máximo del compose
+BODY_MARGIN = 64 * 1024
+
+API_CONVERSIONS = REGISTRY.register(Counter(
+    "unposer_api_conversions_total",
+    "Conversiones de la API HTTP por ruta y resultado (ok / error).",
+    ["endpoint", "result"],
+))
+
+
+async def metrics(request: Request) -> PlainTextResponse:
+    """Métricas del backend en formato de texto de Prometheus."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _is_admin(request: Request) -> bool:
+    """Comprueba el token de administración (cabecera Authorization: Bearer <token>)."""
+    if not PROFILING_ADMIN_TOKEN:
+        return False
+    authorization = request.headers.get("Authorization", "")
+    return hmac.compare_digest(authorization, f"Bearer {PROFILING_ADMIN_TOKEN}")
+
+
+async def admin_profiling(request: Request) -> JSONResponse:
+    """Consulta (GET) o activa y desactiva (POST {"enabled": true|false}) el perfilado."""
+    if not _is_admin(request):
+        return JSONResponse({"error": "No autorizado"}, status_code=403)
+    if request.method == "POST":
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        if not isinstance(body, dict) or not isinstance(body.get("enabled"), bool):
+            return JSONResponse({"error": "Se esperaba {\"enabled\": true|false}"}, status_code=400)
+        profiler.enabled = body["enabled"]
+    return JSONResponse(profiler.stats())
+
+
+async def admin_sessions(request: Request) -> JSONResponse:
+    """Sesiones en memoria y su tamaño estimado (GET); POST fuerza un barrido antes del resumen."""
+    if not _is_admin(request):
+        return JSONResponse({"error": "No autorizado"}, status_code=403)
+    try:
+        limit = max(int(request.query_params.get("limit", "20")), 0)
+    except ValueError:
+        return JSONResponse({"error": "limit debe ser un número entero"}, status_code=400)
+    summary = {}
+    if request.method == "POST":
+        summary["swept"] = reaper.sweep()
+    summary.update(reaper.report(limit))
+    return JSONResponse(summary)
+
+
+class ApiError(Exception):
+    """Petición a la API no válida; se responde con su mensaje y código de estado."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _api_authorized(request: Request) -> bool:
+    """Sin API_TOKEN la API es abierta, como la interfaz; con él se exige Authorization: Bearer."""
+    if not API_TOKEN:
+        return True
+    return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {API_TOKEN}")
+
+
+def _templates_authorized(request: Request) -> Optional[JSONResponse]:
+    """
+    Comprueba el acceso a las rutas que leen la carpeta de plantillas.
+
+    Las plantillas guardadas pueden contener contraseñas y claves en sus <Config>, así que
+    estas rutas exigen siempre un token (API_TOKEN o el de administración): sin ninguno
+    configurado no existen (404). Devuelve la respuesta de error o None si se permite.
+    """
+    tokens = [token for token in (API_TOKEN, PROFILING_ADMIN_TOKEN) if token]
+    if not tokens:
+        return JSONResponse({"error": "No encontrado"}, status_code=404)
+    authorization = request.headers.get("Authorization", "")
+    if not any(hmac.compare_digest(authorization, f"Bearer {token}") for token in tokens):
+        return JSONResponse({"error": "No autorizado"}, status_code=401)
+    return None
+
+
+async def _read_json(request: Request, max_bytes: int) -> Dict[str, Any]:
+    """Lee el cuerpo JSON de la petición por bloques, abortando en cuanto supera el límite."""
+    chunks = []
+    total = 0
+    async for chunk in request.stream():
+        total += len(chunk)
+        check_size(total, max_bytes)
+        chunks.append(chunk)
+    try:
+        body = json.loads(b"".join(chunks))
+    except ValueError:
+        raise ApiError("El cuerpo de la petición no es un JSON válido")
+    if not isinstance(body, dict):
+        raise ApiError("Se esperaba un objeto JSON")
+    return body
+
+
+def _conversion_options(document: Dict[str, Any], defaults: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Valida los campos de un documento (los que falten se toman de defaults)."""
+    if not isinstance(document, dict):
+        raise ApiError("Cada documento debe ser un objeto JSON")
+    fields = {**(defaults or {}), **document}
+    for name in ("compose", "service", "web_port", *APP_FIELD_NAMES):
+        if fields.get(name) is not None and not isinstance(fields[name], str):
+            raise ApiError(f"El campo '{name}' debe ser una cadena")
+    if not fields.get("compose"):
+        raise ApiError("Falta el campo 'compose' con el Docker Compose")
+    return {
+        "compose": fields["compose"],
+        "service": fields.get("service") or "",
+        "web_port": fields.get("web_port") or "",
+        "app_fields": {tag: fields.get(name) or "" for name, tag in APP_FIELD_NAMES.items()},
+    }
+
+
+async def _convert_services(options: Dict[str, Any], all_services: bool) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Genera (servicio, plantilla) para los servicios del compose: todos o solo el
+    indicado en 'service' (por defecto el primero, como la interfaz).
+    """
+    services: List[Tuple[str, str]] = await run_converter(split_services_job, options["compose"])
+    if options["service"]:
+        services = [item for item in services if item[0] == options["service"]]
+        if not services:
+            raise ApiError(f"El servicio '{options['service']}' no existe en el Docker Compose", 422)
+    elif not all_services:
+        services = services[:1]
+
+    app_fields = options["app_fields"]
+    for index, (service, compose_text) in enumerate(services):
+        template = await generate_template_cached(
+            MainState._converter.mapping_version,
+            compose_text,
+            app_fields["Icon"],
+            app_fields["Overview"],
+            # El puerto web es el del servicio principal (el primero), como en la interfaz
+            options["web_port"] if index == 0 else "",
+            app_fields,
+        )
+        if not template:
+            raise ApiError(f"No se pudo generar la plantilla del servicio '{service}'", 422)
+        yield service, template
+
+
+def _error_status(error: Exception) -> Tuple[int, str]:
+    """Código de estado y mensaje de un error de conversión."""
+    if isinstance(error, ApiError):
+        return error.status_code, str(error)
+    if isinstance(error, ComposeLimitError):
+        return 413, str(error)
+    if isinstance(error, ConverterBusy):
+        return 503, str(error)
+    if isinstance(error, ConverterTimeout):
+        return 504, str(error)
+    if isinstance(error, (ValueError, yaml.YAMLError)):
+        return 422, f"Docker Compose no válido: {error}"
+    logger.error("Error en la API de conversión: %s", error)
+    return 500, "Error interno al convertir el Docker Compose"
+
+
+def _error_response(error: Exception) -> JSONResponse:
+    status_code, message = _error_status(error)
+    headers = {"Retry-After": "5"} if status_code == 503 else None
+    return JSONResponse({"error": message}, status_code=status_code, headers=headers)
+
+
+async def api_convert(request: Request) -> Response:
+    """
+    Convierte un Docker Compose y devuelve la plantilla XML.
+
+    Cuerpo JSON: compose (obligatorio), service, web_port, icon_url, description,
+    support_url, project_url y category.
+    """
+    generate_trace_id("api")
+    if not _api_authorized(request):
+        return JSONResponse({"error": "No autorizado"}, status_code=401)
+    try:
+        options = _conversion_options(await _read_json(request, COMPOSE_MAX_BYTES + BODY_MARGIN))
+        [(_, template)] = [item async for item in _convert_services(options, all_services=False)]
+    except Exception as e:
+        API_CONVERSIONS.inc(endpoint="convert", result="error")
+        return _error_response(e)
+    API_CONVERSIONS.inc(endpoint="convert", result="ok")
+    return Response(
+        template,
+        media_type="application/xml",
+        headers={"Content-Disposition": f'attachment; filename="{template_filename(template)}"'},
+    )
+
+
+async def _read_documents(request: Request) -> Tuple[List[Any], Dict[str, Any]]:
+    """Documentos de una petición de varios documentos y los valores comunes a todos."""
+    body = await _read_json(request, (COMPOSE_MAX_BYTES + BODY_MARGIN) * API_MAX_DOCUMENTS)
+    documents = body.pop("documents", None)
+    if documents is None:
+        return [body], {}
+    if not isinstance(documents, list) or not documents:
+        raise ApiError("El campo 'documents' debe ser una lista no vacía")
+    if len(documents) > API_MAX_DOCUMENTS:
+        raise ApiError(f"Se admiten como máximo {API_MAX_DOCUMENTS} documentos por petición", 413)
+    return documents, body
+
+
+async def _document_results(documents: List[Any], defaults: Dict[str, Any], endpoint: str) -> AsyncIterator[Dict[str, Any]]:
+    """Convierte los documentos uno a uno: un resultado por servicio o uno de error por documento."""
+    for index, document in enumerate(documents):
+        name = document.get("name", index) if isinstance(document, dict) else index
+        try:
+            options = _conversion_options(document, defaults)
+            async for service, template in _convert_services(options, all_services=True):
+                API_CONVERSIONS.inc(endpoint=endpoint, result="ok")
+                yield {
+                    "document": name,
+                    "service": service,
+                    "filename": template_filename(template),
+                    "template": template,
+                }
+        except Exception as e:
+            API_CONVERSIONS.inc(endpoint=endpoint, result="error")
+            status_code, message = _error_status(e)
+            yield {"document": name, "error": message, "status": status_code}
+
+
+async def api_convert_batch(request: Request) -> Response:
+    """
+    Convierte varios documentos y devuelve una línea JSON por servicio (NDJSON).
+
+    Cuerpo JSON: documents, lista de objetos con los mismos campos que /api/convert
+    más un name opcional; el resto de campos del cuerpo son los valores por defecto
+    de todos los documentos. Sin documents se convierten todos los servicios del
+    compose del propio cuerpo. La última línea resume el resultado.
+    """
+    generate_trace_id("api")
+    if not _api_authorized(request):
+        return JSONResponse({"error": "No autorizado"}, status_code=401)
+    try:
+        documents, defaults = await _read_documents(request)
+    except Exception as e:
+        return _error_response(e)
+
+    async def results() -> AsyncIterator[str]:
+        converted = failed = 0
+        async for result in _document_results(documents, defaults, "batch"):
+            if "error" in result:
+                failed += 1
+            else:
+                converted += 1
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        yield json.dumps({"summary": {"converted": converted, "failed": failed}}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def _zip_response(entries: AsyncIterator[Tuple[str, bytes]], filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+async def _bundle_entries(documents: List[Any], defaults: Dict[str, Any]) -> AsyncIterator[Tuple[str, bytes]]:
+    """Plantillas de los documentos como entradas del ZIP; los errores van en errores.json al final."""
+    errors = []
+    async for result in _document_results(documents, defaults, "zip"):
+        if "error" in result:
+            errors.append(result)
+        else:
+            yield result["filename"], result["template"].encode("utf-8")
+    if errors:
+        yield "errores.json", json.dumps(errors, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+async def api_convert_zip(request: Request) -> Response:
+    """Como /api/convert/batch pero devuelve un ZIP con una plantilla por servicio."""
+    generate_trace_id("api")
+    if not _api_authorized(request):
+        return JSONResponse({"error": "No autorizado"}, status_code=401)
+    try:
+        documents, defaults = await _read_documents(request)
+    except Exception as e:
+        return _error_response(e)
+    return _zip_response(_bundle_entries(documents, defaults), "unraid-templates.zip")
+
+
+async def api_bundle(request: Request) -> Response:
+    """ZIP de la conversión guardada en un ticket por la interfaz (MainState.download_template_bundle)."""
+    generate_trace_id("api")
+    ticket = await get_ticket(request.path_params["ticket"])
+    if ticket is None:
+        return JSONResponse({"error": "La descarga ha caducado, vuelve a generarla"}, status_code=404)
+    return _zip_response(_bundle_entries([ticket], {}), "unraid-templates.zip")
+
+
+async def api_templates_zip(request: Request) -> Response:
+    """ZIP con todas las plantillas guardadas en la carpeta de plantillas (exige token)."""
+    generate_trace_id("api")
+    denied = _templates_authorized(request)
+    if denied is not None:
+        return denied
+    return _zip_response(directory_entries(TEMPLATES_DIR), "plantillas.zip")
+
+
+async def api_library(request: Request) -> JSONResponse:
+    """Plantillas de la carpeta de plantillas que coinciden con q (nombre, repositorio o fichero); exige token."""
+    generate_trace_id("api")
+    denied = _templates_authorized(request)
+    if denied is not None:
+        return denied
+    try:
+        limit = max(int(request.query_params.get("limit", "50")), 0)
+    except ValueError:
+        return JSONResponse({"error": "limit debe ser un número entero"}, status_code=400)
+    return JSONResponse(await library.search_async(request.query_params.get("q", ""), limit))
+
+
+async def api_reverse(request: Request) -> Response:
+    """Convierte una plantilla Unraid (cuerpo XML) en un Docker Compose con su servicio."""
+    generate_trace_id("api")
+    if not _api_authorized(request):
+        return JSONResponse({"error": "No autorizado"}, status_code=401)
+    chunks = []
+    total = 0
+    try:
+        async for chunk in request.stream():
+            total += len(chunk)
+            check_size(total, COMPOSE_MAX_BYTES)
+            chunks.append(chunk)
+        key, service = await run_converter(reverse_template_job, b"".join(chunks).decode("utf-8"))
+    except ReverseError as e:
+        API_CONVERSIONS.inc(endpoint="reverse", result="error")
+        return JSONResponse({"error": f"Plantilla no válida: {e}"}, status_code=422)
+    except Exception as e:
+        API_CONVERSIONS.inc(endpoint="reverse", result="error")
+        return _error_response(e)
+    API_CONVERSIONS.inc(endpoint="reverse", result="ok")
+    return Response(
+        dump_compose({key: service}),
+        media_type="application/yaml",
+        headers={"Content-Disposition": f'attachment; filename="{key}.yml"'},
+    )
+
+
+async def api_templates_compose(request: Request) -> Response:
+    """
+    Docker Compose con un servicio por plantilla de la carpeta de plantillas.
+
+    Se envía servicio a servicio; las plantillas que no se pueden convertir se
+    indican en comentarios al final. Exige token, como /api/templates.zip.
+    """
+    generate_trace_id("api")
+    denied = _templates_authorized(request)
+    if denied is not None:
+        return denied
+
+    async def compose() -> AsyncIterator[str]:
+        used, errors = set(), []
+        yield "services:\n"
+        async for name, content in directory_entries(TEMPLATES_DIR):
+            try:
+                key, service = await run_converter(reverse_template_job, content.decode("utf-8"))
+            except Exception as e:
+                API_CONVERSIONS.inc(endpoint="templates_compose", result="error")
+                errors.append(f"{name}: {e}")
+                continue
+            API_CONVERSIONS.inc(endpoint="templates_compose", result="ok")
+            yield service_fragment(unique_key(key, used), service)
+        if not used:
+            yield "  {}\n"
+        for error in errors:
+            yield f"# Error: {error}\n"
+
+    return StreamingResponse(
+        compose(),
+        media_type="application/yaml",
+        headers={"Content-Disposition": 'attachment; filename="docker-compose.yml"'},
+    )
+
+
+def register_session_metrics(app: rx.App):
+    """Añade a /metrics el número de sesiones con conexión activa."""
+    def collector():
+        namespace = app.event_namespace
+        sessions = len(namespace.token_to_sid) if namespace is not None else 0
+        yield ("unposer_active_sessions", "gauge", "Sesiones con conexión activa.", [({}, sessions)])
+
+    REGISTRY.register_collector(collector)
+
+
+api = Starlette(routes=[
+    Route("/metrics", metrics, methods=["GET"]),
+    Route("/admin/profiling", admin_profiling, methods=["GET", "POST"]),
+    Route("/admin/sessions", admin_sessions, methods=["GET", "POST"]),
+    Route("/api/convert", api_convert, methods=["POST"]),
+    Route("/api/convert/batch", api_convert_batch, methods=["POST"]),
+    Route("/api/convert/zip", api_convert_zip, methods=["POST"]),
+    Route("/api/bundle/{ticket}", api_bundle, methods=["GET"]),
+    Route("/api/templates.zip", api_templates_zip, methods=["GET"]),
+    Route("/api/library", api_library, methods=["GET"]),
+    Route("/api/reverse", api_reverse, methods=["POST"]),
+    Route("/api/templates/compose", api_templates_compose, methods=["GET"]),
+])
@@ -1,11 +1,28 @@
 import reflex as rx
-from typing import List
-import requests
-import re
-import yaml
+from typing import ClassVar, Dict, List
+import time
 import os
 
+from unposer.utils.config import IMPORT_PROGRESS_INTERVAL, TEMPLATES_DIR
 from unposer.utils.converter import UnraidTemplateConverter
+from unposer.utils.bundle import create_ticket
+from unposer.utils.cache import generate_template_cached
+from unposer.utils.catalog import lookup_image
+from unposer.utils.executor import parse_compose_job, run_converter
+from unposer.utils.github import GithubComposeFinder, ImportCancelled
+from unposer.utils.httpclient import http_head
+from unposer.utils.library import library
+from unposer.utils.limits import read_upload_limited
+from unposer.utils.preview import TemplatePreview
+from unposer.utils.profiling import profiled
+from unposer.utils.readme import extract_docker_compose_from_readme
+from unposer.utils.reference import guess_github_repository
+from unposer.utils.storage import save_file
+from unposer.utils.sync import SyncConflict, apply_patch, request_full_sync
+from unposer.utils.tracing import span
+from unposer.utils.utils import setup_logger, template_filename
+
+logger = setup_logger(__name__)
 
 class MainState(rx.State):
     """Estado principal de la aplicación."""
@@ -14,7 +31,13 @@ class MainState(rx.State):
     active_tab: str = "compose"
     
     # Estados para la primera pestaña - Docker Compose
+    # docker_compose_text es el texto enviado completo al editor; las ediciones
+    # llegan como parches y se aplican sobre _compose_text (fuente de verdad)
     docker_compose_text: str = ""
+    _compose_text: str = ""
+    docker_compose_version: int = 0
+    docker_compose_ack: int = 0
+    docker_compose_base: int = 0
     github_repo_url: str = ""
     has_loaded_docker_compose: bool = False
     found_compose_branch: str = ""
@@ -42,20 +65,38 @@ class MainState(rx.State):
     ]
     
     # Estados para la tercera pestaña - Plantilla Unraid
+    # unraid_template es el texto enviado completo al editor Monaco; las ediciones
+    # llegan como parches y se aplican sobre _download_xml
     unraid_template: str = ""
     formatted_xml: str = ""
-    download_xml: str = ""
+    _download_xml: str = ""
+    unraid_template_version: int = 0
+    unraid_template_ack: int = 0
+    unraid_template_base: int = 0
     has_generated_template: bool = False
+
+    # Vista previa en vivo de la plantilla (solo regenera los fragmentos que cambian)
+    live_preview: bool = False
+    preview_xml: str = ""
+    _preview: TemplatePreview | None = None
+
+    # Biblioteca de plantillas: conflictos con las ya guardadas y búsqueda por nombre o repositorio
+    library_conflicts: List[str] = []
+    library_query: str = ""
+    library_results: List[Dict[str, str]] = []
+
+    # Indica que hay un trabajo del conversor en curso
+    is_converting: bool = False
     
     # Estados para manejar puertos web
     available_ports: List[str] = []
     selected_web_port: str = ""
     
-    # Instancia del conversor
-    _converter: UnraidTemplateConverter = UnraidTemplateConverter()
+    # Instancia del conversor (ClassVar: compartida por todas las sesiones, no se copia en cada estado)
+    _converter: ClassVar[UnraidTemplateConverter] = UnraidTemplateConverter()
     
     # Listas de prioridad para búsqueda de docker-compose
-    _priority_compose_paths = [
+    _priority_compose_paths: ClassVar[List[str]] = [
         "/docker-compose.yml",             
         "/docker-compose.yaml",
         "/docker-compose.example.yml",      
@@ -69,13 +110,20 @@ class MainState(rx.State):
     # Estado de carga del compose
     is_loading_compose: bool = False
 
-    _priority_branches = [
+    # Progreso de la importación desde GitHub; _import_id identifica la importación
+    # vigente (una nueva importación o una cancelación lo incrementan)
+    import_stage: str = ""
+    import_requests: int = 0
+    import_elapsed: float = 0.0
+    _import_id: int = 0
+
+    _priority_branches: ClassVar[List[str]] = [
         "main",
         "master",
     ]
 
     # Definición de prioridades para validación de composes
-    _compose_validation_priority = [
+    _compose_validation_priority: ClassVar[List[dict]] = [
         {
             'priority': 1,
             'required_fields': ['services', 'image'],
@@ -99,7 +147,7 @@ class MainState(rx.State):
     def _reset_fields(self):
         """Reinicia todas las variables de la aplicación sin mostrar mensaje."""
         # Reinicio de estados de la primera pestaña
-        self.docker_compose_text = ""
+        self._load_compose_text("")
         self.github_repo_url = ""
         self.has_loaded_docker_compose = False
         self.found_compose_branch = ""
@@ -121,10 +169,11 @@ class MainState(rx.State):
         self.selected_web_port = ""
         
         # Reinicio de estados de la tercera pestaña
-        self.unraid_template = ""
-        self.formatted_xml = ""
-        self.download_xml = ""
+        self._load_unraid_template("")
         self.has_generated_template = False
+        self.library_conflicts = []
+        self._preview = None
+        self.preview_xml = ""
         
 
     def reset_app(self):
@@ -132,32 +181,49 @@ class MainState(rx.State):
         self._reset_fields()
         yield rx.toast.success("Todos los campos han sido reiniciados.")
     
-    def next_tab(self):
+    async def next_tab(self):
         """Avanza a la siguiente pestaña."""
         if self.active_tab == "compose":
             # Validamos el cambio a la pestaña de opciones
-            yield from self.validate_tab_change("options")
+            async for event in self.validate_tab_change("options"):
+                yield event
         elif self.active_tab == "options":
             # Validamos el cambio a la pestaña de plantilla
-            yield from self.validate_tab_change("template")
+            async for event in self.validate_tab_change("template"):
+                yield event
             if self.active_tab == "template":
                 # Si el cambio fue exitoso, mostramos el mensaje de éxito
                 yield rx.toast.success("Plantilla generada correctamente.")
     
-    def set_docker_compose(self, text: str):
-        """Establece el texto del Docker Compose."""
+    def _load_compose_text(self, text: str):
+        """Reemplaza el Docker Compose desde el servidor y lo envía completo al editor."""
+        self._compose_text = text
+        self.docker_compose_version += 1
         self.docker_compose_text = text
-        
-    def set_icon_method(self, method: str):
+        self.docker_compose_base = self.docker_compose_version
+
+    async def patch_docker_compose(self, patch: dict):
+        """Aplica un parche incremental enviado por el editor del Docker Compose."""
+        try:
+            self._compose_text = apply_patch(self._compose_text, self.docker_compose_version, patch)
+        except SyncConflict as e:
+            logger.debug("Conflicto al sincronizar el Docker Compose: %s", e)
+            return request_full_sync("compose", MainState.patch_docker_compose)
+        self.docker_compose_version += 1
+        self.docker_compose_ack = patch.get("seq", 0)
+        await self._refresh_preview()
+        
+    async def set_icon_method(self, method: str):
         """Establece el método para seleccionar el icono."""
         self.icon_method = method
         # Limpiar la vista previa al cambiar el método
         self.preview_icon_url = ""
+        await self._refresh_preview()
         
     # Variable para rastrear si ya se mostró un mensaje de error
     _error_shown: bool = False
     
-    def handle_tab_change(self, tab_value: str):
+    async def handle_tab_change(self, tab_value: str):
         """Maneja el cambio de pestaña desde el componente tabs."""
         # Si la pestaña actual ya es la que se quiere cambiar, no hacemos nada
         if self.active_tab == tab_value:
@@ -168,7 +234,7 @@ class MainState(rx.State):
         
         # Si el usuario intenta cambiar a una pestaña distinta de "compose" 
         # y el Docker Compose está vacío
-        if tab_value != "compose" and not self.docker_compose_text:
+        if tab_value != "compose" and not self._compose_text:
             # Mostrar un mensaje de error solo si no se ha mostrado antes
             yield rx.toast.error("Por favor, introduce el contenido del archivo Docker Compose antes de continuar y pulsa Siguiente.")
             self._error_shown = True
@@ -188,7 +254,9 @@ class MainState(rx.State):
             try:
                 # Solo generamos la plantilla si ya hemos cargado el Docker Compose
                 if self.has_loaded_docker_compose:
-                    self._generate_template()
+                    self.is_converting = True
+                    yield
+                    await self._generate_template()
                     self.has_generated_template = True
                 else:
                     # Si no ha cargado Docker Compose, mostrar error
@@ -197,11 +265,14 @@ class MainState(rx.State):
             except Exception as e:
                 yield rx.toast.error(f"Error al generar la plantilla: {str(e)}")
                 return
+            finally:
+                self.is_converting = False
             
         # Si todo está bien, permitir el cambio
         self.active_tab = tab_value
     
-    def validate_tab_change(self, tab_value: str):
+    @profiled
+    async def validate_tab_change(self, tab_value: str):
         """Valida si se puede cambiar a una pestaña y realiza el cambio si es válido."""
         # Si la pestaña actual ya es la que se quiere cambiar, no hacemos nada
         if self.active_tab == tab_value:
@@ -209,7 +280,7 @@ class MainState(rx.State):
         
         # Si el usuario intenta cambiar a una pestaña distinta de "compose" 
         # y el Docker Compose está vacío
-        if tab_value != "compose" and not self.docker_compose_text:
+        if tab_value != "compose" and not self._compose_text:
             # Mostrar un mensaje de error
             yield rx.toast.error("Por favor, introduce el contenido del archivo Docker Compose antes de continuar y pulsa Siguiente.")
             # No permitir el cambio de pestaña
@@ -219,8 +290,12 @@ class MainState(rx.State):
         if tab_value == "options":
             # Siempre procesamos el Docker Compose actual para actualizar los puertos y otras configuraciones
             try:
+                # Mostramos el estado de carga mientras el conversor trabaja
+                self.is_converting = True
+                yield
+
                 # Extraer los puertos del Docker Compose
-                docker_compose_data = self._converter.parse_docker_compose(self.docker_compose_text)
+                docker_compose_data = await run_converter(parse_compose_job, self._compose_text)
                 
                 # Verificar que el Docker Compose contiene el campo 'image'
                 if 'image' not in docker_compose_data:
@@ -239,9 +314,14 @@ class MainState(rx.State):
                         # No seleccionamos automáticamente ningún puerto
                         self.selected_web_port = "No seleccionar puerto"
                 
+                # Imágenes conocidas: datos del catálogo offline, sin peticiones de red
+                if self._try_configure_from_catalog(docker_compose_data):
+                    await self._refresh_preview()
+                    yield rx.toast.success("Datos de la aplicación rellenados desde el catálogo de imágenes.")
+
                 # Si aún no tenemos URLs configuradas, intentamos configurarlas desde el compose
                 if not any([self.support_url, self.project_url, self.github_repo_icon_url]):
-                    if self._try_configure_github_urls_from_compose(self.docker_compose_text):
+                    if self._try_configure_github_urls_from_compose(self._compose_text, docker_compose_data):
                         yield rx.toast.success("URLs de GitHub configuradas automáticamente desde el compose.")
                         
                         # Si se ha configurado el método de icono como GitHub, buscar imágenes automáticamente
@@ -260,6 +340,8 @@ class MainState(rx.State):
             except Exception as e:
                 yield rx.toast.warning(f"Error al procesar el Docker Compose: {str(e)}")
                 return
+            finally:
+                self.is_converting = False
             
         # Si intenta ir a la pestaña "template"
         if tab_value == "template":
@@ -267,7 +349,9 @@ class MainState(rx.State):
             try:
                 # Solo generamos la plantilla si ya hemos cargado el Docker Compose
                 if self.has_loaded_docker_compose:
-                    self._generate_template()
+                    self.is_converting = True
+                    yield
+                    await self._generate_template()
                     self.has_generated_template = True
                 else:
                     # Si no ha cargado Docker Compose, mostrar error
@@ -276,6 +360,8 @@ class MainState(rx.State):
             except Exception as e:
                 yield rx.toast.error(f"Error al generar la plantilla: {str(e)}")
                 return
+            finally:
+                self.is_converting = False
             
         # Si todo está bien, permitir el cambio
         self.active_tab = tab_value
@@ -291,19 +377,24 @@ class MainState(rx.State):
             if isinstance(file, bytes):
                 content = file
             else:
-                content = await file.read()
+                # Leemos por bloques y abortamos si supera el tamaño máximo
+                content = await read_upload_limited(file)
             
             compose_content = content.decode("utf-8")
             
             try:
                 # Verificar que es un docker-compose válido con el campo image
-                compose_data = self._converter.parse_docker_compose(compose_content)
+                compose_data = await run_converter(parse_compose_job, compose_content)
                 if 'image' in compose_data:
-                    self.docker_compose_text = compose_content
+                    self._load_compose_text(compose_content)
+                    await self._refresh_preview()
                     yield rx.toast.success("Archivo Docker Compose válido cargado correctamente.")
                     
-                    # Intentamos configurar las URLs de GitHub automáticamente
-                    if self._try_configure_github_urls_from_compose(compose_content):
+                    # Datos del catálogo de imágenes conocidas o, si no, URLs de GitHub deducidas de la imagen
+                    if self._try_configure_from_catalog(compose_data):
+                        await self._refresh_preview()
+                        yield rx.toast.success("Datos de la aplicación rellenados desde el catálogo de imágenes.")
+                    elif self._try_configure_github_urls_from_compose(compose_content, compose_data):
                         yield rx.toast.success("URLs de GitHub configuradas automáticamente desde el compose.")
                 else:
                     yield rx.toast.error("El archivo cargado no contiene el campo 'image' que es necesario para generar la plantilla.")
@@ -312,255 +403,127 @@ class MainState(rx.State):
         except Exception as e:
             yield rx.toast.error(f"Error al cargar el archivo: {str(e)}")
             
+    @rx.event(background=True)
+    @profiled
     async def load_docker_compose_from_github(self):
-        """Carga un archivo Docker Compose desde un repositorio de GitHub."""
-        if not self.github_repo_url:    
+        """
+        Carga un archivo Docker Compose desde un repositorio de GitHub.
+
+        Se ejecuta como tarea en segundo plano: el progreso se publica en import_stage,
+        import_requests e import_elapsed, y una nueva importación (o cancel_github_import)
+        sustituye a la que esté en curso.
+        """
+        async with self:
+            repo_url = self.github_repo_url
+            if repo_url:
+                self._import_id += 1
+                import_id = self._import_id
+
+                # Limpiamos todos los campos conservando la URL
+                self._reset_fields()
+                self.github_repo_url = repo_url
+
+                self.is_loading_compose = True
+                self.import_stage = "Iniciando"
+                self.import_requests = 0
+                self.import_elapsed = 0.0
+
+        if not repo_url:
             yield rx.toast.error(f"Por favor, introduce la URL de un repositorio válido.")
             return
-            
-        # Guardamos la URL actual antes de limpiar
-        current_url = self.github_repo_url
-        
-        # Limpiamos todos los campos usando la función existente
-        self._reset_fields()
-        
-        # Restauramos la URL
-        self.github_repo_url = current_url
-            
-        # Activamos el estado de carga
-        self.is_loading_compose = True
-        # Aseguramos que el estado se actualice inmediatamente
-        yield
-        
-        try:
-            # Preparamos la URL base del repositorio
-            base_url = self.github_repo_url.rstrip('/')
-            if "blob" in base_url:
-                base_url = base_url.split("/blob/")[0]
-            elif "raw" in base_url:
-                base_url = base_url.split("/raw/")[0]
-                
-            # Si es una URL normal de GitHub, la convertimos al formato raw para acceder a archivos
-            raw_base_url = base_url.replace("github.com", "raw.githubusercontent.com")
-            api_base_url = base_url.replace("github.com", "api.github.com/repos")
-            
-            # Determinar la rama principal (main o master)
-            branch = "main"  # Por defecto asumimos main
-            try:
-                # Consultar información del repositorio para obtener la rama por defecto
-                repo_info_url = f"{api_base_url}"
-                repo_response = requests.get(repo_info_url)
-                if repo_response.status_code == 200:
-                    repo_data = repo_response.json()
-                    branch = repo_data.get('default_branch', 'main')
-                else:
-                    # Intentamos con main y si falla usaremos master más adelante
-                    test_url = f"{raw_base_url}/main/README.md"
-                    test_response = requests.get(test_url)
-                    if test_response.status_code != 200:
-                        branch = "master"
-            except Exception as e:
-                # Si hay algún error, seguimos con las ramas por defecto
-                pass
 
-            # Inicializamos las variables que contendrán el compose encontrado
-            compose_text = None
-            best_priority = float('inf')  # Inicializamos con prioridad infinita para que cualquier compose sea mejor
-                
-            # 1. Primero buscamos exactamente los archivos prioritarios
-            for compose_path in self._priority_compose_paths:
-                try:
-                    full_path = f"/{branch}{compose_path}"
-                    compose_url = f"{raw_base_url}{full_path}"
-                    response = requests.get(compose_url)
-                    
-                    if response.status_code == 200:
-                        result = self._process_compose_content(response.text, compose_path, branch)
-                        if result:
-                            priority, compose_data, content = result
-                            
-                            # Guardamos el mejor compose encontrado hasta ahora
-                            if compose_text is None or priority < best_priority:
-                                # Procesamos el path para extraer la información correctamente
-                                path_parts = full_path.split('/')
-                                self.found_compose_branch = path_parts[1]  # rama
-                                if len(path_parts) > 3:
-                                    self.found_compose_directory = '/'.join(path_parts[2:-1])
-                                else:
-                                    self.found_compose_directory = ""
-                                self.found_compose_filename = path_parts[-1]
-                                compose_text = content
-                                best_priority = priority
-                                yield rx.toast.success(f"Docker Compose válido encontrado en {compose_path} (prioridad {priority})")
-                except Exception:
-                    continue
+        last_update = 0.0
 
-            if not compose_text:
-                # 2. Si no encontramos en los paths prioritarios, buscamos en el README
-                yield rx.toast.info("No se encontró un archivo docker-compose.yml directamente. Buscando en el README...")
-                
-                readme_paths = [
-                    f"/{branch}/README.md",
-                    f"/{branch}/readme.md"
-                ]
-                # Extender la búsqueda a otras ramas prioritarias
-                for alt_branch in [b for b in self._priority_branches if b != branch]:
-                    readme_paths.extend([
-                        f"/{alt_branch}/README.md",
-                        f"/{alt_branch}/readme.md"
-                    ])
+        async def progress(finder: GithubComposeFinder) -> bool:
+            """Publica el progreso (como mucho cada IMPORT_PROGRESS_INTERVAL) y comprueba si sigue vigente."""
+            nonlocal last_update
+            async with self:
+                if self._import_id != import_id:
+                    return False
+                now = time.monotonic()
+                if finder.stage != self.import_stage or now - last_update >= IMPORT_PROGRESS_INTERVAL:
+                    self.import_stage = finder.stage
+                    self.import_requests = finder.requests
+                    self.import_elapsed = round(finder.elapsed, 1)
+                    last_update = now
+            return True
 
-                # Buscar en los README
-                readme_text = None
-                for readme_path in readme_paths:
-                    try:
-                        readme_url = f"{raw_base_url}{readme_path}"
-                        readme_response = requests.get(readme_url)
-                        if readme_response.status_code == 200:
-                            readme_text = readme_response.text
-                            break
-                    except:
-                        continue
-                
-                if readme_text:
-                    # Encontramos el README, ahora buscamos bloques docker-compose
-                    compose_text = self._extract_docker_compose_from_readme(readme_text)
-                    
-                    if compose_text:
-                        # Actualizar información de ubicación para composes encontrados en README
-                        self.found_compose_branch = branch
-                        self.found_compose_directory = ""  # En el directorio raíz
-                        self.found_compose_filename = "README.md"
-                        yield rx.toast.success("Se encontró un Docker Compose válido en el README.")
-                
-                if not compose_text:
-                    # 3. Si no encontramos en el README ni en las rutas prioritarias, buscamos en todo el repositorio
-                    yield rx.toast.info("No se encontró un Docker Compose en el README. Buscando en otros directorios...")
-                        
-                    # Buscamos usando la API de GitHub para encontrar archivos docker-compose en cualquier ubicación
-                    try:
-                        # Obtenemos la estructura del repositorio
-                        contents_url = f"{api_base_url}/git/trees/{branch}?recursive=1"
-                        contents_response = requests.get(contents_url)
-                        if contents_response.status_code == 200:
-                            contents = contents_response.json()
-                            docker_compose_files = []
-                                
-                            # Primero buscamos los archivos que coinciden con nuestros patrones prioritarios
-                            for priority_path in self._priority_compose_paths:
-                                # Quitamos la barra inicial para coincidir con el formato de GitHub
-                                search_file = priority_path.lstrip('/')
-                                for item in contents.get('tree', []):
-                                    if item.get('type') == 'blob' and item.get('path'):
-                                        if item.get('path').endswith(search_file):
-                                            docker_compose_files.append(item.get('path'))
-                            
-                            # Si no encontramos ningún archivo prioritario, entonces buscamos cualquier docker-compose
-                            if not docker_compose_files:
-                                for item in contents.get('tree', []):
-                                    if item.get('type') == 'blob' and item.get('path'):
-                                        path = item.get('path')
-                                        if path.endswith('docker-compose.yml') or path.endswith('docker-compose.yaml'):
-                                            docker_compose_files.append(path)
-                            
-                            # Intentar cargar cada archivo encontrado
-                            for file_path in docker_compose_files:
-                                try:
-                                    file_url = f"{raw_base_url}/{branch}/{file_path}"
-                                    file_response = requests.get(file_url)
-                                    if file_response.status_code == 200:
-                                        try:
-                                            compose_data = self._converter.parse_docker_compose(file_response.text)
-                                            if 'image' in compose_data:
-                                                compose_text = file_response.text
-                                                # Actualizamos la información de ubicación
-                                                path_parts = file_path.split('/')
-                                                self.found_compose_branch = branch
-                                                if len(path_parts) > 1:
-                                                    self.found_compose_directory = '/'.join(path_parts[:-1])
-                                                else:
-                                                    self.found_compose_directory = ""
-                                                self.found_compose_filename = path_parts[-1]
-                                                yield rx.toast.success(f"Docker Compose válido encontrado en {file_path}")
-                                                break
-                                        except:
-                                            continue
-                                except:
-                                    continue
-                            
-                            if not compose_text:
-                                yield rx.toast.error("No se encontró un archivo docker-compose válido en el repositorio.")
-                        
-                    except Exception as e:
-                        yield rx.toast.error(f"Error al buscar en el repositorio: {str(e)}")
-                        return
-                # Si no se encontró ningún compose, lo indicamos
-                if not compose_text:
-                    yield rx.toast.error("No se encontró un Docker Compose válido en el repositorio.")
-            
-            # Desactivamos el estado de carga antes de procesar el resultado
-            self.is_loading_compose = False
-            
-            # Si encontramos un compose_text válido, lo procesamos
-            if compose_text:
-                try:
-                    # Verificamos que es un docker-compose válido
-                    compose_data = self._converter.parse_docker_compose(compose_text)
-                    if 'image' in compose_data:
-                        self.docker_compose_text = compose_text
-                        yield rx.toast.success("Docker Compose cargado exitosamente.")
-                        self.has_loaded_docker_compose = True
-                    else:
-                        yield rx.toast.error("El archivo encontrado no contiene el campo 'image' requerido.")
-                except Exception as e:
-                    yield rx.toast.error(f"Error al procesar el Docker Compose: {str(e)}")
-            else:
-                yield rx.toast.error("No se encontró un Docker Compose válido en el repositorio.")
-                return
-            
-            # Si llegamos aquí, tenemos un compose válido
-            if compose_text:
-                try:
-                    # Configuramos automáticamente las URLs
-                    self.project_url = base_url
-                    self.support_url = f"{base_url}/releases"
-                    self.github_repo_icon_url = base_url
-                    self.icon_method = "github"
-                    
-                    # Intentamos obtener la descripción del repositorio desde el About
-                    try:
-                        # Usamos la API de GitHub para obtener la descripción del repositorio
-                        repo_info_url = f"{api_base_url}"
-                        repo_response = requests.get(repo_info_url)
-                        if repo_response.status_code == 200:
-                            repo_data = repo_response.json()
-                            if 'description' in repo_data and repo_data['description']:
-                                self.template_description = repo_data['description']
-                            elif 'name' in repo_data:
-                                # Si no hay descripción, usamos el nombre del repo
-                                self.template_description = f"Plantilla para {repo_data['name']}"
-                    except Exception as e:
-                        yield rx.toast.warning(f"No se pudo obtener la descripción del repositorio: {str(e)}")
-                    
-                    # Intentamos buscar imágenes
-                    try:
-                        self.search_github_images()
-                    except Exception as e:
-                        pass
-                    
-                    # Marcamos como exitoso y mostramos mensaje
-                    self.has_loaded_docker_compose = True
-                    yield rx.toast.success("Docker Compose válido cargado correctamente desde el repositorio.")
-                except Exception as e:
-                    yield rx.toast.error(f"Error al procesar el Docker Compose: {str(e)}")
-                    
+        finder = GithubComposeFinder(
+            repo_url,
+            self._priority_compose_paths,
+            self._priority_branches,
+            self._compose_validation_priority,
+            progress=progress,
+        )
+        candidate = None
+        images = []
+        try:
+            with span("github_import", repo=finder.base_url):
+                candidate = await finder.find()
+                if candidate:
+                    candidate['text'] = await finder.resolve(candidate)
+                    images = await finder.find_images()
+        except ImportCancelled:
+            logger.info("Importación de %s cancelada tras %s peticiones", finder.base_url, finder.requests)
+            return
         except Exception as e:
-            yield rx.toast.error(f"Error al cargar el archivo desde GitHub: {str(e)}")
-        
-        finally:
-            # Nos aseguramos de que el estado de carga se desactive siempre
+            finder.notify("error", f"Error al cargar el archivo desde GitHub: {str(e)}")
+
+        logger.info("Importación de %s terminada en %.1f s con %s peticiones", finder.base_url, finder.elapsed, finder.requests)
+
+        async with self:
+            # Una importación posterior o una cancelación descartan este resultado
+            if self._import_id != import_id:
+                return
+
             self.is_loading_compose = False
-            
+            self.import_stage = ""
+            self.import_requests = finder.requests
+            self.import_elapsed = round(finder.elapsed, 1)
+
+            if candidate:
+                self._load_compose_text(candidate['text'])
+                self.found_compose_branch = candidate['branch']
+                self.found_compose_directory = candidate['directory']
+                self.found_compose_filename = candidate['filename']
+
+                # Configuramos automáticamente las URLs
+                self.project_url = finder.base_url
+                self.support_url = f"{finder.base_url}/releases"
+                self.github_repo_icon_url = finder.base_url
+                self.icon_method = "github"
+
+                # Descripción del repositorio desde el About (ya consultado al buscar la rama)
+                repo_data = finder.repo_data or {}
+                if repo_data.get('description'):
+                    self.template_description = repo_data['description']
+                elif repo_data.get('name'):
+                    self.template_description = f"Plantilla para {repo_data['name']}"
+
+                if images:
+                    self.github_images = ["No seleccionar imagen"] + images
+
+                self.has_loaded_docker_compose = True
+                await self._refresh_preview()
+                finder.notify("success", "Docker Compose válido cargado correctamente desde el repositorio.")
+            elif not any(level == "error" for level, _ in finder.messages):
+                finder.notify("error", "No se encontró un Docker Compose válido en el repositorio.")
+
+        # Un único aviso por tipo de mensaje
+        for level in ("error", "warning", "success", "info"):
+            messages = [message for message_level, message in finder.messages if message_level == level]
+            if messages:
+                yield getattr(rx.toast, level)(" ".join(messages))
+
+    def cancel_github_import(self):
+        """Cancela la importación desde GitHub en curso."""
+        if not self.is_loading_compose:
+            return
+        self._import_id += 1
+        self.is_loading_compose = False
+        self.import_stage = ""
+        return rx.toast.info("Importación cancelada.")
+
     def _extract_docker_compose_from_readme(self, readme_text):
         """
         Extrae un bloque docker-compose válido desde el contenido del README.
@@ -571,162 +534,109 @@ class MainState(rx.State):
         Returns:
             Texto del docker-compose si se encuentra, None en caso contrario
         """
-        # Estrategia 1: Buscar bloques de código markdown explícitamente marcados
-        code_patterns = [
-            # Formato markdown estándar para bloques de código
-            r'```ya?ml\s+([\s\S]*?)```',                    # Bloque de código YAML 
-            r'```docker[\-\s]?compose\s+([\s\S]*?)```',     # Bloque de código docker-compose
-            r'```\s+version:[\s\S]*?services:[\s\S]*?```',  # Bloque con formato docker-compose sin especificación
-            r'```\s+services:[\s\S]*?```',                  # docker-compose moderno (sin version)
-            
-            # Formatos HTML para bloques de código
-            r'<pre>\s*version:[\s\S]*?services:[\s\S]*?</pre>',
-            r'<pre>\s*services:[\s\S]*?</pre>',
-            r'<code>\s*version:[\s\S]*?services:[\s\S]*?</code>',
-            r'<code>\s*services:[\s\S]*?</code>',
-            
-            # Bloques que contienen claves docker-compose típicas
-            r'```[\s\S]*?services:[\s\S]*?image:[\s\S]*?```',
-            r'<pre>[\s\S]*?services:[\s\S]*?image:[\s\S]*?</pre>'
-        ]
-        
-        # Buscar todos los bloques de código que coincidan con los patrones
-        potential_blocks = []
-        
-        for pattern in code_patterns:
-            matches = re.findall(pattern, readme_text)
-            if matches:
-                # Tenemos que manejar grupos de captura o bloques completos
-                for match in matches:
-                    if isinstance(match, str):
-                        # Si el patrón captura todo el bloque incluyendo los delimitadores
-                        if match.strip().startswith('```') or match.strip().startswith('<pre>'):
-                            # Extraer solo el contenido entre los delimitadores
-                            content = re.sub(r'^```\w*\s*|\s*```$', '', match.strip())
-                            content = re.sub(r'^<pre>\s*|\s*</pre>$', '', content.strip())
-                            content = re.sub(r'^<code>\s*|\s*</code>$', '', content.strip())
-                        else:
-                            content = match.strip()
-                    else:
-                        # El primer grupo capturado es el contenido
-                        content = match[0].strip() if match else ""
-                    
-                    potential_blocks.append(content)
-        
-        # Estrategia 2: Buscar URL a archivos docker-compose en el README
-        docker_compose_urls = re.findall(r'(https?://[^\s\)\"\']+(?:docker-compose\.ya?ml))', readme_text)
-        for url in docker_compose_urls:
-            try:
-                url_response = requests.get(url)
-                if url_response.status_code == 200:
-                    potential_blocks.append(url_response.text)
-            except:
-                continue
-        
-        # Filtrar y validar bloques para encontrar docker-compose válidos
-        for block in potential_blocks:
-            try:
-                # Solo si tiene al menos 2 líneas y contiene "services:" o "image:"
-                if len(block.strip().split('\n')) >= 2 and ('services:' in block or 'image:' in block):
-                    compose_data = self._converter.parse_docker_compose(block)
-                    if 'image' in compose_data:
-                        return block
-            except Exception:
-                continue
-                
-        # Estrategia 3: Intentar extraer bloques de código indentados que no están marcados explícitamente
-        # Buscamos patrones que parezcan docker-compose pero no están en bloques de código formales
-        indented_block_patterns = [
-            r'(?:^|\n)(\s+services:[\s\S]*?)(?=\n\S|\Z)',  # Bloques indentados que comienzan con services:
-            r'(?:^|\n)(\s+version:[\s\S]*?services:[\s\S]*?)(?=\n\S|\Z)'  # Bloques indentados que comienzan con version:
-        ]
-        
-        for pattern in indented_block_patterns:
-            matches = re.findall(pattern, readme_text)
-            for match in matches:
-                try:
-                    # Desindentamos para normalizar
-                    lines = match.splitlines()
-                    if not lines:
-                        continue
-                        
-                    # Encontrar la indentación mínima
-                    min_indent = float('inf')
-                    for line in lines:
-                        if line.strip():  # Solo líneas no vacías
-                            current_indent = len(line) - len(line.lstrip())
-                            min_indent = min(min_indent, current_indent)
-                    
-                    if min_indent == float('inf'):
-                        continue
-                    
-                    # Desidentar todas las líneas
-                    normalized_lines = [line[min_indent:] if len(line) >= min_indent else line for line in lines]
-                    normalized_block = '\n'.join(normalized_lines)
-                    
-                    # Validar como docker-compose
-                    compose_data = self._converter.parse_docker_compose(normalized_block)
-                    if 'image' in compose_data:
-                        return normalized_block
-                except Exception:
-                    continue
-        
-        # No se encontró un bloque docker-compose válido
-        return None
-            
-    def _generate_template(self):
+        return extract_docker_compose_from_readme(readme_text, self._converter)
+
+    @profiled
+    async def _generate_template(self):
         """Genera la plantilla de Unraid a partir del Docker Compose."""
         try:
-            # Parsear el Docker Compose
-            docker_compose_data = self._converter.parse_docker_compose(self.docker_compose_text)
-            
-            # Determinar la URL del icono según el método seleccionado
-            icon_url = ""
-            if self.icon_method == "url" and self.external_icon_url:
-                icon_url = self.external_icon_url
-            elif self.icon_method == "github" and self.selected_github_image:
-                icon_url = self.selected_github_image
-            elif self.icon_method == "upload" and self.preview_icon_url and self.preview_icon_url.startswith("http"):
-                icon_url = self.preview_icon_url
-            
-            # Crear un diccionario con los campos de la aplicación
-            app_fields = {
-                'Icon': icon_url,
-                'Overview': self.template_description,
-                'Support': self.support_url,
-                'Project': self.project_url,
-                'Category': self.selected_category
-            }
-            
-            # Generar la plantilla
-            web_port = self.selected_web_port if self.selected_web_port and self.selected_web_port != "No seleccionar puerto" else ""
-            self.unraid_template = self._converter.generate_unraid_template(
-                docker_compose_data,
-                icon_url,
-                self.template_description,
-                web_port,
-                app_fields
-            )
+            # Determinar la URL del icono y los campos de la aplicación
+            icon_url = self._get_icon_url()
+            app_fields = self._get_app_fields()
+            
+            # Parsear el Docker Compose y generar la plantilla fuera del bucle de eventos,
+            # reutilizando la caché compartida si otra sesión ya hizo la misma conversión
+            web_port = self._get_web_port()
+            with span("generate_template"):
+                template = await generate_template_cached(
+                    self._converter.mapping_version,
+                    self._compose_text,
+                    icon_url,
+                    self.template_description,
+                    web_port,
+                    app_fields
+                )
             
             # Formatear la plantilla para visualización y descarga
-            self.formatted_xml = self.unraid_template
-            self.download_xml = self.unraid_template
+            self._load_unraid_template(template)
             
             # Marcamos que la plantilla ha sido generada
             self.has_generated_template = True
             
             # Preparar el nombre del archivo para descarga
             self.prepare_download_filename()
+
+            # Avisar de antemano si choca con las plantillas ya guardadas
+            await self._check_library_conflicts()
             
         except Exception as e:
-            self.unraid_template = f"Error al generar la plantilla: {str(e)}"
+            self._load_unraid_template(f"Error al generar la plantilla: {str(e)}")
             self.has_generated_template = False
             
-    def set_external_icon_url(self, url: str):
+    def _get_icon_url(self) -> str:
+        """Determina la URL del icono según el método seleccionado."""
+        if self.icon_method == "url" and self.external_icon_url:
+            return self.external_icon_url
+        elif self.icon_method == "github" and self.selected_github_image:
+            return self.selected_github_image
+        elif self.icon_method == "upload" and self.preview_icon_url and self.preview_icon_url.startswith("http"):
+            return self.preview_icon_url
+        return ""
+
+    def _get_app_fields(self) -> dict:
+        """Crea un diccionario con los campos de la aplicación."""
+        return {
+            'Icon': self._get_icon_url(),
+            'Overview': self.template_description,
+            'Support': self.support_url,
+            'Project': self.project_url,
+            'Category': self.selected_category
+        }
+
+    def _get_web_port(self) -> str:
+        """Devuelve el puerto web seleccionado (formato "host:container") o cadena vacía."""
+        return self.selected_web_port if self.selected_web_port and self.selected_web_port != "No seleccionar puerto" else ""
+
+    async def set_live_preview(self, enabled: bool):
+        """Activa o desactiva la vista previa en vivo de la plantilla."""
+        self.live_preview = enabled
+        if not enabled:
+            # Liberamos los fragmentos guardados
+            self._preview = None
+            self.preview_xml = ""
+        await self._refresh_preview()
+
+    async def _refresh_preview(self):
+        """Actualiza la vista previa en vivo regenerando solo los fragmentos afectados."""
+        if not self.live_preview:
+            return
+
+        if self._preview is None:
+            self._preview = TemplatePreview()
+
+        try:
+            # Solo se vuelve a parsear el compose (fuera del bucle de eventos) si ha cambiado
+            if self._compose_text != self._preview.compose_text:
+                docker_compose = await run_converter(parse_compose_job, self._compose_text)
+                self._preview.update_compose(self._converter, self._compose_text, docker_compose)
+            self._preview.update_options(
+                self._converter,
+                self._get_icon_url(),
+                self.template_description,
+                self._get_web_port(),
+                self._get_app_fields()
+            )
+            self.preview_xml = self._preview.render(self._converter)
+        except Exception as e:
+            logger.debug("Error al actualizar la vista previa: %s", e)
+            self.preview_xml = f"Error al generar la vista previa: {str(e)}"
+
+    async def set_external_icon_url(self, url: str):
         """Establece la URL externa del icono."""
         self.external_icon_url = url
         # Si se modifica la URL, limpiar la vista previa
         self.preview_icon_url = ""
+        await self._refresh_preview()
     
     def preview_external_icon(self):
         """Muestra una vista previa del icono desde la URL externa."""
@@ -735,7 +645,7 @@ class MainState(rx.State):
             
         try:
             # Realizar una petición HEAD para verificar la existencia y tipo de la imagen
-            response = requests.head(self.external_icon_url, allow_redirects=True)
+            response = http_head(self.external_icon_url, allow_redirects=True)
             
             # Verificar el código de respuesta
             if response.status_code != 200:
@@ -757,18 +667,20 @@ class MainState(rx.State):
             self.preview_icon_url = ""
             return rx.toast.error("No se encontró imagen en esa URL o la imagen no es válida")
         
-    def set_github_repo_icon_url(self, url: str):
+    async def set_github_repo_icon_url(self, url: str):
         """Establece la URL del repositorio de GitHub para buscar iconos."""
         self.github_repo_icon_url = url
         # Limpiar la lista de imágenes y la imagen seleccionada al modificar la URL
         self.github_images = []
         self.selected_github_image = ""
         self.preview_icon_url = ""
+        await self._refresh_preview()
         
     def load_github_repo_url(self, url: str):
         """Establece la URL del repositorio GitHub para Docker Compose."""
         self.github_repo_url = url
         
+    @profiled
     def search_github_images(self):
         """Busca imágenes en el repositorio de GitHub."""
         if not self.github_repo_icon_url:
@@ -786,7 +698,7 @@ class MainState(rx.State):
         except Exception as e:
             yield rx.toast.error(f"Error al buscar imágenes: {str(e)}")
             
-    def select_github_image(self, image: str):
+    async def select_github_image(self, image: str):
         """Selecciona una imagen del repositorio de GitHub."""
         if image == "No seleccionar imagen":
             # Limpiar la selección y la vista previa
@@ -795,66 +707,100 @@ class MainState(rx.State):
         else:
             self.selected_github_image = image
             self.preview_icon_url = image
+        await self._refresh_preview()
             
-    def set_template_description(self, description: str):
+    async def set_template_description(self, description: str):
         """Establece la descripción de la plantilla."""
         self.template_description = description
+        await self._refresh_preview()
     
-    def set_support_url(self, url: str):
+    async def set_support_url(self, url: str):
         """Establece la URL de soporte."""
         self.support_url = url
+        await self._refresh_preview()
     
-    def set_web_port(self, port: str):
+    async def set_web_port(self, port: str):
         """Establece el puerto seleccionado para la WebUI."""
         # Si se selecciona "No seleccionar puerto", limpiamos la selección
         if port == "No seleccionar puerto":
             self.selected_web_port = ""
         else:
             self.selected_web_port = port
+        await self._refresh_preview()
     
-    def set_project_url(self, url: str):
+    async def set_project_url(self, url: str):
         """Establece la URL del proyecto."""
         self.project_url = url
+        await self._refresh_preview()
     
-    def set_category(self, category: str):
+    async def set_category(self, category: str):
         """Establece la categoría seleccionada."""
         self.selected_category = category
+        await self._refresh_preview()
         
     def update_unraid_template(self, value: str):
         """Actualiza la plantilla Unraid."""
-        self.unraid_template = value
-        self.formatted_xml = value
-        self.download_xml = value
+        self._load_unraid_template(value)
+
+    def _load_unraid_template(self, template: str):
+        """Reemplaza la plantilla desde el servidor y la envía completa al editor."""
+        self.unraid_template = template
+        self.formatted_xml = template
+        self._download_xml = template
+        self.unraid_template_version += 1
+        self.unraid_template_base = self.unraid_template_version
+
+    def patch_unraid_template(self, patch: dict):
+        """Aplica un parche incremental enviado por el editor de la plantilla."""
+        try:
+            self._download_xml = apply_patch(self._download_xml, self.unraid_template_version, patch)
+        except SyncConflict as e:
+            logger.debug("Conflicto al sincronizar la plantilla: %s", e)
+            return request_full_sync("template", MainState.patch_unraid_template)
+        self.unraid_template_version += 1
+        self.unraid_template_ack = patch.get("seq", 0)
         
     def prepare_download_filename(self):
         """Prepara el nombre de archivo para la descarga basado en el contenido de la plantilla."""
-        template_name = "unraid-template"
-        if self.unraid_template:
-            # Intentamos con la etiqueta <Name>
-            name_match = re.search(r'<Name>([^<]+)</Name>', self.unraid_template)
-            
-            if name_match:
-                container_name = name_match.group(1)
-                clean_name = re.sub(r'[^\w\-\.]', '_', container_name)
-                template_name = f"my-{clean_name}"
-        
-        self.download_filename = f"{template_name}.xml"
+        self.download_filename = template_filename(self._download_xml)
         
     def download_template_local(self):
         """Descarga la plantilla con nombre personalizado."""
-        if not self.unraid_template:
+        if not self._download_xml:
             return rx.toast.error("No hay plantilla para descargar.")
             
         self.prepare_download_filename()
         
         return rx.download(
-            data=self.download_xml, 
+            data=self._download_xml, 
             filename=self.download_filename
         )
         
-    def save_template_unraid(self):
-        """Guarda la plantilla en la carpeta de plantillas de Unraid."""
-        if not self.unraid_template:
+    async def download_template_bundle(self):
+        """Descarga en un ZIP las plantillas de todos los servicios del Docker Compose."""
+        if not self._compose_text:
+            return rx.toast.error("No hay Docker Compose para exportar.")
+
+        # Solo se guardan los datos de la conversión; el backend genera y envía el ZIP por bloques
+        ticket = await create_ticket({
+            "compose": self._compose_text,
+            "web_port": self._get_web_port(),
+            "icon_url": self._get_icon_url(),
+            "description": self.template_description,
+            "support_url": self.support_url,
+            "project_url": self.project_url,
+            "category": self.selected_category,
+        })
+        return rx.download(url=f"/api/bundle/{ticket}", filename="unraid-templates.zip")
+
+    async def save_template_unraid(self, force: bool = False):
+        """
+        Guarda la plantilla en la carpeta de plantillas de Unraid.
+
+        Antes se comprueban sus conflictos con la biblioteca: si el fichero ya existe y es de
+        otra aplicación no se sobrescribe salvo con force; los puertos y rutas repetidos solo se avisan.
+        """
+        if not self._download_xml:
             return rx.toast.error("No hay plantilla para guardar.")
             
         try:
@@ -862,16 +808,43 @@ class MainState(rx.State):
             self.prepare_download_filename()
             
             # Construir la ruta completa
-            save_path = os.path.join(os.getcwd(), "plantillas", self.download_filename)
-            
-            # Guardar el archivo
-            with open(save_path, "w", encoding="utf-8") as f:
-                f.write(self.download_xml)
-                
+            save_path = os.path.join(TEMPLATES_DIR, self.download_filename)
+
+            # Conflictos con las plantillas ya guardadas
+            conflicts = await self._check_library_conflicts()
+            if conflicts.get("overwrite") and not force:
+                return rx.toast.error(f"No se ha guardado la plantilla: {conflicts['overwrite'][0]}.")
+            
+            # Guardar el archivo (atómico y fuera del bucle de eventos; no se reescribe si no cambia)
+            if not await save_file(save_path, self._download_xml):
+                return rx.toast.info(f"La plantilla ya estaba guardada en: {save_path}")
+
+            if self.library_conflicts:
+                return rx.toast.warning(f"Plantilla guardada en: {save_path}. Revisa los conflictos con otras plantillas.")
             return rx.toast.success(f"Plantilla guardada en: {save_path}")
             
         except Exception as e:
             return rx.toast.error(f"Error al guardar la plantilla: {str(e)}")
+
+    async def _check_library_conflicts(self) -> dict:
+        """Calcula los conflictos de la plantilla con la biblioteca (un fallo del índice no impide guardar)."""
+        try:
+            conflicts = await library.conflicts_async(self._download_xml, self.download_filename)
+        except Exception as e:
+            logger.warning("No se pudieron comprobar los conflictos de %s: %s", self.download_filename, e)
+            conflicts = {}
+        self.library_conflicts = [message for group in ("overwrite", "name", "ports", "paths")
+                                  for message in conflicts.get(group, [])]
+        return conflicts
+
+    async def search_library(self, query: str):
+        """Busca en la biblioteca de plantillas por nombre, repositorio o fichero."""
+        self.library_query = query
+        try:
+            self.library_results = await library.search_async(query)
+        except Exception as e:
+            logger.warning("Error al buscar en la biblioteca de plantillas: %s", e)
+            self.library_results = []
     
     def _get_prioritized_compose_paths(self, initial_branch: str) -> list:
         """Obtiene las rutas de búsqueda para los archivos docker-compose ordenadas por prioridad.
@@ -893,181 +866,6 @@ class MainState(rx.State):
         
         return all_paths
 
-    def _validate_compose_priority(self, compose_data: dict) -> int:
-        """Valida la prioridad de un compose según sus campos.
-        
-        Args:
-            compose_data: Diccionario con el contenido del docker-compose parseado
-            
-        Returns:
-            Prioridad del compose (menor número = mayor prioridad)
-            -1 si no cumple ninguna condición
-        """
-        # Convertir el compose_data a string para búsqueda global
-        compose_str = str(compose_data).lower()
-        
-        for validation in self._compose_validation_priority:
-            # Verificar campos requeridos en el nivel principal
-            required_fields_valid = True
-            for field in validation.get('required_fields', []):
-                if field not in compose_data:
-                    required_fields_valid = False
-                    break
-                    
-            if not required_fields_valid:
-                continue
-                
-            # Verificar campos que deben estar presentes en cualquier parte
-            must_have_valid = True
-            for field in validation.get('must_have', []):
-                if field.lower() not in compose_str:
-                    must_have_valid = False
-                    break
-                    
-            if not must_have_valid:
-                continue
-                
-            # Verificar campos que NO deben estar presentes en ninguna parte
-            must_not_have_valid = True
-            for field in validation.get('must_not_have', []):
-                if field.lower() in compose_str:
-                    must_not_have_valid = False
-                    break
-                    
-            if not must_not_have_valid:
-                continue
-                
-            # Si llegamos aquí, es porque cumple todas las condiciones
-            return validation.get('priority', -1)
-            
-        # Si no cumple ninguna validación, devolvemos -1
-        return -1
-
-        async def _process_compose_content(self, content: str, file_path: str = "", branch: str = "") -> tuple[int | None, dict | None, str | None]:
-            """
-            Procesa el contenido de un posible docker-compose y valida su prioridad.
-            
-            Args:
-                content: El contenido del archivo a validar
-                file_path: La ruta del archivo (opcional, para logging)
-                branch: La rama del repositorio (opcional, para logging)
-                
-            Returns:
-                Tuple de (prioridad, datos_compose, contenido) si es válido, o (None, None, None) si no lo es
-            """
-            try:
-                # Verificamos que el contenido no esté vacío
-                if not content or not content.strip():
-                    return None, None, None
-
-                # Intentamos parsear como YAML y validar estructura básica
-                compose_data = self._converter.parse_docker_compose(content)
-                
-                # Validar la prioridad del compose
-                priority = self._validate_compose_priority(compose_data)
-                if priority is not None:
-                    return priority, compose_data, content
-                    
-            except Exception as e:
-                print(f"Error procesando compose en {branch}/{file_path}: {str(e)}")
-                
-            return None, None, None
-
-        def _validate_compose_priority(self, compose_data: dict) -> int | None:
-            """
-            Valida la prioridad de un compose según las reglas definidas.
-            
-            Args:
-                compose_data: Datos del compose parseado como diccionario
-                
-            Returns:
-                Prioridad del compose (menor es mejor) o None si no es válido
-            """
-            if not compose_data:
-                return None
-                
-            # Recorremos las reglas de validación en orden
-            for rule in self._compose_validation_priority:
-                # Verificar campos requeridos
-                if not all(field in compose_data for field in rule["required_fields"]):
-                    continue
-                    
-                # Verificar campos que deben estar presentes
-                if not all(field in str(compose_data) for field in rule["must_have"]):
-                    continue
-                    
-                # Verificar campos que no deben estar presentes
-                if any(field in str(compose_data) for field in rule["must_not_have"]):
-                    continue
-                    
-                # Si pasó todas las validaciones, devolver la prioridad de esta regla
-                return rule["priority"]
-                
-            # Si no coincide con ninguna regla, devolver None
-            return None
-
-    async def handle_compose_upload(self, compose_content: str) -> dict:
-        """Maneja la carga y validación de un archivo docker-compose.
-        
-        Args:
-            compose_content: Contenido del archivo docker-compose en formato string
-            
-        Returns:
-            Diccionario con el resultado de la validación:
-            {
-                'success': bool,
-                'message': str,
-                'priority': int,
-                'compose_data': dict
-            }
-        """
-        try:
-            # Intentar parsear el compose
-            compose_data = yaml.safe_load(compose_content)
-            
-            if not compose_data:
-                return {
-                    'success': False,
-                    'message': "El archivo docker-compose está vacío",
-                    'priority': -1,
-                    'compose_data': None
-                }
-                
-            # Validar la estructura básica
-            if not isinstance(compose_data, dict):
-                return {
-                    'success': False,
-                    'message': "El archivo docker-compose no tiene un formato válido",
-                    'priority': -1,
-                    'compose_data': None
-                }
-                
-            # Obtener la prioridad
-            priority = self._validate_compose_priority(compose_data)
-            
-            if priority == -1:
-                return {
-                    'success': False,
-                    'message': "El archivo docker-compose no cumple con los requisitos mínimos",
-                    'priority': -1,
-                    'compose_data': None
-                }
-                
-            return {
-                'success': True,
-                'message': "Docker-compose válido",
-                'priority': priority,
-                'compose_data': compose_data
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'message': f"Error al procesar el docker-compose: {str(e)}",
-                'priority': -1,
-                'compose_data': None
-            }
-
     @staticmethod
     def create_info_hover(hover_text: str) -> rx.Component:
         """Crea un icono de información con un hovercard.
@@ -1096,45 +894,61 @@ class MainState(rx.State):
             ),
         )
     
-    def _try_configure_github_urls_from_compose(self, compose_text: str) -> bool:
+    def _try_configure_from_catalog(self, compose_data: dict) -> bool:
+        """
+        Rellena los campos vacíos de la pestaña de opciones con los datos del catálogo de imágenes.
+
+        Returns:
+            bool: True si la imagen está en el catálogo y se rellenó algún campo
+        """
+        entry = lookup_image(compose_data.get('image', '')) if compose_data else None
+        if not entry:
+            return False
+
+        filled = False
+        if entry['icon'] and not (self.external_icon_url or self.selected_github_image or self.github_images):
+            self.icon_method = "url"
+            self.external_icon_url = entry['icon']
+            self.preview_icon_url = entry['icon']
+            filled = True
+        for field, value in (
+            ('project_url', entry['project']),
+            ('support_url', entry['support']),
+            ('template_description', entry['overview']),
+        ):
+            if value and not getattr(self, field):
+                setattr(self, field, value)
+                filled = True
+        if entry['category'] in self.available_categories and not self.selected_category:
+            self.selected_category = entry['category']
+            filled = True
+        return filled
+
+    def _try_configure_github_urls_from_compose(self, compose_text: str, compose_data: dict = None) -> bool:
         """
         Intenta extraer y configurar las URLs de GitHub a partir del contenido del compose.
         
         Args:
             compose_text: El contenido del docker-compose
+            compose_data: El docker-compose ya parseado (opcional, evita volver a parsearlo)
             
         Returns:
             bool: True si se pudieron configurar las URLs, False en caso contrario
         """
         try:
-            compose_data = self._converter.parse_docker_compose(compose_text)
-            if 'image' in compose_data:
-                image_name = compose_data['image']
-                # Intentamos extraer el usuario/repositorio de la imagen
-                parts = image_name.split('/')
-                
-                # Si la imagen tiene formato usuario/repositorio
-                if len(parts) >= 2:
-                    # Si es de GitHub
-                    if any(domain in parts[0] for domain in ['ghcr.io', 'docker.pkg.github.com']):
-                        # El formato es ghcr.io/usuario/repo o docker.pkg.github.com/usuario/repo
-                        user_repo = '/'.join(parts[1:2])
-                    else:
-                        # Asumimos que es usuario/repo directamente
-                        user_repo = '/'.join(parts[:2])
-                    
-                    # Limpiamos el nombre del repositorio (quitamos el tag si existe)
-                    user_repo = user_repo.split(':')[0]
-                    
-                    # Configuramos las URLs
-                    base_url = f"https://github.com/{user_repo}"
-                    self.project_url = base_url
-                    self.support_url = f"{base_url}/releases"
-                    self.github_repo_icon_url = base_url
-                    self.icon_method = "github"
-                    
-                    return True
-                    
+            if compose_data is None:
+                compose_data = self._converter.parse_docker_compose(compose_text)
+            user_repo = guess_github_repository(compose_data.get('image', ''))
+            if user_repo:
+                # Configuramos las URLs
+                base_url = f"https://github.com/{user_repo}"
+                self.project_url = base_url
+                self.support_url = f"{base_url}/releases"
+                self.github_repo_icon_url = base_url
+                self.icon_method = "github"
+
+                return True
+
             return False
         except Exception:
             return False
\ No newline at end of file
@@ -6,7 +6,11 @@ from unposer.views.compose import compose_tab
 from unposer.views.options import options_tab
 from unposer.views.template import template_tab
 
+from unposer.api import api, register_session_metrics
 from unposer.state.MainState import MainState
+from unposer.utils.middleware import SessionActivityMiddleware, TraceMiddleware
+from unposer.utils.sessions import register_session_reaper
+from unposer.utils.watcher import register_folder_watcher
 
 
 def index() -> rx.Component:
@@ -83,8 +87,20 @@ app = rx.App(
         gray_color="slate", 
         appearance="dark", 
         radius="full"
-    )
+    ),
+    # Script de sincronización incremental de los editores
+    head_components=[rx.script(src="/unposer-sync.js")],
+    # Rutas propias del backend (/metrics)
+    api_transformer=api,
 )
+register_session_metrics(app)
+# Traza por evento (identificador en los logs y tramo con su duración)
+app.add_middleware(TraceMiddleware())
+# Caducidad de las sesiones inactivas y límite de memoria de sus estados
+app.add_middleware(SessionActivityMiddleware())
+register_session_reaper(app)
+# Carpeta vigilada (WATCH_DIR): regenera las plantillas de sus Docker Compose
+register_folder_watcher(app)
 
 # Añadir la página principal
 app.add_page(index)
@@ -0,0 +1,129 @@
+"""
+Módulo con la exportación de varias plantillas en un ZIP.
+
+El archivo se construye a medida que llegan las plantillas y se envía por
+bloques (transferencia chunked): en memoria solo está la plantilla en curso y lo
+que aún no se ha enviado, nunca el ZIP completo. zipfile escribe sobre un destino
+no posicionable, así que cada entrada lleva su descriptor de datos en lugar de
+reescribir la cabecera.
+
+La interfaz no puede enviar el Docker Compose en una descarga del navegador: crea
+un ticket de corta duración con los datos de la conversión (no las plantillas) y
+descarga el ZIP desde /api/bundle/<ticket>. Con Redis el ticket se comparte entre
+workers.
+"""
+import asyncio
+import os
+import secrets
+import time
+import zipfile
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from unposer.utils.shared import shared_cache_enabled, shared_get, shared_set
+
+# Segundos de validez de un ticket de descarga
+TICKET_TTL = 300
+
+_tickets: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+class _ChunkBuffer:
+    """Destino de zipfile sin seek: acumula lo escrito hasta que se recoge."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _unique_name(name: str, used: set) -> str:
+    """Evita nombres repetidos dentro del ZIP añadiendo un sufijo (-2, -3...)."""
+    base, extension = os.path.splitext(name)
+    candidate = name
+    counter = 2
+    while candidate in used:
+        candidate = f"{base}-{counter}{extension}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+async def stream_zip(entries: AsyncIterator[Tuple[str, bytes]]) -> AsyncIterator[bytes]:
+    """
+    Genera los bytes de un ZIP a partir de (nombre, contenido) según se van produciendo.
+
+    Cada entrada se comprime y se envía antes de pedir la siguiente.
+    """
+    buffer = _ChunkBuffer()
+    used = set()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        async for name, content in entries:
+            info = zipfile.ZipInfo(_unique_name(name, used), date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            archive.writestr(info, content)
+            chunk = buffer.take()
+            if chunk:
+                yield chunk
+    # Directorio central
+    yield buffer.take()
+
+
+async def directory_entries(directory: str, extension: str = ".xml") -> AsyncIterator[Tuple[str, bytes]]:
+    """Ficheros de una carpeta (sin subcarpetas) leídos uno a uno fuera del bucle de eventos."""
+    try:
+        names = sorted(await asyncio.to_thread(os.listdir, directory))
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.startswith(".") or not name.endswith(extension) or not os.path.isfile(path):
+            continue
+        try:
+            content = await asyncio.to_thread(_read_bytes, path)
+        except OSError:
+            continue
+        yield name, content
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def create_ticket(request: Dict[str, Any]) -> str:
+    """Guarda los datos de una conversión y devuelve el ticket para descargar su ZIP."""
+    now = time.monotonic()
+    for ticket in [ticket for ticket, (expires, _) in _tickets.items() if expires < now]:
+        del _tickets[ticket]
+
+    ticket = secrets.token_urlsafe(16)
+    _tickets[ticket] = (now + TICKET_TTL, request)
+    if shared_cache_enabled():
+        await asyncio.to_thread(shared_set, "bundle", ticket, request, TICKET_TTL)
+    return ticket
+
+
+async def get_ticket(ticket: str) -> Optional[Dict[str, Any]]:
+    """Datos de la conversión de un ticket vigente o None."""
+    local = _tickets.get(ticket)
+    if local is not None and local[0] >= time.monotonic():
+        return local[1]
+    if shared_cache_enabled():
+        return await asyncio.to_thread(shared_get, "bundle", ticket)
+    return None
@@ -0,0 +1,179 @@
+"""
+Módulo con la caché de plantillas generadas, compartida entre sesiones.
+
+Las entradas se direccionan por contenido: la clave es un hash del texto del
+Docker Compose, las opciones de la plantilla y la versión de los mapeos, de modo
+que la misma combinación (muy habitual con imágenes populares) solo se convierte
+una vez. La caché es LRU y está acotada por el tamaño total en bytes.
+
+Con REDIS_URL la caché local de cada worker se completa con la compartida: una
+plantilla generada en un worker se reutiliza en los demás.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from unposer.utils.config import CONVERSION_CACHE_BYTES, SHARED_CACHE_TTL, TEMPLATE_DATE_INSTALLED
+from unposer.utils.executor import generate_template_job, run_converter
+from unposer.utils.metrics import REGISTRY
+from unposer.utils.shared import shared_cache_enabled, shared_get, shared_set
+from unposer.utils.utils import DEBUG_ENABLED, setup_logger
+
+logger = setup_logger(__name__)
+
+
+def conversion_key(compose_text: str,
+                   icon_url: str,
+                   description: str,
+                   web_port: str,
+                   app_fields: Dict[str, str],
+                   mapping_version: str) -> str:
+    """Calcula la clave de una conversión a partir de todo lo que influye en el resultado."""
+    payload = json.dumps(
+        [mapping_version, compose_text, icon_url, description, web_port, app_fields or {}],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ConversionCache:
+    """Caché LRU de plantillas generadas acotada por bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(key: str, template: str) -> int:
+        return len(key) + len(template.encode("utf-8"))
+
+    def get(self, key: str) -> Optional[Tuple[str, int]]:
+        """Devuelve (plantilla, marca de tiempo de DateInstalled) o None si no está en caché."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, template: str, installed_at: int):
+        """Guarda una plantilla, descartando las menos usadas si se supera el tamaño máximo."""
+        size = self._size(key, template)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= self._size(key, previous[0])
+            self._entries[key] = (template, installed_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key, (old_template, _) = self._entries.popitem(last=False)
+                self._bytes -= self._size(old_key, old_template)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso de la caché."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'shared_hits': self.shared_hits,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+conversion_cache = ConversionCache(CONVERSION_CACHE_BYTES)
+
+
+def _restamp(template: str, cached_at: int, installed_at: int) -> str:
+    """Sustituye la fecha de instalación de una plantilla guardada en caché."""
+    if cached_at == installed_at:
+        return template
+    return template.replace(
+        f"<DateInstalled>{cached_at}</DateInstalled>",
+        f"<DateInstalled>{installed_at}</DateInstalled>",
+        1,
+    )
+
+
+async def generate_template_cached(mapping_version: str,
+                                   compose_text: str,
+                                   icon_url: str = "",
+                                   description: str = "",
+                                   web_port: str = "",
+                                   app_fields: Dict[str, str] = None) -> str:
+    """
+    Genera la plantilla Unraid reutilizando la caché compartida.
+
+    La fecha de instalación no forma parte de la clave: en una coincidencia se
+    sustituye por la actual (o por la fija de TEMPLATE_DATE_INSTALLED).
+
+    Args:
+        mapping_version: Versión de los mapeos del conversor (UnraidTemplateConverter.mapping_version).
+        compose_text: Texto del Docker Compose.
+        icon_url: URL del icono.
+        description: Descripción de la plantilla.
+        web_port: Puerto web seleccionado (formato "host:container").
+        app_fields: Campos adicionales de la aplicación.
+    """
+    installed_at = TEMPLATE_DATE_INSTALLED if TEMPLATE_DATE_INSTALLED is not None else int(time.time())
+    key = conversion_key(compose_text, icon_url, description, web_port, app_fields, mapping_version)
+
+    cached = conversion_cache.get(key)
+    if cached is not None:
+        template, cached_at = cached
+        if DEBUG_ENABLED:
+            logger.debug("Plantilla servida desde la caché (%.0f%% de aciertos)", conversion_cache.stats()['hit_ratio'] * 100)
+        return _restamp(template, cached_at, installed_at)
+
+    if shared_cache_enabled():
+        shared = await asyncio.to_thread(shared_get, "template", key)
+        if shared is not None:
+            template, cached_at = shared
+            conversion_cache.shared_hits += 1
+            conversion_cache.put(key, template, cached_at)
+            return _restamp(template, cached_at, installed_at)
+
+    template = await run_converter(
+        generate_template_job, compose_text, icon_url, description, web_port, app_fields, installed_at
+    )
+    # Una plantilla vacía indica un error de generación: no se guarda
+    if template:
+        conversion_cache.put(key, template, installed_at)
+        if shared_cache_enabled():
+            await asyncio.to_thread(shared_set, "template", key, [template, installed_at], SHARED_CACHE_TTL)
+    return template
+
+
+def _cache_metrics():
+    """Colector de /metrics con las estadísticas de la caché."""
+    stats = conversion_cache.stats()
+    yield ("unposer_conversion_cache_hits_total", "counter", "Aciertos de la caché de plantillas.", [({}, stats['hits'])])
+    yield ("unposer_conversion_cache_misses_total", "counter", "Fallos de la caché de plantillas.", [({}, stats['misses'])])
+    yield ("unposer_conversion_cache_shared_hits_total", "counter", "Fallos locales resueltos por la caché compartida.", [({}, stats['shared_hits'])])
+    yield ("unposer_conversion_cache_entries", "gauge", "Plantillas guardadas en la caché.", [({}, stats['entries'])])
+    yield ("unposer_conversion_cache_bytes", "gauge", "Bytes ocupados por la caché de plantillas.", [({}, stats['bytes'])])
+
+
+REGISTRY.register_collector(_cache_metrics)
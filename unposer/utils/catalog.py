@@ -0,0 +1,143 @@
+"""
+Módulo con el catálogo offline de imágenes conocidas (config/catalogo_imagenes.tsv).
+
+El catálogo asocia el repositorio de una imagen con su icono, URL del proyecto, URL
+de soporte, categoría y descripción, de forma que al cargar un Docker Compose de una
+imagen conocida se rellena la pestaña de opciones sin ninguna petición de red.
+
+El fichero es un TSV versionado (primera línea `#unposer-catalog<TAB><versión>`) con
+una entrada por línea. Se abre al primer uso con mmap y solo se indexan las claves
+(clave -> posición de la línea en el fichero); los valores se decodifican al
+consultarlos. Las entradas `<prefijo>/*` se aplican a todas las imágenes de ese
+prefijo (por ejemplo linuxserver/*) y completan los campos que deja vacíos la entrada
+exacta; en ellas `{name}` se sustituye por el nombre de la imagen.
+"""
+import mmap
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from unposer.utils.config import IMAGE_CATALOG
+from unposer.utils.reference import InvalidReference, parse_image_reference
+from unposer.utils.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+CATALOG_PATH = os.path.join(BASE_DIR, "config", "catalogo_imagenes.tsv")
+# Versión del formato del fichero que entiende este módulo
+CATALOG_VERSION = 1
+CATALOG_HEADER = b"#unposer-catalog\t"
+FIELDS = ("icon", "project", "support", "category", "overview")
+
+
+def catalog_key(image: str) -> str:
+    """
+    Clave del catálogo de una imagen: su nombre abreviado sin tag ni digest.
+
+    lscr.io/linuxserver/plex:latest -> linuxserver/plex y docker.io/library/nginx -> nginx
+    (cadena vacía si la referencia no es válida).
+    """
+    try:
+        return parse_image_reference(image).familiar_name
+    except InvalidReference:
+        return ""
+
+
+class ImageCatalog:
+    """Catálogo de imágenes sobre un fichero TSV abierto con mmap al primer uso."""
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self.version = None
+        self._data = None
+        self._index: Optional[Dict[str, Tuple[int, int]]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Tuple[int, int]]:
+        """Abre el fichero e indexa sus claves (una sola vez)."""
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            index = {}
+            try:
+                with open(self.path, "rb") as file:
+                    data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                logger.warning("No se pudo abrir el catálogo de imágenes %s: %s", self.path, e)
+                self._index = index
+                return index
+
+            end = data.find(b"\n")
+            header = data[:end if end >= 0 else len(data)].rstrip(b"\r")
+            version = header[len(CATALOG_HEADER):] if header.startswith(CATALOG_HEADER) else b""
+            if not version.isdigit() or int(version) != CATALOG_VERSION:
+                logger.warning("Catálogo de imágenes %s ignorado: versión no soportada", self.path)
+                data.close()
+                self._index = index
+                return index
+
+            self.version = int(version)
+            position = end + 1
+            size = len(data)
+            while 0 < position < size:
+                end = data.find(b"\n", position)
+                if end < 0:
+                    end = size
+                if data[position:position + 1] not in (b"#", b"\n", b"\r"):
+                    tab = data.find(b"\t", position, end)
+                    if tab > position:
+                        index[data[position:tab].decode("utf-8")] = (tab + 1, end)
+                position = end + 1
+            self._data = data
+            self._index = index
+            logger.debug("Catálogo de imágenes v%s cargado con %s entradas", self.version, len(index))
+            return index
+
+    def _entry(self, index: Dict[str, Tuple[int, int]], key: str) -> Optional[Tuple[str, ...]]:
+        """Campos de una entrada del catálogo (None si no existe)."""
+        location = index.get(key)
+        if location is None:
+            return None
+        values = self._data[location[0]:location[1]].decode("utf-8").rstrip("\r").split("\t")
+        return tuple(values[:len(FIELDS)]) + ("",) * (len(FIELDS) - len(values))
+
+    def lookup(self, image: str) -> Optional[Dict[str, str]]:
+        """
+        Datos de una imagen: icon, project, support, category y overview.
+
+        Se combina la entrada exacta con las de sus prefijos, de la más específica a la
+        más general. Devuelve None si la imagen no está en el catálogo.
+        """
+        key = catalog_key(image)
+        if not key:
+            return None
+        index = self._index if self._index is not None else self._load()
+        if not index:
+            return None
+
+        parts = key.split("/")
+        result = dict.fromkeys(FIELDS, "")
+        found = False
+        entries = [self._entry(index, key)]
+        entries += [self._entry(index, "/".join(parts[:i]) + "/*") for i in range(len(parts) - 1, 0, -1)]
+        for entry in entries:
+            if entry is None:
+                continue
+            found = True
+            for field, value in zip(FIELDS, entry):
+                if value and not result[field]:
+                    result[field] = value.replace("{name}", parts[-1])
+        return result if found else None
+
+    def __len__(self) -> int:
+        return len(self._index if self._index is not None else self._load())
+
+
+# Catálogo incluido en config/ (o el de IMAGE_CATALOG); se abre al primer uso
+catalog = ImageCatalog(IMAGE_CATALOG or CATALOG_PATH)
+
+
+def lookup_image(image: str) -> Optional[Dict[str, str]]:
+    """Datos del catálogo de una imagen (None si no es una imagen conocida)."""
+    return catalog.lookup(image)
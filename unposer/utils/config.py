@@ -2,6 +2,62 @@ import os
 
 VERSION = os.getenv('VERSION', 'dev')
 DEBUG = int(os.getenv('DEBUG', '0'))
+# Formato de los logs (text | json) y umbral (ms) a partir del cual un tramo se registra como lento
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+SLOW_SPAN_MS = float(os.getenv('SLOW_SPAN_MS', '1000'))
 
+# Retardo (ms) antes de enviar al servidor los cambios de los editores
+SYNC_DEBOUNCE_MS = int(os.getenv('SYNC_DEBOUNCE_MS', '400'))
 
+# Ejecución del conversor fuera del bucle de eventos
+CONVERTER_EXECUTOR = os.getenv('CONVERTER_EXECUTOR', 'process')  # process | thread
+CONVERTER_WORKERS = int(os.getenv('CONVERTER_WORKERS', '2'))
+CONVERTER_MAX_PENDING = int(os.getenv('CONVERTER_MAX_PENDING', '16'))
+CONVERTER_TIMEOUT = float(os.getenv('CONVERTER_TIMEOUT', '10'))
 
+# Límites de recursos para los Docker Compose subidos o descargados
+COMPOSE_MAX_BYTES = int(os.getenv('COMPOSE_MAX_BYTES', str(1024 * 1024)))
+COMPOSE_MAX_NODES = int(os.getenv('COMPOSE_MAX_NODES', '50000'))
+COMPOSE_MAX_ALIASES = int(os.getenv('COMPOSE_MAX_ALIASES', '100'))
+COMPOSE_MAX_DEPTH = int(os.getenv('COMPOSE_MAX_DEPTH', '50'))
+# Importación de Docker Compose desde GitHub
+GITHUB_TIMEOUT = float(os.getenv('GITHUB_TIMEOUT', '10'))
+GITHUB_IMPORT_DEADLINE = float(os.getenv('GITHUB_IMPORT_DEADLINE', '60'))
+IMPORT_PROGRESS_INTERVAL = float(os.getenv('IMPORT_PROGRESS_INTERVAL', '0.5'))
+# URLs base de la API y de los ficheros raw de GitHub (permiten usar un servidor local de pruebas)
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+GITHUB_RAW_URL = os.getenv('GITHUB_RAW_URL', 'https://raw.githubusercontent.com').rstrip('/')
+# Modo determinista: marca de tiempo fija para DateInstalled (vacío = fecha actual)
+TEMPLATE_DATE_INSTALLED = int(os.getenv('TEMPLATE_DATE_INSTALLED')) if os.getenv('TEMPLATE_DATE_INSTALLED') else None
+# Caché compartida de plantillas generadas
+CONVERSION_CACHE_BYTES = int(os.getenv('CONVERSION_CACHE_BYTES', str(32 * 1024 * 1024)))
+# Varios workers: estado de las sesiones y cachés compartidas en Redis
+REDIS_URL = os.getenv('REDIS_URL', '')
+SHARED_CACHE_TTL = int(os.getenv('SHARED_CACHE_TTL', str(24 * 3600)))
+GITHUB_CACHE_TTL = int(os.getenv('GITHUB_CACHE_TTL', '300'))
+# Caducidad de las sesiones inactivas y memoria máxima de sus estados (0 = sin límite)
+SESSION_IDLE_TTL = int(os.getenv('SESSION_IDLE_TTL', '3600'))
+SESSION_MEMORY_BUDGET = int(os.getenv('SESSION_MEMORY_BUDGET', str(256 * 1024 * 1024)))
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', '60'))
+# API HTTP de conversión (/api/convert): token opcional y máximo de documentos por petición
+API_TOKEN = os.getenv('API_TOKEN', '')
+API_MAX_DOCUMENTS = int(os.getenv('API_MAX_DOCUMENTS', '50'))
+# Carpeta de plantillas de Unraid (la misma que usa "Guardar en la carpeta de plantillas")
+TEMPLATES_DIR = os.getenv('TEMPLATES_DIR', os.path.join(os.getcwd(), 'plantillas'))
+# Índice SQLite de la biblioteca de plantillas (vacío = .unposer-library.sqlite en TEMPLATES_DIR)
+LIBRARY_DB = os.getenv('LIBRARY_DB', '')
+LIBRARY_SYNC_INTERVAL = float(os.getenv('LIBRARY_SYNC_INTERVAL', '2'))
+# Catálogo offline de imágenes conocidas (vacío = config/catalogo_imagenes.tsv)
+IMAGE_CATALOG = os.getenv('IMAGE_CATALOG', '')
+# Carpeta vigilada: Docker Compose que se convierten automáticamente a TEMPLATES_DIR (vacío = desactivada)
+WATCH_DIR = os.getenv('WATCH_DIR', '')
+WATCH_INTERVAL = float(os.getenv('WATCH_INTERVAL', '2'))
+WATCH_DEBOUNCE = float(os.getenv('WATCH_DEBOUNCE', '1'))
+WATCH_CONCURRENCY = int(os.getenv('WATCH_CONCURRENCY', '2'))
+# Perfilado de los manejadores de eventos (0 = desactivado, sin coste)
+PROFILING = int(os.getenv('PROFILING', '0'))
+PROFILING_ADMIN_TOKEN = os.getenv('PROFILING_ADMIN_TOKEN', '')
+PROFILE_THRESHOLD_MS = float(os.getenv('PROFILE_THRESHOLD_MS', '1000'))
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '1'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/unposer-profiles')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '20'))
@@ -1,14 +1,23 @@
 """
 Módulo para convertir un Docker Compose a plantilla Unraid.
 """
+import hashlib
 import os
-import yaml
 import re
-import requests
-from typing import Dict, List, Any
+import shlex
+from typing import Any, Callable, Dict, List, Tuple
+from xml.sax.saxutils import escape, quoteattr
 from datetime import datetime
 
-from unposer.utils.utils import setup_logger, generate_trace_id
+import yaml
+
+from unposer.utils.config import TEMPLATE_DATE_INSTALLED
+from unposer.utils.httpclient import http_get
+from unposer.utils.limits import ComposeLimitError
+from unposer.utils.metrics import FUNCTION_SECONDS
+from unposer.utils.reference import InvalidReference, parse_image_reference
+from unposer.utils.resolve import escape_dollars, resolve_compose
+from unposer.utils.utils import DEBUG_ENABLED, setup_logger
 
 logger = setup_logger(__name__)
 
@@ -19,9 +28,126 @@ TEMPLATE_PATH = os.path.join(CONFIG_DIR, "template_unraid_xml.txt")
 MAPEO_COMPOSE_PATH = os.path.join(CONFIG_DIR, "mapeo_compose.dic")
 MAPEO_APP_PATH = os.path.join(CONFIG_DIR, "mapeo_app.dic")
 
+# Revisión de la lógica de conversión: se incrementa cuando cambia el resultado sin cambiar los mapeos
+CONVERTER_REVISION = 4
+
+# Grupos de etiquetas Config en el orden en que se insertan en la plantilla
+CONFIG_GROUPS = ['environment', 'labels', 'volumes', 'ports', 'devices']
+
+# Extensiones de los ficheros de imagen que se ofrecen como icono
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.ico', '.gif', '.svg')
+
+# Subclaves del healthcheck del compose -> sufijo del flag --health-*
+HEALTHCHECK_FLAGS = {
+    'interval': 'interval',
+    'timeout': 'timeout',
+    'retries': 'retries',
+    'start_period': 'start-period',
+    'start_interval': 'start-interval',
+}
+
+
+def _indent_fragment(fragment: str) -> str:
+    """Indenta con 2 espacios cada línea no vacía de un fragmento de la plantilla."""
+    return '\n'.join(f"  {line.strip()}" for line in fragment.split('\n') if line.strip())
+
+
+def _config_tag(name: Any, target: Any, mode: Any, config_type: str, value: Any) -> str:
+    """Genera una etiqueta <Config> con los atributos y el valor escapados para XML."""
+    return (f'<Config Name={quoteattr(str(name))} Target={quoteattr(str(target))} Default="" Mode={quoteattr(str(mode))} '
+            f'Description="" Type="{config_type}" Display="always" Required="false" Mask="false">{escape(str(value))}</Config>')
+
+
+def _flag(formato: str, *values: Any) -> str:
+    """Flag de docker run con sus valores entre comillas si hace falta (--cap-add={} -> --cap-add=NET_ADMIN)."""
+    return formato.format(*(shlex.quote(str(value)) for value in values))
+
+
+def _items(value: Any, separator: str) -> List[str]:
+    """Elementos de una lista o de un diccionario del compose (como clave<separador>valor)."""
+    if isinstance(value, dict):
+        return [f"{key}{separator}{item}" for key, item in value.items()]
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return [str(value)]
+
+
+def _rule_valor(value: Any, formato: str) -> str:
+    return str(value)
+
+
+def _rule_comando(value: Any, formato: str) -> str:
+    return ' '.join(str(item) for item in value) if isinstance(value, list) else str(value)
+
+
+def _rule_booleano(value: Any, formato: str) -> str:
+    return str(value).lower()
+
+
+def _rule_flag(value: Any, formato: str) -> str:
+    return formato if value is True else ''
+
+
+def _rule_opcion(value: Any, formato: str) -> str:
+    return _flag(formato, value)
+
+
+def _rule_lista(value: Any, formato: str) -> str:
+    return ' '.join(_flag(formato, item) for item in _items(value, ':'))
+
+
+def _rule_diccionario(value: Any, formato: str) -> str:
+    return ' '.join(_flag(formato, item) for item in _items(value, '='))
+
+
+def _rule_ulimits(value: Any, formato: str) -> str:
+    """nofile: {soft: 1024, hard: 2048} -> --ulimit=nofile=1024:2048; nproc: 65535 -> --ulimit=nproc=65535."""
+    if not isinstance(value, dict):
+        return ''
+    flags = []
+    for name, limit in value.items():
+        if isinstance(limit, dict):
+            limit = f"{limit.get('soft', limit.get('hard'))}:{limit.get('hard', limit.get('soft'))}"
+        flags.append(_flag(formato, f"{name}={limit}"))
+    return ' '.join(flags)
+
+
+def _rule_healthcheck(value: Any, formato: str) -> str:
+    """Healthcheck del compose como flags --health-* (o --no-healthcheck si está desactivado)."""
+    if not isinstance(value, dict):
+        return ''
+    test = value.get('test')
+    if value.get('disable') is True or test == 'NONE' or (isinstance(test, list) and test[:1] == ['NONE']):
+        return '--no-healthcheck'
+
+    flags = []
+    if isinstance(test, list) and test:
+        # CMD-SHELL ejecuta la cadena en un shell; CMD, los argumentos tal cual
+        command = ' '.join(str(item) for item in test[1:]) if test[0] == 'CMD-SHELL' else shlex.join(
+            str(item) for item in (test[1:] if test[0] == 'CMD' else test))
+        flags.append(formato.format('cmd', shlex.quote(command)))
+    elif test:
+        flags.append(formato.format('cmd', shlex.quote(str(test))))
+    for key, suffix in HEALTHCHECK_FLAGS.items():
+        if value.get(key) not in (None, ''):
+            flags.append(formato.format(suffix, shlex.quote(str(value[key]))))
+    return ' '.join(flags)
+
+
+# Tipo de regla -> manejador (valor del compose, formato del flag) -> texto de la etiqueta
+RULE_HANDLERS: Dict[str, Callable[[Any, str], str]] = {
+    'valor': _rule_valor,
+    'comando': _rule_comando,
+    'booleano': _rule_booleano,
+    'flag': _rule_flag,
+    'opcion': _rule_opcion,
+    'lista': _rule_lista,
+    'diccionario': _rule_diccionario,
+    'ulimits': _rule_ulimits,
+    'healthcheck': _rule_healthcheck,
+}
+
 class UnraidTemplateConverter:
-    generate_trace_id()
-    
     def __init__(self):
         """Inicializa el conversor con los mapeos de campos."""
 
@@ -32,7 +158,14 @@ class UnraidTemplateConverter:
         
         # Cargar los mapeos desde los archivos (requeridos)
         self._cargar_mapeos()
+        self._compilar_reglas()
         self.template_base = self._cargar_template_base()
+        self._layout = None
+
+        # Huella de los mapeos y la plantilla base: cambia si cambia el resultado de la conversión
+        self.mapping_version = hashlib.sha256(
+            f"{CONVERTER_REVISION}{self.mapeo_compose!r}{self.mapeo_app!r}{self.template_base}".encode("utf-8")
+        ).hexdigest()[:16]
         
     def _cargar_mapeos(self):
         """Carga los mapeos desde los archivos."""
@@ -43,64 +176,90 @@ class UnraidTemplateConverter:
         """Carga el mapeo de campos de Docker Compose a etiquetas Unraid."""
         try:
             # Verificar si existe el archivo
-            logger.debug(f"Verificando archivo en: {MAPEO_COMPOSE_PATH}")
+            logger.debug("Verificando archivo en: %s", MAPEO_COMPOSE_PATH)
             if os.path.exists(MAPEO_COMPOSE_PATH):
-                logger.debug(f"Archivo encontrado en: {MAPEO_COMPOSE_PATH}")
+                logger.debug("Archivo encontrado en: %s", MAPEO_COMPOSE_PATH)
                 with open(MAPEO_COMPOSE_PATH, "r") as file:
                     content = file.read()
                     self.mapeo_compose = eval(content)
                     return self.mapeo_compose
             
             # Si no se encuentra el archivo, mostramos un error
-            logger.debug(f"ERROR: No se encontró el archivo de mapeo obligatorio en {MAPEO_COMPOSE_PATH}")
+            logger.debug("ERROR: No se encontró el archivo de mapeo obligatorio en %s", MAPEO_COMPOSE_PATH)
             raise FileNotFoundError(f"El archivo de mapeo obligatorio {MAPEO_COMPOSE_PATH} no existe")
         except Exception as e:
-            logger.debug(f"Error al cargar el mapeo de compose: {str(e)}")
+            logger.debug("Error al cargar el mapeo de compose: %s", e)
             raise Exception(f"No se pudo cargar el mapeo desde {MAPEO_COMPOSE_PATH}: {str(e)}")
             
     def _cargar_mapeo_app(self) -> Dict[str, str]:
         """Carga el mapeo de campos de la aplicación a etiquetas Unraid."""
         try:
             # Verificar si existe el archivo
-            logger.debug(f"Verificando archivo en: {MAPEO_APP_PATH}")
+            logger.debug("Verificando archivo en: %s", MAPEO_APP_PATH)
             if os.path.exists(MAPEO_APP_PATH):
-                logger.debug(f"Archivo encontrado en: {MAPEO_APP_PATH}")
+                logger.debug("Archivo encontrado en: %s", MAPEO_APP_PATH)
                 with open(MAPEO_APP_PATH, "r") as file:
                     content = file.read()
                     self.mapeo_app = eval(content)
-                    logger.debug(f"Contenido de mapeo_app cargado: {self.mapeo_app}")
+                    logger.debug("Contenido de mapeo_app cargado: %s", self.mapeo_app)
                     return self.mapeo_app
             
             # Si no se encuentra el archivo, mostramos un error
-            logger.debug(f"ERROR: No se encontró el archivo de mapeo obligatorio en {MAPEO_APP_PATH}")
+            logger.debug("ERROR: No se encontró el archivo de mapeo obligatorio en %s", MAPEO_APP_PATH)
             raise FileNotFoundError(f"El archivo de mapeo obligatorio {MAPEO_APP_PATH} no existe")
         except Exception as e:
-            logger.debug(f"Error al cargar el mapeo de app: {str(e)}")
+            logger.debug("Error al cargar el mapeo de app: %s", e)
             raise Exception(f"No se pudo cargar la plantilla base desde {MAPEO_APP_PATH}: {str(e)}")
 
+    def _compilar_reglas(self):
+        """
+        Compila las reglas de mapeo_compose en una tabla de despacho.
+
+        _dispatch guarda, por clave del compose, sus reglas como (orden, etiqueta, manejador,
+        formato), y _tag_keys las claves de las que depende cada etiqueta. Las reglas de
+        tipo config no entran en la tabla: las etiquetas <Config> se generan por grupos.
+        """
+        handlers = dict(RULE_HANDLERS, registro=lambda value, formato: self.extract_registry_from_image(str(value)))
+        self._dispatch: Dict[str, List[Tuple[int, str, Callable[[Any, str], str], str]]] = {}
+        self._tag_keys: Dict[str, List[str]] = {}
+        order = 0
+        for compose_key, rules in self.mapeo_compose.items():
+            for rule in rules if isinstance(rules, list) else [rules]:
+                rule_type = rule.get('tipo') if isinstance(rule, dict) else None
+                unraid_tag = rule.get('etiqueta') if isinstance(rule, dict) else None
+                if rule_type == 'config' and unraid_tag:
+                    continue
+                if rule_type not in handlers or not unraid_tag:
+                    raise ValueError(f"Regla de mapeo no válida para {compose_key}: {rule!r}")
+                self._dispatch.setdefault(compose_key, []).append((order, unraid_tag, handlers[rule_type], rule.get('formato', '')))
+                self._tag_keys.setdefault(unraid_tag, []).append(compose_key)
+                order += 1
+
     def _cargar_template_base(self) -> str:
         """Carga la plantilla base desde el archivo de configuración."""
         try:
-            logger.debug(f"Verificando archivo de plantilla en: {TEMPLATE_PATH}")
+            logger.debug("Verificando archivo de plantilla en: %s", TEMPLATE_PATH)
             if os.path.exists(TEMPLATE_PATH):
-                logger.debug(f"Archivo de plantilla encontrado en: {TEMPLATE_PATH}")
+                logger.debug("Archivo de plantilla encontrado en: %s", TEMPLATE_PATH)
                 with open(TEMPLATE_PATH, "r") as file:
                     return file.read()
             
             # Si no se encuentra el archivo, mostramos un error
-            logger.debug(f"ERROR: No se encontró el archivo de plantilla obligatorio en {TEMPLATE_PATH}")
+            logger.debug("ERROR: No se encontró el archivo de plantilla obligatorio en %s", TEMPLATE_PATH)
             raise FileNotFoundError(f"El archivo de plantilla obligatorio {TEMPLATE_PATH} no existe")
         except Exception as e:
-            logger.debug(f"Error al cargar la plantilla base: {str(e)}")
+            logger.debug("Error al cargar la plantilla base: %s", e)
             raise Exception(f"No se pudo cargar la plantilla base desde {TEMPLATE_PATH}: {str(e)}")
 
+    @FUNCTION_SECONDS.time()
     def parse_docker_compose(self, docker_compose_content: str) -> Dict[str, Any]:
         """
         Parsea el contenido del docker-compose y devuelve un diccionario con los valores relevantes.
         """
         try:
-            # Convertir el contenido a un diccionario de Python
-            docker_compose = yaml.safe_load(docker_compose_content)
+            # Convertir el contenido a un diccionario de Python (con límites de recursos),
+            # resolviendo los extends del propio fichero y las variables ${...}
+            docker_compose = resolve_compose(docker_compose_content)
             
             # Verificar si el archivo tiene la estructura esperada
             if 'services' not in docker_compose:
@@ -133,13 +292,38 @@ class UnraidTemplateConverter:
                     service['devices'] = [service['devices']]
                 
                 # Imprimir para debug
-                logger.debug(f"Dispositivos normalizados: {service['devices']}")
+                if DEBUG_ENABLED:
+                    logger.debug("Dispositivos normalizados: %s", service['devices'])
             
             return service
+        except ComposeLimitError as e:
+            # Los límites de recursos se notifican al usuario con su mensaje
+            logger.warning("Docker Compose rechazado: %s", e)
+            raise
         except Exception as e:
-            logger.debug(f"Error al parsear el Docker Compose: {str(e)}")
+            logger.debug("Error al parsear el Docker Compose: %s", e)
             return {}
 
+    def split_services(self, docker_compose_content: str) -> List[Tuple[str, str]]:
+        """
+        Separa un Docker Compose en un documento por servicio.
+
+        Devuelve una lista de tuplas (servicio, texto del compose con solo ese servicio).
+        Con un único servicio se devuelve el texto original sin volver a serializarlo.
+        """
+        docker_compose = resolve_compose(docker_compose_content)
+        if not isinstance(docker_compose.get('services'), dict) or not docker_compose['services']:
+            raise ValueError("El archivo Docker Compose no tiene la sección 'services'")
+
+        services = docker_compose['services']
+        if len(services) == 1:
+            return [(str(next(iter(services))), docker_compose_content)]
+        # Los servicios ya están interpolados: se escapan los $ para que no se vuelvan a sustituir
+        return [
+            (str(name), yaml.safe_dump({'services': {name: escape_dollars(service)}}, sort_keys=False, allow_unicode=True))
+            for name, service in services.items()
+        ]
+
     def get_github_repo_images(self, repo_url: str) -> List[str]:
         """
         Obtiene todos los archivos de imagen (.jpg, .jpeg, .png, .ico) del repositorio de GitHub.
@@ -153,7 +337,7 @@ class UnraidTemplateConverter:
             # Formato: https://github.com/{owner}/{repo}
             parts = repo_url.strip("/").split("/")
             if len(parts) < 5:
-                logger.debug(f"URL de GitHub inválida: {repo_url}")
+                logger.debug("URL de GitHub inválida: %s", repo_url)
                 return []
             
             owner = parts[3]
@@ -163,14 +347,14 @@ class UnraidTemplateConverter:
             api_url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/main?recursive=1"
             
             # Hacer la solicitud a la API
-            response = requests.get(api_url)
+            response = http_get(api_url)
             if response.status_code == 404:
                 # Si no encontramos la rama 'main', intentamos con 'master'
                 api_url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/master?recursive=1"
-                response = requests.get(api_url)
+                response = http_get(api_url)
                 
             if response.status_code != 200:
-                logger.debug(f"Error al acceder a la API de GitHub: {response.status_code}")
+                logger.debug("Error al acceder a la API de GitHub: %s", response.status_code)
                 return []
             
             # Obtener los datos de la respuesta
@@ -181,22 +365,24 @@ class UnraidTemplateConverter:
             for item in data.get('tree', []):
                 if item.get('type') == 'blob':  # Es un archivo
                     path = item.get('path', '')
-                    if any(path.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.ico', '.gif', '.svg']):
+                    if path.lower().endswith(IMAGE_EXTENSIONS):
                         # Construir la URL para la imagen raw
                         raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{'main' if 'main' in api_url else 'master'}/{path}"
                         images.append(raw_url)
             
             return images
         except Exception as e:
-            logger.debug(f"Error al obtener imágenes del repositorio: {str(e)}")
+            logger.debug("Error al obtener imágenes del repositorio: %s", e)
             return []
 
+    @FUNCTION_SECONDS.time()
     def generate_unraid_template(self, 
                                 docker_compose: Dict[str, Any], 
                                 icon_url: str = "", 
                                 description: str = "",
                                 web_port: str = "",
-                                app_fields: Dict[str, str] = None) -> str:
+                                app_fields: Dict[str, str] = None,
+                                installed_at: int = None) -> str:
         """
         Genera la plantilla de Unraid a partir del Docker Compose.
         
@@ -206,260 +392,300 @@ class UnraidTemplateConverter:
             description: Descripción para la plantilla (mantenido por compatibilidad).
             web_port: Puerto web seleccionado para la etiqueta WebUI (formato "host:container").
             app_fields: Diccionario con campos adicionales de la aplicación.
+            installed_at: Marca de tiempo de DateInstalled; si se indica, el resultado es determinista.
         """
         try:
             # Verificar que tenemos los mapeos necesarios
             if not self.mapeo_compose or not self.mapeo_app:
                 raise ValueError("Los mapeos de campos necesarios no están disponibles. No se puede generar la plantilla.")
-                
-            # Crear una copia de la plantilla base
-            template = self.template_base
-            
-            # Extraer el registro de la imagen si está presente
-            registry = ""
-            if 'image' in docker_compose and docker_compose['image']:
-                registry = self.extract_registry_from_image(docker_compose['image'])
-                # Aplicar el registro a la etiqueta Registry en la plantilla
-                template = re.sub('<Registry>(.*?)</Registry>', f'<Registry>{registry}</Registry>', template)
-            
-            # Aplicar mapeo directo de campos del docker-compose a etiquetas XML
-            for compose_key, unraid_tag in self.mapeo_compose.items():
-                if compose_key in docker_compose and docker_compose[compose_key]:
-                    # Caso especial para el comando, que podría ser una lista
-                    if compose_key == 'command':
-                        command_value = docker_compose[compose_key]
-                        # Si command es una lista, lo convertimos en una cadena
-                        if isinstance(command_value, list):
-                            command_value = ' '.join(command_value)
-                        # Reemplazamos la etiqueta PostArgs con el valor del comando
-                        tag_pattern = f'<{unraid_tag}>(.*?)</{unraid_tag}>'
-                        replacement = f'<{unraid_tag}>{command_value}</{unraid_tag}>'
-                        template = re.sub(tag_pattern, replacement, template)
-                        continue  # Saltamos al siguiente campo
-                    
-                    # Caso especial para privileged: tiene su propia etiqueta en la plantilla de Unraid
-                    if compose_key == 'privileged':
-                        # Privileged se maneja directamente con su etiqueta: <Privileged>true|false</Privileged>
-                        value = str(docker_compose[compose_key]).lower()  # Convertir a string "true" o "false"
-                        tag_pattern = f'<{unraid_tag}>(.*?)</{unraid_tag}>'
-                        replacement = f'<{unraid_tag}>{value}</{unraid_tag}>'
-                        template = re.sub(tag_pattern, replacement, template)
-                        continue  # Saltamos al siguiente campo
-                        
-                    # Casos especiales para opciones booleanas que deben transformarse en flags de línea de comandos
-                    bool_flag_options = {
-                        'tty': '--tty',
-                        'init': '--init',
-                        'read_only': '--read-only',
-                        'stdin_open': '--interactive'
-                    }
-                    
-                    if compose_key in bool_flag_options and docker_compose[compose_key] is True:
-                        # Si la opción booleana es true, agregamos el flag correspondiente
-                        tag_pattern = f'<{unraid_tag}>(.*?)</{unraid_tag}>'
-                        
-                        # Si ya hay contenido en la etiqueta, lo preservamos y añadimos el nuevo flag
-                        match = re.search(tag_pattern, template)
-                        current_content = match.group(1) if match else ""
-                        
-                        # Si ya hay contenido, agregamos un espacio antes del nuevo flag
-                        new_content = f"{current_content} {bool_flag_options[compose_key]}".strip()
-                        
-                        replacement = f'<{unraid_tag}>{new_content}</{unraid_tag}>'
-                        template = re.sub(tag_pattern, replacement, template)
-                        continue  # Saltamos al siguiente campo
-                    
-                    # Procesamiento normal para otros campos
-                    # Usamos expresiones regulares para encontrar y reemplazar dentro de las etiquetas
-                    tag_pattern = f'<{unraid_tag}>(.*?)</{unraid_tag}>'
-                    replacement = f'<{unraid_tag}>{docker_compose[compose_key]}</{unraid_tag}>'
-                    template = re.sub(tag_pattern, replacement, template)
-            
-            # Aplicar mapeo directo de campos de la aplicación a etiquetas XML
-            logger.debug(f"mapeo_app actual: {self.mapeo_app}")
-            logger.debug(f"app_fields recibidos: {app_fields}")
-            
-            if app_fields and self.mapeo_app:
-                for app_key, value in app_fields.items():
-                    logger.debug(f"Procesando app_key: {app_key}, value: {value}")
-                    if app_key in self.mapeo_app and value:
-                        unraid_tag = self.mapeo_app[app_key]
-                        logger.debug(f"unraid_tag encontrado: '{unraid_tag}'")
-                        if unraid_tag:  # Asegurarse de que no está vacío
-                            tag_pattern = f'<{unraid_tag}>(.*?)</{unraid_tag}>'
-                            replacement = f'<{unraid_tag}>{value}</{unraid_tag}>'
-                            template = re.sub(tag_pattern, replacement, template)
-                            logger.debug(f"Aplicando mapeo app: <{unraid_tag}> = {value}")
-                        else:
-                            logger.debug(f"ERROR - El mapeo para {app_key} está vacío")
-            
-            # Para mantener compatibilidad con el código existente
-            # Estos parámetros son redundantes con app_fields, pero se mantienen por compatibilidad
-            if icon_url and not (app_fields and "Icon" in app_fields):
-                template = re.sub('<Icon>(.*?)</Icon>', f'<Icon>{icon_url}</Icon>', template)
-            
-            if description and not (app_fields and "Overview" in app_fields):
-                template = re.sub('<Overview>(.*?)</Overview>', f'<Overview>{description}</Overview>', template)
-            
-            # Reemplazar la fecha de instalación con la fecha actual
-            current_timestamp = str(int(datetime.now().timestamp()))
-            template = re.sub('<DateInstalled>(.*?)</DateInstalled>', f'<DateInstalled>{current_timestamp}</DateInstalled>', template)
-            
-            # Configurar WebUI si se proporciona un puerto web
-            if web_port:
-                try:
-                    host_port, container_port = web_port.split(':')
-                    webui_url = f'http://[IP]:[PORT:{host_port}]/'
-                    template = re.sub('<WebUI>(.*?)</WebUI>', f'<WebUI>{webui_url}</WebUI>', template)
-                except Exception as e:
-                    logger.debug(f"Error al configurar WebUI con puerto {web_port}: {str(e)}")
-            
-            # Generar configuraciones para variables de entorno, volúmenes y puertos
-            config_sections = []
-            
-            # Procesar variables de entorno
-            if 'environment' in docker_compose and docker_compose['environment']:
-                for env in docker_compose['environment']:
-                    if isinstance(env, str) and '=' in env:
-                        key, value = env.split('=', 1)
-                        config_sections.append(f'  <Config Name="{key}" Target="{key}" Default="" Mode="" Description="" Type="Variable" Display="always" Required="false" Mask="false">{value}</Config>')
-                    elif isinstance(env, dict):
-                        for k, v in env.items():
-                            config_sections.append(f'  <Config Name="{k}" Target="{k}" Default="" Mode="" Description="" Type="Variable" Display="always" Required="false" Mask="false">{v}</Config>')
-            
-            # Procesar labels
-            if 'labels' in docker_compose and docker_compose['labels']:
-                # Debug para verificar el formato de las etiquetas
-                logger.debug(f"Procesando etiquetas: {docker_compose['labels']}")
-                
-                for label in docker_compose['labels']:
-                    if isinstance(label, str) and '=' in label:
-                        key, value = label.split('=', 1)
-                        # Limpiar posibles comillas en el valor
-                        value = value.strip("'\"")
-                        logger.debug(f"Agregando etiqueta: {key}={value}")
-                        config_sections.append(f'  <Config Name="{key}" Target="{key}" Default="" Mode="" Description="" Type="Label" Display="always" Required="false" Mask="false">{value}</Config>')
-                    elif isinstance(label, dict):
-                        for k, v in label.items():
-                            # Limpiar posibles comillas en el valor
-                            v = str(v).strip("'\"")
-                            logger.debug(f"Agregando etiqueta (dict): {k}={v}")
-                            config_sections.append(f'  <Config Name="{k}" Target="{k}" Default="" Mode="" Description="" Type="Label" Display="always" Required="false" Mask="false">{v}</Config>')
-            
-            # Procesar volúmenes
-            if 'volumes' in docker_compose and docker_compose['volumes']:
-                for vol in docker_compose['volumes']:
-                    if isinstance(vol, str) and ':' in vol:
-                        parts = vol.split(':')
-                        host_path = parts[0]
-                        container_path = parts[1]
-                        mode = parts[2] if len(parts) > 2 else "rw"
-                        name = os.path.basename(container_path)
-                        config_sections.append(f'  <Config Name="{name}" Target="{container_path}" Default="" Mode="{mode}" Description="" Type="Path" Display="always" Required="false" Mask="false">{host_path}</Config>')
-            
-            # Procesar puertos
-            if 'ports' in docker_compose and docker_compose['ports']:
-                for port in docker_compose['ports']:
-                    if isinstance(port, str) and ':' in port:
-                        host_port, container_port = port.split(':', 1)
-                        protocol = "tcp"
-                        if '/' in container_port:
-                            container_port, protocol = container_port.split('/', 1)
-                        config_sections.append(f'  <Config Name="Puerto {container_port}" Target="{container_port}" Default="" Mode="{protocol}" Description="" Type="Port" Display="always" Required="false" Mask="false">{host_port}</Config>')
-                        
-            # Procesar dispositivos
-            if 'devices' in docker_compose and docker_compose['devices']:
-                # Debug para verificar el formato de los dispositivos
-                logger.debug(f"Procesando dispositivos: {docker_compose['devices']}")
-                
-                for device in docker_compose['devices']:
-                    if isinstance(device, str):
-                        # Limpiar el valor del dispositivo
-                        device_value = device.strip("'\"")
-                        device_name = device_value.split('/')[-1] if '/' in device_value else device_value
-                        
-                        # Verificar si el dispositivo tiene formato host:container
-                        if ':' in device_value:
-                            host_device, container_device = device_value.split(':', 1)
-                            logger.debug(f"Agregando dispositivo mapeado: {host_device} -> {container_device}")
-                            config_sections.append(f'  <Config Name="Dispositivo {device_name}" Target="{container_device}" Default="" Mode="" Description="" Type="Device" Display="always" Required="false" Mask="false">{host_device}</Config>')
-                        else:
-                            # Caso donde el dispositivo es el mismo en host y contenedor
-                            logger.debug(f"Agregando dispositivo directo: {device_value}")
-                            config_sections.append(f'  <Config Name="Dispositivo {device_name}" Target="{device_value}" Default="" Mode="" Description="" Type="Device" Display="always" Required="false" Mask="false">{device_value}</Config>')
-                    elif isinstance(device, dict):
-                        # Caso para formatos más complejos de dispositivos
-                        for path_host, path_container in device.items():
-                            device_name = path_container.split('/')[-1] if '/' in path_container else path_container
-                            logger.debug(f"Agregando dispositivo (dict): {path_host} -> {path_container}")
-                            config_sections.append(f'  <Config Name="Dispositivo {device_name}" Target="{path_container}" Default="" Mode="" Description="" Type="Device" Display="always" Required="false" Mask="false">{path_host}</Config>')
-            
-            # Eliminar todas las etiquetas Config existentes
-            config_pattern = r'<Config.*?</Config>'
-            template = re.sub(config_pattern, '', template, flags=re.DOTALL)
-            
-            # Insertar las nuevas configuraciones antes de cerrar el contenedor
-            if config_sections:
-                all_configs = '\n'.join(config_sections)
-                template = template.replace('</Container>', f'{all_configs}\n</Container>')
-            
-            # Limpiar la plantilla al final del proceso con una limpieza más exhaustiva
-            # 1. Reemplazar múltiples líneas en blanco por una sola
-            template = re.sub(r'\n{2,}', '\n', template)
-            
-            # 2. Asegurar que haya una indentación consistente (2 espacios) para elementos dentro de Container
-            lines = template.split('\n')
-            cleaned_lines = []
-            
-            # Procesamos la declaración XML y la etiqueta Container de apertura tal cual están
-            if lines and lines[0].startswith('<?xml'):
-                cleaned_lines.append(lines[0])
-                
-            container_start_idx = -1
-            for i, line in enumerate(lines):
-                if line.strip().startswith('<Container'):
-                    container_start_idx = i
-                    cleaned_lines.append(line)
-                    break
-            
-            # Si no encontramos la etiqueta Container, usamos los índices por defecto
-            if container_start_idx == -1:
-                container_start_idx = 0 if not cleaned_lines else 1
-                
-            # Procesar todas las líneas entre Container de apertura y cierre con indentación
-            for i in range(container_start_idx + 1, len(lines) - 1):  # -1 para excluir el </Container>
-                line = lines[i].strip()
-                if not line:  # Ignorar líneas vacías
-                    continue
-                    
-                if line.startswith('</'):  # Es una etiqueta de cierre
-                    cleaned_lines.append(f"  {line}")
-                elif line.startswith('<'):  # Es una etiqueta de apertura o auto-cerrada
-                    cleaned_lines.append(f"  {line}")
-                else:  # Es contenido de texto
-                    cleaned_lines.append(f"  {line}")
-            
-            # Agregar la etiqueta Container de cierre
-            if '</Container>' in lines[-1]:
-                cleaned_lines.append('</Container>')
-            else:
-                # Buscar la última etiqueta Container de cierre
-                for i in range(len(lines)-1, -1, -1):
-                    if '</Container>' in lines[i]:
-                        cleaned_lines.append(lines[i])
-                        break
-                else:
-                    # Si no encontramos la etiqueta de cierre, la añadimos
-                    cleaned_lines.append('</Container>')
-            
-            # Recrear la plantilla con las líneas limpias
-            template = '\n'.join(cleaned_lines)
-            
-            return template
+
+            # Valores de las etiquetas de cabecera y grupos de Config
+            tag_values = self.render_compose_tags(docker_compose)
+            tag_values.update(self.render_app_tags(icon_url, description, app_fields))
+            tag_values.update(self.render_date_installed(installed_at))
+            tag_values.update(self.render_webui(web_port))
+
+            fragments = self.render_tag_fragments(tag_values)
+            config_groups = {group: self.render_config_group(group, docker_compose) for group in CONFIG_GROUPS}
+
+            return self.assemble_template(fragments, config_groups)
         except Exception as e:
-            logger.debug(f"Error al generar la plantilla: {str(e)}")
+            logger.debug("Error al generar la plantilla: %s", e)
             return ""
 
+    def _template_layout(self) -> List[tuple]:
+        """
+        Descompone la plantilla base en líneas fijas y etiquetas de cabecera.
+
+        Returns:
+            Lista de tuplas ('tag', etiqueta, valor_por_defecto) o ('raw', línea) en el orden
+            de la plantilla, sin las etiquetas Config de ejemplo ni la etiqueta Container.
+        """
+        if self._layout is not None:
+            return self._layout
+
+        layout = []
+        body = re.sub(r'<Config.*?</Config>', '', self.template_base, flags=re.DOTALL)
+        for line in body.split('\n'):
+            line = line.strip()
+            if not line or line.startswith('<?xml') or line.startswith('<Container') or line.startswith('</Container'):
+                continue
+            match = re.fullmatch(r'<(\w+)>(.*?)</\1>', line)
+            if match:
+                layout.append(('tag', match.group(1), match.group(2)))
+            else:
+                layout.append(('raw', line))
+
+        self._layout = layout
+        return layout
+
+    def compose_tags(self) -> List[str]:
+        """Devuelve las etiquetas de cabecera que se rellenan desde el Docker Compose."""
+        return list(self._tag_keys)
+
+    def tags_for_keys(self, compose_keys) -> set:
+        """Devuelve las etiquetas de cabecera que dependen de alguna de las claves del Docker Compose."""
+        return {rule[1] for compose_key in compose_keys for rule in self._dispatch.get(compose_key, ())}
+
+    def render_compose_tags(self, docker_compose: Dict[str, Any], tags=None) -> Dict[str, str]:
+        """
+        Calcula las etiquetas de cabecera a partir del Docker Compose en una sola pasada.
+
+        Solo se recorren las claves presentes en el servicio; cada una se despacha a los
+        manejadores de sus reglas y los valores de una misma etiqueta se unen con espacios
+        en el orden de las reglas.
+
+        Args:
+            docker_compose: Diccionario con los datos del Docker Compose.
+            tags: Etiquetas a calcular (por defecto, todas).
+
+        Returns:
+            Diccionario {etiqueta: valor} (ya escapado para XML) con las etiquetas a las que
+            el compose aporta valor.
+        """
+        parts: Dict[str, List[Tuple[int, str]]] = {}
+        for compose_key, value in docker_compose.items():
+            rules = self._dispatch.get(compose_key)
+            if rules is None or not value:
+                continue
+            for order, unraid_tag, handler, formato in rules:
+                if tags is not None and unraid_tag not in tags:
+                    continue
+                text = handler(value, formato)
+                if text:
+                    parts.setdefault(unraid_tag, []).append((order, text))
+
+        return {
+            unraid_tag: escape(' '.join(text for _, text in sorted(tag_parts)))
+            for unraid_tag, tag_parts in parts.items()
+        }
+
+    def render_app_tags(self, icon_url: str = "", description: str = "", app_fields: Dict[str, str] = None) -> Dict[str, str]:
+        """Calcula los valores (ya escapados para XML) de las etiquetas que se rellenan desde las opciones de la aplicación."""
+        values = {}
+
+        # Aplicar mapeo directo de campos de la aplicación a etiquetas XML
+        if DEBUG_ENABLED:
+            logger.debug("mapeo_app actual: %s", self.mapeo_app)
+            logger.debug("app_fields recibidos: %s", app_fields)
+
+        if app_fields and self.mapeo_app:
+            for app_key, value in app_fields.items():
+                if DEBUG_ENABLED:
+                    logger.debug("Procesando app_key: %s, value: %s", app_key, value)
+                if app_key in self.mapeo_app and value:
+                    unraid_tag = self.mapeo_app[app_key]
+                    if DEBUG_ENABLED:
+                        logger.debug("unraid_tag encontrado: '%s'", unraid_tag)
+                    if unraid_tag:  # Asegurarse de que no está vacío
+                        values[unraid_tag] = escape(str(value))
+                        if DEBUG_ENABLED:
+                            logger.debug("Aplicando mapeo app: <%s> = %s", unraid_tag, value)
+                    elif DEBUG_ENABLED:
+                        logger.debug("ERROR - El mapeo para %s está vacío", app_key)
+
+        # Para mantener compatibilidad con el código existente
+        # Estos parámetros son redundantes con app_fields, pero se mantienen por compatibilidad
+        if icon_url and not (app_fields and "Icon" in app_fields):
+            values['Icon'] = escape(icon_url)
+
+        if description and not (app_fields and "Overview" in app_fields):
+            values['Overview'] = escape(description)
+
+        return values
+
+    def render_date_installed(self, installed_at: int = None) -> Dict[str, str]:
+        """
+        Calcula la fecha de instalación.
+
+        Usa, por este orden, la marca de tiempo indicada, la fijada en TEMPLATE_DATE_INSTALLED
+        (modo determinista) o la fecha actual.
+        """
+        if installed_at is None:
+            installed_at = TEMPLATE_DATE_INSTALLED
+        if installed_at is None:
+            installed_at = int(datetime.now().timestamp())
+        return {'DateInstalled': str(int(installed_at))}
+
+    def render_webui(self, web_port: str = "") -> Dict[str, str]:
+        """Calcula la etiqueta WebUI si se proporciona un puerto web (formato "host:container")."""
+        if web_port:
+            try:
+                host_port, container_port = web_port.split(':')
+                return {'WebUI': escape(f'http://[IP]:[PORT:{host_port}]/')}
+            except Exception as e:
+                logger.debug("Error al configurar WebUI con puerto %s: %s", web_port, e)
+        return {}
+
+    def render_tag_fragments(self, tag_values: Dict[str, str], tags: List[str] = None) -> Dict[str, str]:
+        """
+        Genera el fragmento XML (ya indentado) de las etiquetas de cabecera.
+
+        Args:
+            tag_values: Valores de las etiquetas; las que no aparecen usan el valor de la plantilla base.
+            tags: Etiquetas a generar (por defecto, todas las de la plantilla base).
+        """
+        fragments = {}
+        for entry in self._template_layout():
+            if entry[0] == 'tag' and (tags is None or entry[1] in tags):
+                unraid_tag = entry[1]
+                fragments[unraid_tag] = self.render_tag_fragment(unraid_tag, tag_values.get(unraid_tag, entry[2]))
+        return fragments
+
+    def render_tag_fragment(self, unraid_tag: str, value: str) -> str:
+        """Genera el fragmento XML (ya indentado) de una etiqueta de cabecera."""
+        return _indent_fragment(f'<{unraid_tag}>{value}</{unraid_tag}>')
+
+    def render_config_group(self, group: str, docker_compose: Dict[str, Any]) -> str:
+        """
+        Genera el fragmento XML (ya indentado) de un grupo de etiquetas Config.
+
+        Args:
+            group: Clave del Docker Compose (environment, labels, volumes, ports o devices).
+            docker_compose: Diccionario con los datos del Docker Compose.
+        """
+        config_sections = []
+
+        if group not in docker_compose or not docker_compose[group]:
+            return ""
+
+        # Procesar variables de entorno
+        if group == 'environment':
+            for env in docker_compose['environment']:
+                if isinstance(env, str) and '=' in env:
+                    key, value = env.split('=', 1)
+                    config_sections.append(_config_tag(key, key, '', 'Variable', value))
+                elif isinstance(env, dict):
+                    for k, v in env.items():
+                        config_sections.append(_config_tag(k, k, '', 'Variable', v))
+
+        # Procesar labels
+        elif group == 'labels':
+            # Debug para verificar el formato de las etiquetas
+            if DEBUG_ENABLED:
+                logger.debug("Procesando etiquetas: %s", docker_compose['labels'])
+
+            for label in docker_compose['labels']:
+                if isinstance(label, str) and '=' in label:
+                    key, value = label.split('=', 1)
+                    # Limpiar posibles comillas en el valor
+                    value = value.strip("'\"")
+                    if DEBUG_ENABLED:
+                        logger.debug("Agregando etiqueta: %s=%s", key, value)
+                    config_sections.append(_config_tag(key, key, '', 'Label', value))
+                elif isinstance(label, dict):
+                    for k, v in label.items():
+                        # Limpiar posibles comillas en el valor
+                        v = str(v).strip("'\"")
+                        if DEBUG_ENABLED:
+                            logger.debug("Agregando etiqueta (dict): %s=%s", k, v)
+                        config_sections.append(_config_tag(k, k, '', 'Label', v))
+
+        # Procesar volúmenes
+        elif group == 'volumes':
+            for vol in docker_compose['volumes']:
+                if isinstance(vol, str) and ':' in vol:
+                    parts = vol.split(':')
+                    host_path = parts[0]
+                    container_path = parts[1]
+                    mode = parts[2] if len(parts) > 2 else "rw"
+                    name = os.path.basename(container_path)
+                    config_sections.append(_config_tag(name, container_path, mode, 'Path', host_path))
+
+        # Procesar puertos
+        elif group == 'ports':
+            for port in docker_compose['ports']:
+                if isinstance(port, str) and ':' in port:
+                    host_port, container_port = port.split(':', 1)
+                    protocol = "tcp"
+                    if '/' in container_port:
+                        container_port, protocol = container_port.split('/', 1)
+                    config_sections.append(_config_tag(f'Puerto {container_port}', container_port, protocol, 'Port', host_port))
+
+        # Procesar dispositivos
+        elif group == 'devices':
+            # Debug para verificar el formato de los dispositivos
+            if DEBUG_ENABLED:
+                logger.debug("Procesando dispositivos: %s", docker_compose['devices'])
+
+            for device in docker_compose['devices']:
+                if isinstance(device, str):
+                    # Limpiar el valor del dispositivo
+                    device_value = device.strip("'\"")
+                    device_name = device_value.split('/')[-1] if '/' in device_value else device_value
+
+                    # Verificar si el dispositivo tiene formato host:container
+                    if ':' in device_value:
+                        host_device, container_device = device_value.split(':', 1)
+                        if DEBUG_ENABLED:
+                            logger.debug("Agregando dispositivo mapeado: %s -> %s", host_device, container_device)
+                        config_sections.append(_config_tag(f'Dispositivo {device_name}', container_device, '', 'Device', host_device))
+                    else:
+                        # Caso donde el dispositivo es el mismo en host y contenedor
+                        if DEBUG_ENABLED:
+                            logger.debug("Agregando dispositivo directo: %s", device_value)
+                        config_sections.append(_config_tag(f'Dispositivo {device_name}', device_value, '', 'Device', device_value))
+                elif isinstance(device, dict):
+                    # Caso para formatos más complejos de dispositivos
+                    for path_host, path_container in device.items():
+                        device_name = path_container.split('/')[-1] if '/' in path_container else path_container
+                        if DEBUG_ENABLED:
+                            logger.debug("Agregando dispositivo (dict): %s -> %s", path_host, path_container)
+                        config_sections.append(_config_tag(f'Dispositivo {device_name}', path_container, '', 'Device', path_host))
+
+        return '\n'.join(_indent_fragment(section) for section in config_sections)
+
+    def assemble_template(self, fragments: Dict[str, str], config_groups: Dict[str, str]) -> str:
+        """
+        Une los fragmentos de cabecera y los grupos de Config en la plantilla final.
+
+        Args:
+            fragments: Fragmentos de cabecera por etiqueta (ver render_tag_fragments).
+            config_groups: Fragmentos de Config por grupo (ver render_config_group).
+        """
+        lines = []
+
+        # Procesamos la declaración XML y la etiqueta Container de apertura tal cual están
+        for line in self.template_base.split('\n'):
+            if line.startswith('<?xml') or line.strip().startswith('<Container'):
+                lines.append(line)
+            if line.strip().startswith('<Container'):
+                break
+
+        for entry in self._template_layout():
+            if entry[0] == 'tag':
+                lines.append(fragments[entry[1]])
+            else:
+                lines.append(f"  {entry[1]}")
+
+        # Insertar las nuevas configuraciones antes de cerrar el contenedor
+        for group in CONFIG_GROUPS:
+            if config_groups.get(group):
+                lines.append(config_groups[group])
+
+        lines.append('</Container>')
+        return '\n'.join(lines)
+
     def extract_ports(self, docker_compose: Dict[str, Any]) -> List[str]:
         """
         Extrae los puertos definidos en el Docker Compose.
@@ -511,44 +737,28 @@ class UnraidTemplateConverter:
             - Docker Hub: 'https://hub.docker.com/r/usuario/repo'
             - GitHub Container Registry: 'https://github.com/usuario/repo/pkgs/container/repo'
             - Otros registros: URL adaptada según el formato correspondiente
+            - Referencia no válida: cadena vacía
         """
-        # Eliminar la etiqueta si existe
-        if ':' in image_name:
-            image_name = image_name.split(':')[0]
-        
-        # Si la imagen contiene una URL de registro, la extraemos
-        if '/' in image_name:
-            parts = image_name.split('/')
-            
-            # Si el primer segmento contiene puntos o :, es probablemente un registro personalizado
-            if '.' in parts[0] or ':' in parts[0]:
-                registry = parts[0]
-                # Extraer usuario y repo (puede haber más de un nivel)
-                repo_path = '/'.join(parts[1:])
-                
-                # Casos especiales para registros conocidos
-                if registry == 'ghcr.io':
-                    # GitHub Container Registry: ghcr.io/usuario/repo -> https://github.com/usuario/repo/pkgs/container/repo
-                    if '/' in repo_path:
-                        user, repo = repo_path.split('/', 1)
-                        # Si el repositorio tiene múltiples partes, tomamos la última como nombre del paquete
-                        if '/' in repo:
-                            package_name = repo.split('/')[-1]
-                        else:
-                            package_name = repo
-                        return f"https://github.com/{user}/{repo.split('/')[0]}/pkgs/container/{package_name}"
-                    return f"https://github.com/orgs/{repo_path}/packages"
-                elif registry == 'quay.io':
-                    # Quay.io: quay.io/usuario/repo -> https://quay.io/repository/usuario/repo
-                    return f"https://quay.io/repository/{repo_path}"
-                else:
-                    # Para otros registros, devolvemos el enlace al registro
-                    return f"https://{registry}"
-            
-            # Es una imagen de Docker Hub con formato usuario/repo
-            else:
-                # Construir URL de Docker Hub: https://hub.docker.com/r/usuario/repo
-                return f"https://hub.docker.com/r/{image_name}"
-        
-        # Es una imagen oficial de Docker Hub (como 'ubuntu' o 'nginx')
-        return f"https://hub.docker.com/_/{image_name}"
+        try:
+            reference = parse_image_reference(image_name)
+        except InvalidReference as e:
+            logger.debug("No se pudo obtener el registro de la imagen: %s", e)
+            return ''
+
+        # Docker Hub y sus espejos (lscr.io): imágenes oficiales en /_/ y el resto en /r/
+        if reference.is_docker_hub:
+            if reference.is_official:
+                return f"https://hub.docker.com/_/{reference.name}"
+            return f"https://hub.docker.com/r/{reference.familiar_name}"
+
+        components = reference.path.split('/')
+        if reference.registry == 'ghcr.io':
+            # GitHub Container Registry: ghcr.io/usuario/repo[/paquete] -> https://github.com/usuario/repo/pkgs/container/paquete
+            if len(components) >= 2:
+                return f"https://github.com/{components[0]}/{components[1]}/pkgs/container/{components[-1]}"
+            return f"https://github.com/orgs/{reference.path}/packages"
+        if reference.registry == 'quay.io':
+            # Quay.io: quay.io/usuario/repo -> https://quay.io/repository/usuario/repo
+            return f"https://quay.io/repository/{reference.path}"
+        # Para otros registros, devolvemos el enlace al registro
+        return f"https://{reference.registry}"
@@ -0,0 +1,291 @@
+"""
+Módulo para ejecutar el trabajo del conversor fuera del bucle de eventos.
+
+El parseo del Docker Compose y la generación de la plantilla se envían a un
+ejecutor acotado (procesos o hilos) con un plazo máximo por trabajo, de forma que
+un compose enorme u hostil no bloquea al resto de sesiones.
+"""
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from unposer.utils.config import COMPOSE_MAX_BYTES, CONVERTER_EXECUTOR, CONVERTER_MAX_PENDING, CONVERTER_TIMEOUT, CONVERTER_WORKERS
+from unposer.utils.converter import UnraidTemplateConverter
+from unposer.utils.metrics import REGISTRY
+from unposer.utils.readme import extract_docker_compose_from_readme
+from unposer.utils.resolve import LocalReader, resolve_compose_text
+from unposer.utils.reverse import template_text_to_service
+from unposer.utils.tracing import span
+from unposer.utils.utils import session_id_var, setup_logger, trace_id_var
+
+logger = setup_logger(__name__)
+
+
+class ConverterBusy(Exception):
+    """Hay demasiados trabajos del conversor en curso."""
+
+
+class ConverterTimeout(Exception):
+    """Un trabajo del conversor ha superado el plazo máximo."""
+
+
+# Conversor propio de cada proceso del ejecutor (se crea al primer uso)
+_worker_converter = None
+
+
+def _get_converter() -> UnraidTemplateConverter:
+    """Devuelve el conversor del proceso actual."""
+    global _worker_converter
+    if _worker_converter is None:
+        _worker_converter = UnraidTemplateConverter()
+    return _worker_converter
+
+
+def _run_job(trace: tuple, fn: Callable, *args) -> tuple:
+    """
+    Ejecuta un trabajo en un proceso del ejecutor con la traza del evento que lo
+    envió y devuelve también sus métricas.
+    """
+    trace_id, session_id = trace
+    trace_id_var.set(trace_id)
+    session_id_var.set(session_id)
+    with span(f"{fn.__name__} (proceso)"):
+        result = fn(*args)
+    return result, REGISTRY.drain()
+
+
+def parse_compose_job(compose_text: str) -> Dict[str, Any]:
+    """Trabajo del ejecutor: parsea el Docker Compose."""
+    return _get_converter().parse_docker_compose(compose_text)
+
+
+def split_services_job(compose_text: str) -> List[Tuple[str, str]]:
+    """Trabajo del ejecutor: separa el Docker Compose en un documento por servicio."""
+    return _get_converter().split_services(compose_text)
+
+
+def generate_template_job(compose_text: str,
+                          icon_url: str = "",
+                          description: str = "",
+                          web_port: str = "",
+                          app_fields: Dict[str, str] = None,
+                          installed_at: int = None) -> str:
+    """Trabajo del ejecutor: parsea el Docker Compose y genera la plantilla Unraid."""
+    converter = _get_converter()
+    docker_compose = converter.parse_docker_compose(compose_text)
+    return converter.generate_unraid_template(docker_compose, icon_url, description, web_port, app_fields, installed_at)
+
+
+def extract_readme_compose_job(readme_text: str) -> Optional[str]:
+    """Trabajo del ejecutor: extrae un Docker Compose válido del README."""
+    return extract_docker_compose_from_readme(readme_text, _get_converter())
+
+
+def resolve_compose_job(compose_text: str, path: str, files: Dict[str, Optional[str]]) -> Tuple[str, List[str], List[str], List[str]]:
+    """
+    Trabajo del ejecutor: resuelve un Docker Compose con sus ficheros relacionados ya descargados.
+
+    Returns:
+        (texto resuelto, ficheros usados, ficheros pedidos que no están en files, avisos)
+    """
+    text, resolver = resolve_compose_text(compose_text, path, files.get)
+    return text, resolver.used, sorted(resolver.missing - files.keys()), resolver.warnings
+
+
+def resolve_compose_file_job(root: str, path: str) -> Tuple[str, List[str], List[str], List[str]]:
+    """
+    Trabajo del ejecutor: lee un Docker Compose de una carpeta y lo resuelve con sus ficheros relacionados.
+
+    Returns:
+        (texto resuelto, ficheros usados, ficheros buscados que no existen, avisos)
+    """
+    read = LocalReader(root, COMPOSE_MAX_BYTES)
+    compose_text = read(path)
+    if compose_text is None:
+        raise FileNotFoundError(path)
+    text, resolver = resolve_compose_text(compose_text, path, read)
+    return text, resolver.used, sorted(resolver.missing), resolver.warnings
+
+
+def reverse_template_job(template: str) -> Tuple[str, Dict[str, Any]]:
+    """Trabajo del ejecutor: reconstruye el servicio del Docker Compose de una plantilla Unraid."""
+    return template_text_to_service(template)
+
+
+def _worker_main(conn):
+    """Bucle de un proceso del conversor: recibe trabajos por la tubería y devuelve su resultado."""
+    while True:
+        try:
+            trace, fn, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply = (True, _run_job(trace, fn, *args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # El resultado o la excepción no se pueden serializar
+            conn.send((False, RuntimeError(f"{fn.__name__}: {e}")))
+
+
+class _WorkerProcess:
+    """Proceso del conversor dedicado a un hilo del ejecutor (un trabajo a la vez)."""
+
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child,), name="unposer-converter", daemon=True)
+        self.process.start()
+        child.close()
+        self.job = None
+        self._lock = threading.Lock()
+
+    def call(self, job: object, trace: tuple, fn: Callable, args: tuple) -> tuple:
+        """Ejecuta un trabajo en el proceso y espera su resultado."""
+        with self._lock:
+            self.job = job
+        try:
+            self.conn.send((trace, fn, args))
+            ok, value = self.conn.recv()
+        finally:
+            with self._lock:
+                self.job = None
+        if not ok:
+            raise value
+        return value
+
+    def terminate(self, job: object) -> bool:
+        """Termina el proceso solo si sigue ejecutando ese trabajo."""
+        with self._lock:
+            if self.job is not job:
+                return False
+            self.process.terminate()
+            return True
+
+
+class ConverterExecutor:
+    """
+    Ejecutor acotado para los trabajos del conversor.
+
+    Un pool de hilos reparte los trabajos; en modo process cada hilo tiene su propio
+    proceso, de forma que al vencer el plazo de un trabajo solo se termina el proceso
+    que lo ejecuta y el resto de trabajos sigue su curso.
+    """
+
+    def __init__(self, kind: str = "process", workers: int = 2, max_pending: int = 16, timeout: float = 10):
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.timeout = timeout
+        self._pool: Executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # spawn evita heredar los hilos del backend al crear los procesos
+        self._context = multiprocessing.get_context("spawn")
+
+    def _get_pool(self) -> Executor:
+        """Crea el pool al primer uso."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="unposer-converter")
+            return self._pool
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ConverterBusy("El conversor está ocupado, inténtalo de nuevo en unos segundos.")
+            self._pending += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def _call_in_thread(self, started: Callable, context: contextvars.Context, fn: Callable, args: tuple) -> Any:
+        """Ejecuta un trabajo en el hilo del pool."""
+        started(None)
+        return context.run(fn, *args)
+
+    def _call_in_process(self, started: Callable, job: object, trace: tuple, fn: Callable, args: tuple) -> tuple:
+        """Ejecuta un trabajo en el proceso del hilo del pool (lo crea si no existe o ha terminado)."""
+        worker = getattr(self._local, "worker", None)
+        if worker is None or not worker.process.is_alive():
+            worker = self._local.worker = _WorkerProcess(self._context)
+        started(worker)
+        try:
+            return worker.call(job, trace, fn, args)
+        except (EOFError, OSError):
+            # Proceso terminado por el plazo o caído: el siguiente trabajo del hilo crea otro
+            self._local.worker = None
+            raise RuntimeError(f"El proceso del conversor terminó durante {fn.__name__}")
+
+    async def run(self, fn: Callable, *args, timeout: float = None) -> Any:
+        """
+        Ejecuta un trabajo del conversor y espera su resultado sin bloquear el bucle de eventos.
+
+        El plazo empieza cuando el trabajo empieza a ejecutarse, no mientras espera su turno.
+
+        Raises:
+            ConverterBusy: Si se ha alcanzado el máximo de trabajos en curso.
+            ConverterTimeout: Si el trabajo supera el plazo máximo.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        started = loop.create_future()
+
+        def mark_started(worker):
+            try:
+                loop.call_soon_threadsafe(lambda: started.done() or started.set_result(worker))
+            except RuntimeError:
+                pass  # el bucle de eventos ya se ha cerrado
+
+        self._acquire()
+        pool = self._get_pool()
+        # En procesos, la traza viaja con el trabajo y las métricas vuelven con el resultado;
+        # en hilos basta con copiar el contexto
+        in_process = self.kind != "thread"
+        job = object()
+        try:
+            if in_process:
+                trace = (trace_id_var.get("----"), session_id_var.get("----"))
+                future = pool.submit(self._call_in_process, mark_started, job, trace, fn, args)
+            else:
+                future = pool.submit(self._call_in_thread, mark_started, contextvars.copy_context(), fn, args)
+        except Exception:
+            self._release()
+            raise
+        # El hueco se libera cuando el trabajo termina realmente, no al vencer el plazo
+        future.add_done_callback(self._release)
+        waiter = asyncio.wrap_future(future)
+
+        with span(fn.__name__, executor=self.kind):
+            try:
+                await asyncio.wait((started, waiter), return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                waiter.cancel()
+                raise
+            try:
+                result = await asyncio.wait_for(waiter, timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning("%s cancelado tras superar el plazo de %.1f s", fn.__name__, timeout)
+                worker = started.result() if started.done() else None
+                if worker is not None:
+                    worker.terminate(job)
+                raise ConverterTimeout(f"El conversor superó el plazo máximo de {timeout:g} segundos.")
+
+        if in_process:
+            result, snapshot = result
+            REGISTRY.merge(snapshot)
+        return result
+
+
+converter_executor = ConverterExecutor(CONVERTER_EXECUTOR, CONVERTER_WORKERS, CONVERTER_MAX_PENDING, CONVERTER_TIMEOUT)
+
+
+async def run_converter(fn: Callable, *args, timeout: float = None) -> Any:
+    """Ejecuta un trabajo en el ejecutor compartido del conversor."""
+    return await converter_executor.run(fn, *args, timeout=timeout)
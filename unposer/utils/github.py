@@ -0,0 +1,406 @@
+"""
+Módulo para localizar un Docker Compose en un repositorio de GitHub.
+
+La búsqueda recorre, por este orden, las rutas prioritarias, los README y el árbol
+completo del repositorio. Después se resuelven sus ficheros relacionados (include,
+extends, env_file, .env y override), descargando solo los que aparecen en el índice
+del árbol del repositorio. Las peticiones HTTP se hacen en hilos y el parseo en el
+ejecutor del conversor, de forma que la búsqueda no bloquea el bucle de eventos.
+Antes de cada petición se informa del progreso (lo que permite cancelarla) y se
+comprueba el plazo máximo: si se supera, se devuelve el mejor candidato encontrado.
+
+Con REDIS_URL las respuestas de GitHub (incluidos los 404) se comparten entre
+workers durante GITHUB_CACHE_TTL segundos, lo que ahorra límite de la API.
+"""
+import asyncio
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from unposer.utils.config import GITHUB_CACHE_TTL, GITHUB_IMPORT_DEADLINE
+from unposer.utils.converter import IMAGE_EXTENSIONS
+from unposer.utils.executor import extract_readme_compose_job, parse_compose_job, resolve_compose_job, run_converter
+from unposer.utils.httpclient import http_get
+from unposer.utils.limits import ComposeLimitError, read_response_limited
+from unposer.utils.resolve import MAX_DEPTH
+from unposer.utils.shared import shared_cache_enabled, shared_get, shared_set
+from unposer.utils.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class ImportCancelled(Exception):
+    """La importación se ha cancelado o ha sido sustituida por otra."""
+
+
+class ImportDeadline(Exception):
+    """La importación ha superado el plazo máximo."""
+
+
+def split_repo_url(repo_url: str) -> Tuple[str, str, str]:
+    """
+    Obtiene las URLs base de un repositorio de GitHub.
+
+    Returns:
+        Tupla (URL del repositorio, URL de los ficheros raw, URL de la API)
+    """
+    base_url = repo_url.strip().rstrip('/')
+    if "blob" in base_url:
+        base_url = base_url.split("/blob/")[0]
+    elif "raw" in base_url:
+        base_url = base_url.split("/raw/")[0]
+
+    raw_base_url = base_url.replace("github.com", "raw.githubusercontent.com")
+    api_base_url = base_url.replace("github.com", "api.github.com/repos")
+    return base_url, raw_base_url, api_base_url
+
+
+def compose_priority(service: Dict[str, Any], rules: List[Dict[str, Any]]) -> int:
+    """
+    Calcula la prioridad de un servicio según las reglas de validación.
+
+    El servicio ya procede de la sección services del compose, por lo que ese campo
+    requerido se da por cumplido.
+
+    Args:
+        service: Servicio devuelto por parse_docker_compose
+        rules: Reglas de validación ordenadas por prioridad
+
+    Returns:
+        Prioridad del compose (menor número = mayor prioridad) o -1 si no cumple ninguna regla
+    """
+    if not service:
+        return -1
+
+    service_str = str(service).lower()
+    for rule in rules:
+        if not all(field in service for field in rule.get('required_fields', []) if field != 'services'):
+            continue
+        if not all(field.lower() in service_str for field in rule.get('must_have', [])):
+            continue
+        if any(field.lower() in service_str for field in rule.get('must_not_have', [])):
+            continue
+        return rule.get('priority', -1)
+    return -1
+
+
+def _split_location(path: str) -> Tuple[str, str]:
+    """Separa la ruta de un fichero del repositorio en (directorio, nombre)."""
+    parts = path.strip('/').split('/')
+    return '/'.join(parts[:-1]), parts[-1]
+
+
+def _shared(fetch: Callable[[str], Tuple[int, Any]]) -> Callable[[str], Tuple[int, Any]]:
+    """Comparte entre workers las respuestas definitivas (200 y 404) de una descarga."""
+    namespace = f"github{fetch.__name__}"
+
+    @functools.wraps(fetch)
+    def wrapper(url: str) -> Tuple[int, Any]:
+        if not shared_cache_enabled():
+            return fetch(url)
+        cached = shared_get(namespace, url)
+        if cached is not None:
+            return cached[0], cached[1]
+        status, data = fetch(url)
+        if status in (200, 404):
+            shared_set(namespace, url, [status, data], GITHUB_CACHE_TTL)
+        return status, data
+    return wrapper
+
+
+@_shared
+def _fetch_text(url: str) -> Tuple[int, Optional[str]]:
+    """Descarga un fichero de texto respetando el tamaño máximo de entrada."""
+    response = http_get(url, stream=True)
+    if response.status_code != 200:
+        response.close()
+        return response.status_code, None
+    return response.status_code, read_response_limited(response)
+
+
+@_shared
+def _fetch_json(url: str) -> Tuple[int, Optional[Any]]:
+    """Descarga una respuesta JSON de la API de GitHub."""
+    response = http_get(url)
+    if response.status_code != 200:
+        return response.status_code, None
+    return response.status_code, response.json()
+
+
+class GithubComposeFinder:
+    """Busca el mejor Docker Compose de un repositorio de GitHub."""
+
+    def __init__(self,
+                 repo_url: str,
+                 priority_paths: List[str],
+                 branches: List[str],
+                 rules: List[Dict[str, Any]],
+                 deadline: float = GITHUB_IMPORT_DEADLINE,
+                 progress: Callable[["GithubComposeFinder"], Awaitable[bool]] = None):
+        """
+        Args:
+            repo_url: URL del repositorio de GitHub
+            priority_paths: Rutas donde buscar primero el docker-compose
+            branches: Ramas prioritarias donde buscar el README
+            rules: Reglas de validación para calcular la prioridad de cada compose
+            deadline: Plazo máximo de la búsqueda en segundos
+            progress: Función llamada antes de cada petición; si devuelve False se cancela la búsqueda
+        """
+        self.base_url, self.raw_base_url, self.api_base_url = split_repo_url(repo_url)
+        self.priority_paths = priority_paths
+        self.branches = branches
+        self.rules = rules
+        self.deadline = deadline
+        self.progress = progress
+
+        self.stage = ""
+        self.requests = 0
+        self.messages: List[Tuple[str, str]] = []
+        self.repo_data: Optional[Dict[str, Any]] = None
+        self.best: Optional[Dict[str, Any]] = None
+        self._start = time.monotonic()
+        # Rama -> rutas de los ficheros del repositorio (None si no se pudo obtener el árbol)
+        self._trees: Dict[str, Optional[List[str]]] = {}
+
+    @property
+    def elapsed(self) -> float:
+        """Segundos transcurridos desde el inicio de la búsqueda."""
+        return time.monotonic() - self._start
+
+    def deadline_reached(self) -> bool:
+        """Indica si se ha superado el plazo máximo."""
+        return self.elapsed >= self.deadline
+
+    def notify(self, level: str, message: str):
+        """Guarda un mensaje para mostrarlo al terminar (success, info, warning o error)."""
+        self.messages.append((level, message))
+
+    async def _checkpoint(self):
+        """Informa del progreso y comprueba la cancelación y el plazo máximo."""
+        if self.progress and not await self.progress(self):
+            raise ImportCancelled()
+        if self.deadline_reached():
+            raise ImportDeadline()
+
+    async def _set_stage(self, stage: str):
+        self.stage = stage
+        await self._checkpoint()
+
+    async def _request(self, fetch: Callable, url: str) -> Tuple[int, Optional[Any]]:
+        """Hace una petición en un hilo; los errores de red se tratan como respuesta vacía."""
+        await self._checkpoint()
+        self.requests += 1
+        try:
+            return await asyncio.to_thread(fetch, url)
+        except (requests.RequestException, ComposeLimitError, ValueError) as e:
+            logger.debug("Error al descargar %s: %s", url, e)
+            return 0, None
+
+    async def _parse(self, compose_text: str) -> Optional[Dict[str, Any]]:
+        """Parsea un candidato en el ejecutor; devuelve None si no es un compose válido."""
+        if not compose_text or not compose_text.strip():
+            return None
+        try:
+            service = await run_converter(parse_compose_job, compose_text)
+        except Exception as e:
+            logger.debug("Candidato descartado: %s", e)
+            return None
+        return service if 'image' in service else None
+
+    def _set_best(self, compose_text: str, branch: str, path: str, priority: int = None):
+        directory, filename = _split_location(path)
+        self.best = {
+            'text': compose_text,
+            'branch': branch,
+            'directory': directory,
+            'filename': filename,
+            'path': path,
+            'priority': priority,
+        }
+
+    async def find(self) -> Optional[Dict[str, Any]]:
+        """
+        Busca el Docker Compose del repositorio.
+
+        Returns:
+            Diccionario con text, branch, directory, filename, path y priority del mejor
+            compose encontrado, o None si no se encontró ninguno.
+
+        Raises:
+            ImportCancelled: Si la búsqueda se cancela o la sustituye otra importación.
+        """
+        try:
+            branch = await self._default_branch()
+            if await self._search_priority_paths(branch):
+                return self.best
+            if await self._search_readme(branch):
+                return self.best
+            await self._search_tree(branch)
+        except ImportDeadline:
+            logger.info("Importación de %s detenida tras %.1f s y %s peticiones", self.base_url, self.elapsed, self.requests)
+            if self.best:
+                self.notify("warning", f"Se alcanzó el plazo máximo de {self.deadline:g} segundos; se usa el mejor Docker Compose encontrado hasta ahora.")
+            else:
+                self.notify("error", f"Se alcanzó el plazo máximo de {self.deadline:g} segundos sin encontrar un Docker Compose.")
+        return self.best
+
+    async def find_images(self) -> List[str]:
+        """
+        Busca las imágenes del repositorio si queda tiempo dentro del plazo.
+
+        Usa el árbol de la rama del compose encontrado (o main y, si no existe, master), con
+        el mismo plazo y contador de peticiones que el resto de la búsqueda.
+        """
+        branches = [self.best['branch']] if self.best else ['main', 'master']
+        try:
+            await self._set_stage("Buscando imágenes")
+            for branch in branches:
+                blobs = await self._tree(branch)
+                if blobs is not None:
+                    return [f"{self.raw_base_url}/{branch}/{path}" for path in blobs
+                            if path.lower().endswith(IMAGE_EXTENSIONS)]
+        except ImportDeadline:
+            pass
+        return []
+
+    async def _default_branch(self) -> str:
+        """Determina la rama principal del repositorio (main o master)."""
+        await self._set_stage("Consultando el repositorio")
+        status, repo_data = await self._request(_fetch_json, self.api_base_url)
+        if status == 200 and isinstance(repo_data, dict):
+            self.repo_data = repo_data
+            return repo_data.get('default_branch', 'main')
+
+        # Sin API (límite de peticiones, repositorio privado...) probamos main y si no master
+        status, _ = await self._request(_fetch_text, f"{self.raw_base_url}/main/README.md")
+        return "main" if status == 200 else "master"
+
+    async def _search_priority_paths(self, branch: str) -> bool:
+        """Busca en las rutas prioritarias y se queda con el compose de mayor prioridad."""
+        await self._set_stage("Buscando en las rutas prioritarias")
+        best_possible = min((rule.get('priority', -1) for rule in self.rules), default=-1)
+
+        for compose_path in self.priority_paths:
+            status, compose_text = await self._request(_fetch_text, f"{self.raw_base_url}/{branch}{compose_path}")
+            if status != 200:
+                continue
+            service = await self._parse(compose_text)
+            priority = compose_priority(service, self.rules)
+            if priority == -1:
+                continue
+            if self.best is None or priority < self.best['priority']:
+                self._set_best(compose_text, branch, compose_path, priority)
+                # No puede aparecer un compose mejor que el de máxima prioridad
+                if priority == best_possible:
+                    break
+
+        if self.best:
+            self.notify("success", f"Docker Compose válido encontrado en {self.best['path']} (prioridad {self.best['priority']}).")
+            return True
+        return False
+
+    async def _search_readme(self, branch: str) -> bool:
+        """Busca un bloque docker-compose en el README de las ramas prioritarias."""
+        await self._set_stage("Buscando en el README")
+        readme_branches = [branch] + [b for b in self.branches if b != branch]
+
+        for readme_branch in readme_branches:
+            for readme_name in ("README.md", "readme.md"):
+                status, readme_text = await self._request(_fetch_text, f"{self.raw_base_url}/{readme_branch}/{readme_name}")
+                if status != 200:
+                    continue
+                await self._checkpoint()
+                try:
+                    compose_text = await run_converter(extract_readme_compose_job, readme_text)
+                except Exception as e:
+                    logger.debug("Error al analizar el README: %s", e)
+                    compose_text = None
+                if compose_text:
+                    self._set_best(compose_text, readme_branch, readme_name)
+                    self.notify("success", "Se encontró un Docker Compose válido en el README.")
+                    return True
+                # Solo se analiza el primer README encontrado
+                return False
+        return False
+
+    async def _tree(self, branch: str) -> Optional[List[str]]:
+        """Rutas de los ficheros del repositorio en una rama (el árbol se pide una sola vez)."""
+        if branch not in self._trees:
+            status, contents = await self._request(_fetch_json, f"{self.api_base_url}/git/trees/{branch}?recursive=1")
+            if status != 200 or not isinstance(contents, dict):
+                self._trees[branch] = None
+            else:
+                self._trees[branch] = [item.get('path') for item in contents.get('tree', [])
+                                       if item.get('type') == 'blob' and item.get('path')]
+        return self._trees[branch]
+
+    async def _search_tree(self, branch: str) -> bool:
+        """Busca archivos docker-compose en todo el árbol del repositorio."""
+        await self._set_stage("Buscando en otros directorios")
+        blobs = await self._tree(branch)
+        if blobs is None:
+            return False
+
+        # Primero los archivos que coinciden con los patrones prioritarios
+        docker_compose_files = []
+        for priority_path in self.priority_paths:
+            search_file = priority_path.lstrip('/')
+            docker_compose_files.extend(path for path in blobs if path.endswith(search_file))
+
+        # Si no hay ninguno, cualquier docker-compose
+        if not docker_compose_files:
+            docker_compose_files = [path for path in blobs if path.endswith(('docker-compose.yml', 'docker-compose.yaml'))]
+
+        for file_path in docker_compose_files:
+            status, compose_text = await self._request(_fetch_text, f"{self.raw_base_url}/{branch}/{file_path}")
+            if status != 200:
+                continue
+            if await self._parse(compose_text) is not None:
+                self._set_best(compose_text, branch, file_path)
+                self.notify("success", f"Docker Compose válido encontrado en {file_path}.")
+                return True
+        return False
+
+    async def resolve(self, candidate: Dict[str, Any]) -> str:
+        """
+        Resuelve los ficheros relacionados del compose encontrado y lo devuelve como un único documento.
+
+        Solo se descargan los ficheros referenciados que existen en el índice del árbol
+        (si no se pudo obtener, se prueban todos). Al superar el plazo o si el compose no
+        se puede resolver se devuelve el texto original.
+
+        Raises:
+            ImportCancelled: Si la búsqueda se cancela o la sustituye otra importación.
+        """
+        path = candidate['path'].lstrip('/')
+        branch = candidate['branch']
+        files: Dict[str, Optional[str]] = {}
+        try:
+            await self._set_stage("Resolviendo ficheros relacionados")
+            # Cada ronda descarga los ficheros que pidió la anterior (include dentro de include...)
+            for _ in range(MAX_DEPTH + 1):
+                text, used, missing, warnings = await run_converter(resolve_compose_job, candidate['text'], path, files)
+                if not missing:
+                    break
+                tree = await self._tree(branch)
+                for missing_path in missing:
+                    if tree is not None and missing_path not in tree:
+                        files[missing_path] = None
+                        continue
+                    status, file_text = await self._request(_fetch_text, f"{self.raw_base_url}/{branch}/{missing_path}")
+                    files[missing_path] = file_text if status == 200 else None
+        except ImportCancelled:
+            raise
+        except ImportDeadline:
+            return candidate['text']
+        except Exception as e:
+            logger.debug("No se pudieron resolver los ficheros relacionados de %s: %s", path, e)
+            return candidate['text']
+
+        if used:
+            self.notify("info", f"Docker Compose combinado con {', '.join(used)}.")
+        if warnings:
+            self.notify("warning", " ".join(f"{warning}." for warning in warnings))
+        return text
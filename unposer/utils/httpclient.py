@@ -0,0 +1,103 @@
+"""
+Módulo con las peticiones HTTP salientes del backend.
+
+Todas las peticiones a GitHub y a URLs externas pasan por aquí: se reutiliza una
+sesión de requests por hilo (conexiones persistentes), se aplica un plazo por
+defecto y se registran las métricas por host y código de estado, junto con el
+margen del límite de peticiones de la API de GitHub. Cada petición cuenta en el
+tramo de traza actual.
+
+Las URLs de GitHub se redirigen a GITHUB_API_URL y GITHUB_RAW_URL cuando se
+configuran, lo que permite ejecutar la búsqueda contra un servidor local.
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from unposer.utils.config import GITHUB_API_URL, GITHUB_RAW_URL, GITHUB_TIMEOUT
+from unposer.utils.metrics import GITHUB_RATELIMIT_LIMIT, GITHUB_RATELIMIT_REMAINING, HTTP_REQUESTS, HTTP_SECONDS
+from unposer.utils.tracing import count_http_call
+from unposer.utils.utils import DEBUG_ENABLED, setup_logger
+
+logger = setup_logger(__name__)
+
+_local = threading.local()
+
+# Hosts con etiqueta propia en las métricas; el resto se agrupa en "other" para acotar las series
+METRIC_HOSTS = {"api.github.com", "raw.githubusercontent.com"}
+
+# Prefijos de GitHub redirigidos a otra URL base (vacío con la configuración por defecto)
+_UPSTREAMS = [
+    (prefix, base)
+    for prefix, base in (("https://api.github.com", GITHUB_API_URL), ("https://raw.githubusercontent.com", GITHUB_RAW_URL))
+    if base != prefix
+]
+
+
+def _session() -> requests.Session:
+    """Sesión de requests del hilo actual."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+def _record_ratelimit(response: requests.Response):
+    remaining = response.headers.get("X-RateLimit-Remaining")
+    if remaining is None:
+        return
+    resource = response.headers.get("X-RateLimit-Resource", "core")
+    try:
+        GITHUB_RATELIMIT_REMAINING.set(int(remaining), resource=resource)
+        limit = response.headers.get("X-RateLimit-Limit")
+        if limit is not None:
+            GITHUB_RATELIMIT_LIMIT.set(int(limit), resource=resource)
+    except ValueError:
+        pass
+
+
+def _resolve(url: str) -> str:
+    """Aplica la redirección de las URLs de GitHub configurada."""
+    for prefix, base in _UPSTREAMS:
+        if url.startswith(prefix + "/"):
+            return base + url[len(prefix):]
+    return url
+
+
+def _host_label(url: str) -> str:
+    """Etiqueta del host de una URL para las métricas (other si no es un host conocido)."""
+    host = urlsplit(url).hostname or ""
+    return host if host in METRIC_HOSTS else "other"
+
+
+def http_request(method: str, url: str, **kwargs) -> requests.Response:
+    """Hace una petición HTTP registrando su duración y resultado."""
+    kwargs.setdefault("timeout", GITHUB_TIMEOUT)
+    # La etiqueta se calcula antes de la redirección: las peticiones a GitHub cuentan como tales
+    host = _host_label(url)
+    if _UPSTREAMS:
+        url = _resolve(url)
+    status = "error"
+    count_http_call()
+    start = time.perf_counter()
+    try:
+        response = _session().request(method, url, **kwargs)
+        status = str(response.status_code)
+        _record_ratelimit(response)
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        HTTP_REQUESTS.inc(host=host, status=status)
+        HTTP_SECONDS.observe(elapsed, host=host, status=status)
+        if DEBUG_ENABLED:
+            logger.debug("%s %s -> %s en %.1f ms", method, url, status, elapsed * 1000)
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    return http_request("GET", url, **kwargs)
+
+
+def http_head(url: str, **kwargs) -> requests.Response:
+    return http_request("HEAD", url, **kwargs)
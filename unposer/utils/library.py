@@ -0,0 +1,258 @@
+"""
+Módulo con el índice de la biblioteca de plantillas (la carpeta de plantillas de Unraid).
+
+La carpeta `templates-user` suele tener cientos de my-*.xml. Cada plantilla se lee
+con un parseo en flujo (iterparse, sin construir el árbol completo) del que solo
+se guardan Name, Repository y los puertos y rutas del host. El índice se guarda
+en un SQLite pequeño y se mantiene al día por (mtime, tamaño): solo se vuelven a
+leer las plantillas que cambian y se olvidan las que desaparecen.
+
+Con el índice se detectan los conflictos antes de guardar una plantilla (otra
+aplicación con el mismo fichero, el mismo nombre o los mismos puertos o rutas del
+host) y se busca en la biblioteca desde la interfaz y la API.
+"""
+import asyncio
+import io
+import os
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Tuple
+
+from unposer.utils.config import LIBRARY_DB, LIBRARY_SYNC_INTERVAL, TEMPLATES_DIR
+from unposer.utils.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+DB_NAME = ".unposer-library.sqlite"
+# Versión del esquema: al cambiar se reconstruye el índice
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS templates (
+    filename TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    repository TEXT NOT NULL DEFAULT '',
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS ports (
+    filename TEXT NOT NULL REFERENCES templates(filename) ON DELETE CASCADE,
+    host_port TEXT NOT NULL,
+    container_port TEXT NOT NULL,
+    protocol TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS paths (
+    filename TEXT NOT NULL REFERENCES templates(filename) ON DELETE CASCADE,
+    host_path TEXT NOT NULL,
+    container_path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS templates_name ON templates(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS ports_host ON ports(host_port, protocol);
+CREATE INDEX IF NOT EXISTS paths_host ON paths(host_path);
+"""
+
+
+def _config_value(element: ET.Element) -> str:
+    """Valor de una etiqueta Config: su texto o, si está vacío, el atributo Default."""
+    return (element.text or "").strip() or element.get("Default", "").strip()
+
+
+def parse_template(source) -> Dict[str, Any]:
+    """
+    Extrae de una plantilla (ruta o fichero binario) su nombre, repositorio, puertos y rutas.
+
+    El documento se recorre en flujo y cada elemento se libera al procesarlo.
+
+    Raises:
+        ET.ParseError: Si la plantilla no es un XML válido.
+    """
+    info = {"name": "", "repository": "", "ports": [], "paths": []}
+    depth = 0
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        # Solo interesan los hijos directos de <Container>
+        if depth != 1:
+            continue
+        if element.tag == "Name":
+            info["name"] = (element.text or "").strip()
+        elif element.tag == "Repository":
+            info["repository"] = (element.text or "").strip()
+        elif element.tag == "Config":
+            config_type = element.get("Type", "")
+            value = _config_value(element)
+            target = element.get("Target", "").strip()
+            if config_type == "Port" and value:
+                info["ports"].append((value, target, (element.get("Mode") or "tcp").lower()))
+            elif config_type == "Path" and value:
+                info["paths"].append((os.path.normpath(value), target))
+        element.clear()
+    return info
+
+
+def parse_template_text(template: str) -> Dict[str, Any]:
+    """parse_template sobre el texto de una plantilla."""
+    return parse_template(io.BytesIO(template.encode("utf-8")))
+
+
+class TemplateLibrary:
+    """Índice en SQLite de las plantillas de una carpeta."""
+
+    def __init__(self, directory: str = TEMPLATES_DIR, db_path: str = None, sync_interval: float = LIBRARY_SYNC_INTERVAL):
+        self.directory = os.path.abspath(directory)
+        self.db_path = db_path or os.path.join(self.directory, DB_NAME)
+        self.sync_interval = sync_interval
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._last_sync = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre la base de datos al primer uso (y la reconstruye si cambió el esquema)."""
+        if self._db is not None:
+            return self._db
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA foreign_keys=ON")
+        if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            db.executescript("DROP TABLE IF EXISTS ports; DROP TABLE IF EXISTS paths; DROP TABLE IF EXISTS templates;")
+            db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        db.executescript(SCHEMA)
+        self._db = db
+        return db
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Plantillas de la carpeta con su (mtime_ns, tamaño)."""
+        found = {}
+        try:
+            entries = os.scandir(self.directory)
+        except FileNotFoundError:
+            return found
+        with entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.name.endswith(".xml"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if entry.is_file():
+                    found[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def _index_file(self, db: sqlite3.Connection, filename: str, stat: Tuple[int, int]):
+        """Vuelve a leer una plantilla y sustituye sus filas del índice."""
+        error = None
+        try:
+            info = parse_template(os.path.join(self.directory, filename))
+        except (ET.ParseError, OSError) as e:
+            info = {"name": "", "repository": "", "ports": [], "paths": []}
+            error = str(e)
+            logger.warning("Plantilla no indexada %s: %s", filename, e)
+        db.execute("DELETE FROM templates WHERE filename = ?", (filename,))
+        db.execute(
+            "INSERT INTO templates (filename, mtime_ns, size, name, repository, error) VALUES (?, ?, ?, ?, ?, ?)",
+            (filename, stat[0], stat[1], info["name"], info["repository"], error),
+        )
+        db.executemany("INSERT INTO ports VALUES (?, ?, ?, ?)", [(filename, *port) for port in info["ports"]])
+        db.executemany("INSERT INTO paths VALUES (?, ?, ?)", [(filename, *path) for path in info["paths"]])
+
+    def sync(self, force: bool = False) -> int:
+        """
+        Pone al día el índice con la carpeta y devuelve el número de plantillas leídas o eliminadas.
+
+        Sin force no se revisa la carpeta si la última revisión fue hace menos de sync_interval segundos.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_sync is not None and now - self._last_sync < self.sync_interval:
+                return 0
+            db = self._connect()
+            current = self._scan()
+            indexed = {row[0]: (row[1], row[2]) for row in db.execute("SELECT filename, mtime_ns, size FROM templates")}
+            changed = [filename for filename, stat in current.items() if indexed.get(filename) != stat]
+            removed = [filename for filename in indexed if filename not in current]
+            with db:
+                for filename in changed:
+                    self._index_file(db, filename, current[filename])
+                db.executemany("DELETE FROM templates WHERE filename = ?", [(filename,) for filename in removed])
+            self._last_sync = time.monotonic()
+        if changed or removed:
+            logger.info("Biblioteca de plantillas: %s leídas, %s eliminadas (%s en total)",
+                        len(changed), len(removed), len(current))
+        return len(changed) + len(removed)
+
+    def conflicts(self, template: str, filename: str) -> Dict[str, List[str]]:
+        """
+        Conflictos de una plantilla con las de la biblioteca si se guardara como `filename`.
+
+        Returns:
+            Diccionario con las listas de mensajes:
+            - overwrite: el fichero ya existe y es de otra aplicación (otro Repository).
+            - name: otra plantilla usa el mismo Name.
+            - ports: otra plantilla usa el mismo puerto del host.
+            - paths: otra plantilla monta la misma ruta del host.
+        """
+        info = parse_template_text(template)
+        self.sync()
+        result = {"overwrite": [], "name": [], "ports": [], "paths": []}
+        with self._lock:
+            db = self._connect()
+            existing = db.execute("SELECT name, repository FROM templates WHERE filename = ?", (filename,)).fetchone()
+            if existing and existing[1] and info["repository"] and existing[1] != info["repository"]:
+                result["overwrite"].append(
+                    f"{filename} ya existe y es de otra aplicación ({existing[0] or existing[1]}: {existing[1]})"
+                )
+            if info["name"]:
+                for other, in db.execute(
+                        "SELECT filename FROM templates WHERE name = ? COLLATE NOCASE AND filename != ?",
+                        (info["name"], filename)):
+                    result["name"].append(f"El nombre {info['name']} ya lo usa {other}")
+            for host_port, _, protocol in info["ports"]:
+                for other, name in db.execute(
+                        "SELECT DISTINCT p.filename, t.name FROM ports p JOIN templates t USING (filename) "
+                        "WHERE p.host_port = ? AND p.protocol = ? AND p.filename != ?",
+                        (host_port, protocol, filename)):
+                    result["ports"].append(f"El puerto {host_port}/{protocol} ya lo usa {name or other} ({other})")
+            for host_path, _ in info["paths"]:
+                for other, name in db.execute(
+                        "SELECT DISTINCT p.filename, t.name FROM paths p JOIN templates t USING (filename) "
+                        "WHERE p.host_path = ? AND p.filename != ?",
+                        (host_path, filename)):
+                    result["paths"].append(f"La ruta {host_path} ya la monta {name or other} ({other})")
+        return result
+
+    def search(self, query: str = "", limit: int = 50) -> List[Dict[str, str]]:
+        """Plantillas cuyo nombre, repositorio o fichero contienen el texto (todas si está vacío)."""
+        self.sync()
+        pattern = f"%{query.strip()}%"
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT filename, name, repository, "
+                "(SELECT group_concat(host_port || '/' || protocol, ', ') FROM ports p WHERE p.filename = t.filename) "
+                "FROM templates t "
+                "WHERE name LIKE ?1 OR repository LIKE ?1 OR filename LIKE ?1 "
+                "ORDER BY name COLLATE NOCASE, filename LIMIT ?2",
+                (pattern, max(limit, 0)),
+            ).fetchall()
+        return [
+            {"filename": filename, "name": name, "repository": repository, "ports": ports or ""}
+            for filename, name, repository, ports in rows
+        ]
+
+    async def conflicts_async(self, template: str, filename: str) -> Dict[str, List[str]]:
+        """conflicts fuera del bucle de eventos."""
+        return await asyncio.to_thread(self.conflicts, template, filename)
+
+    async def search_async(self, query: str = "", limit: int = 50) -> List[Dict[str, str]]:
+        """search fuera del bucle de eventos."""
+        return await asyncio.to_thread(self.search, query, limit)
+
+
+# Biblioteca de la carpeta de plantillas (la base de datos se abre al primer uso)
+library = TemplateLibrary(TEMPLATES_DIR, LIBRARY_DB or None)
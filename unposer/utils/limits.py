@@ -0,0 +1,140 @@
+"""
+Módulo con los límites de recursos para los Docker Compose subidos o descargados.
+
+Protege el backend compartido frente a ficheros enormes y documentos YAML hostiles
+("billion laughs"): limita los bytes de entrada mientras se leen y, durante la
+composición del YAML, el número de nodos (contando la expansión de los alias),
+el número de alias y la profundidad de anidamiento.
+"""
+from typing import Any
+
+import yaml
+
+from unposer.utils.config import COMPOSE_MAX_ALIASES, COMPOSE_MAX_BYTES, COMPOSE_MAX_DEPTH, COMPOSE_MAX_NODES
+
+# Tamaño de los bloques al leer ficheros y respuestas HTTP
+CHUNK_SIZE = 64 * 1024
+
+
+class ComposeLimitError(ValueError):
+    """El Docker Compose supera alguno de los límites de recursos configurados."""
+
+
+def _format_bytes(size: int) -> str:
+    """Formatea un tamaño en bytes para los mensajes de error."""
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{size / 1024:.0f} KB"
+
+
+def check_size(size: int, max_bytes: int = None):
+    """Comprueba que un tamaño en bytes no supera el límite de entrada."""
+    max_bytes = COMPOSE_MAX_BYTES if max_bytes is None else max_bytes
+    if size > max_bytes:
+        raise ComposeLimitError(f"El archivo supera el tamaño máximo permitido de {_format_bytes(max_bytes)}.")
+
+
+class LimitedSafeLoader(yaml.SafeLoader):
+    """
+    SafeLoader que aplica límites mientras compone el documento.
+
+    Cada nodo guarda su peso (número de nodos que representa una vez expandidos los
+    alias), de forma que un documento con alias anidados se rechaza en cuanto su
+    tamaño expandido supera el límite, sin llegar a construirlo.
+    """
+
+    max_nodes = COMPOSE_MAX_NODES
+    max_aliases = COMPOSE_MAX_ALIASES
+    max_depth = COMPOSE_MAX_DEPTH
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self._depth = 0
+        self._aliases = 0
+        self._weights = {}
+
+    def compose_node(self, parent, index):
+        if self.check_event(yaml.AliasEvent):
+            self._aliases += 1
+            if self._aliases > self.max_aliases:
+                raise ComposeLimitError(f"El Docker Compose supera el máximo de {self.max_aliases} alias.")
+            # El nodo del ancla ya tiene su peso calculado
+            return super().compose_node(parent, index)
+
+        self._depth += 1
+        if self._depth > self.max_depth:
+            raise ComposeLimitError(f"El Docker Compose supera la profundidad máxima de {self.max_depth} niveles.")
+        try:
+            node = super().compose_node(parent, index)
+        finally:
+            self._depth -= 1
+
+        weight = 1
+        if isinstance(node, yaml.SequenceNode):
+            weight += sum(self._weights.get(id(child), 1) for child in node.value)
+        elif isinstance(node, yaml.MappingNode):
+            weight += sum(self._weights.get(id(key), 1) + self._weights.get(id(value), 1) for key, value in node.value)
+
+        if weight > self.max_nodes:
+            raise ComposeLimitError(f"El Docker Compose supera el máximo de {self.max_nodes} nodos (incluyendo alias).")
+
+        self._weights[id(node)] = weight
+        return node
+
+
+def safe_load_limited(content: str) -> Any:
+    """Carga un documento YAML aplicando los límites de tamaño y composición."""
+    # Comprobación rápida por caracteres antes de codificar
+    if len(content) > COMPOSE_MAX_BYTES:
+        check_size(len(content))
+    check_size(len(content.encode("utf-8")))
+
+    loader = LimitedSafeLoader(content)
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+async def read_upload_limited(file, max_bytes: int = None) -> bytes:
+    """Lee un fichero subido por bloques, abortando en cuanto supera el límite."""
+    max_bytes = COMPOSE_MAX_BYTES if max_bytes is None else max_bytes
+
+    # Si conocemos el tamaño, rechazamos sin leer nada
+    size = getattr(file, "size", None)
+    if size is not None:
+        check_size(size, max_bytes)
+
+    chunks = []
+    total = 0
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        check_size(total, max_bytes)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def read_response_limited(response, max_bytes: int = None) -> str:
+    """
+    Lee el cuerpo de una respuesta de requests (pedida con stream=True) abortando
+    en cuanto supera el límite de bytes.
+    """
+    max_bytes = COMPOSE_MAX_BYTES if max_bytes is None else max_bytes
+    try:
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit():
+            check_size(int(content_length), max_bytes)
+
+        chunks = []
+        total = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            total += len(chunk)
+            check_size(total, max_bytes)
+            chunks.append(chunk)
+    finally:
+        response.close()
+
+    return b"".join(chunks).decode(response.encoding or "utf-8", errors="replace")
@@ -0,0 +1,243 @@
+"""
+Módulo con las métricas del backend en formato de texto de Prometheus.
+
+Las métricas se guardan en memoria con un coste mínimo por observación (un
+bloqueo y una suma); el texto solo se genera cuando se consulta /metrics. Los
+valores que ya existen en otros módulos (caché, sesiones activas) se leen en ese
+momento mediante colectores, sin instrumentación adicional.
+
+Los procesos del ejecutor del conversor tienen su propio registro: sus
+observaciones se envían al proceso principal junto con el resultado de cada trabajo.
+"""
+import bisect
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Límites (en segundos) de los buckets de los histogramas de duración
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    """Métrica con etiquetas; los valores se indexan por la tupla de etiquetas."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.label_names, key))
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+    def drain(self) -> Dict[Tuple[str, ...], Any]:
+        """Devuelve los valores acumulados y los reinicia."""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict[Tuple[str, ...], Any]):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, values):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def merge(self, values):
+        with self._lock:
+            self._values.update(values)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def merge(self, values):
+        with self._lock:
+            for key, (counts, total, count) in values.items():
+                entry = self._values.get(key)
+                if entry is None:
+                    entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+    def time(self, **labels):
+        """Decorador que observa la duración de cada llamada."""
+        def decorator(fn: Callable) -> Callable:
+            label_values = labels or {"function": fn.__name__}
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, **label_values)
+            return wrapper
+        return decorator
+
+
+# Un colector devuelve tuplas (nombre, tipo, ayuda, [(etiquetas, valor)]) en el momento de la consulta
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+
+class Registry:
+    """Registro de métricas y colectores."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Collector] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Collector):
+        self.collectors.append(collector)
+
+    def drain(self) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        """Extrae los valores de todas las métricas (para enviarlos al proceso principal)."""
+        snapshot = {}
+        for name, metric in self.metrics.items():
+            values = metric.drain()
+            if values:
+                snapshot[name] = values
+        return snapshot
+
+    def merge(self, snapshot: Dict[str, Dict[Tuple[str, ...], Any]]):
+        """Suma los valores extraídos de otro proceso."""
+        for name, values in (snapshot or {}).items():
+            metric = self.metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+    def render(self) -> str:
+        """Genera el texto de exposición de Prometheus."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for collector in self.collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+FUNCTION_SECONDS = REGISTRY.register(Histogram(
+    "unposer_function_duration_seconds",
+    "Duración de las funciones del conversor.",
+    ["function"],
+))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "unposer_http_requests_total",
+    "Peticiones HTTP salientes por host y código de estado.",
+    ["host", "status"],
+))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "unposer_http_request_duration_seconds",
+    "Duración de las peticiones HTTP salientes (hasta recibir las cabeceras).",
+    ["host", "status"],
+))
+GITHUB_RATELIMIT_REMAINING = REGISTRY.register(Gauge(
+    "unposer_github_ratelimit_remaining",
+    "Peticiones restantes en la ventana de límite de la API de GitHub.",
+    ["resource"],
+))
+GITHUB_RATELIMIT_LIMIT = REGISTRY.register(Gauge(
+    "unposer_github_ratelimit_limit",
+    "Peticiones permitidas en la ventana de límite de la API de GitHub.",
+    ["resource"],
+))
+
+
+def render_metrics() -> str:
+    """Texto de /metrics."""
+    return REGISTRY.render()
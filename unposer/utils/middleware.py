@@ -0,0 +1,38 @@
+"""
+Módulo con los middlewares de Reflex.
+
+Cada evento recibe un identificador de traza y el de su sesión, que aparecen en
+todos los logs emitidos mientras se procesa (incluidos los del conversor y las
+peticiones HTTP), y un tramo raíz que mide su procesamiento. Además se registra
+la actividad de la sesión para la caducidad de las inactivas.
+"""
+from reflex.event import Event
+from reflex.middleware import Middleware
+from reflex.state import BaseState, StateUpdate
+
+from unposer.utils.sessions import reaper
+from unposer.utils.tracing import Span, current_span_var, log_span
+from unposer.utils.utils import generate_trace_id
+
+
+class TraceMiddleware(Middleware):
+    """Asigna una traza nueva a cada evento de Reflex y mide su procesamiento."""
+
+    async def preprocess(self, app, state: BaseState, event: Event) -> StateUpdate | None:
+        generate_trace_id(event.token[:8] if event.token else None)
+        current_span_var.set(Span(event.name.rsplit(".", 1)[-1]))
+        return None
+
+    async def postprocess(self, app, state: BaseState, event: Event, update: StateUpdate) -> StateUpdate:
+        current = current_span_var.get()
+        if update.final and current is not None and current.parent is None and current.finish():
+            log_span(current)
+        return update
+
+
+class SessionActivityMiddleware(Middleware):
+    """Anota el último evento de cada sesión (caducidad de las sesiones inactivas)."""
+
+    async def preprocess(self, app, state: BaseState, event: Event) -> StateUpdate | None:
+        reaper.touch(event.token)
+        return None
@@ -0,0 +1,128 @@
+"""
+Módulo para la vista previa incremental de la plantilla Unraid.
+
+Mantiene el Docker Compose parseado y los fragmentos ya generados de la plantilla
+(cada etiqueta de cabecera y cada grupo de Config), de forma que un cambio en una
+opción o en el compose solo vuelve a generar los fragmentos afectados.
+"""
+from typing import Any, Dict, List
+
+from unposer.utils.converter import CONFIG_GROUPS, UnraidTemplateConverter
+from unposer.utils.utils import DEBUG_ENABLED, setup_logger
+
+logger = setup_logger(__name__)
+
+
+class TemplatePreview:
+    """Vista previa de la plantilla que se actualiza por fragmentos."""
+
+    def __init__(self):
+        self.compose_text: str = None
+        self.docker_compose: Dict[str, Any] = {}
+        self.options: Dict[str, Any] = {}
+
+        # Valores de las etiquetas de cabecera según su origen
+        self.compose_values: Dict[str, str] = {}
+        self.app_values: Dict[str, str] = {}
+        self.webui_values: Dict[str, str] = {}
+        self.date_values: Dict[str, str] = {}
+        self.tag_values: Dict[str, str] = {}
+
+        # Fragmentos generados
+        self.fragments: Dict[str, str] = {}
+        self.config_groups: Dict[str, str] = {}
+
+        # Fragmentos regenerados en la última actualización (para depuración)
+        self.last_rendered: List[str] = []
+
+    def update_compose(self, converter: UnraidTemplateConverter, compose_text: str, docker_compose: Dict[str, Any] = None) -> List[str]:
+        """
+        Actualiza el Docker Compose y regenera solo las secciones cuyas claves han cambiado.
+
+        Args:
+            converter: Conversor usado para generar los fragmentos.
+            compose_text: Contenido del Docker Compose.
+            docker_compose: Compose ya parseado (opcional, se parsea si no se indica).
+
+        Returns:
+            Lista de fragmentos regenerados.
+        """
+        if compose_text == self.compose_text:
+            return []
+
+        if docker_compose is None:
+            docker_compose = converter.parse_docker_compose(compose_text)
+        changed_keys = {
+            key for key in set(self.docker_compose) | set(docker_compose)
+            if self.docker_compose.get(key) != docker_compose.get(key)
+        }
+        self.compose_text = compose_text
+        self.docker_compose = docker_compose
+
+        rendered = []
+        changed_tags = converter.tags_for_keys(changed_keys)
+        if changed_tags:
+            for unraid_tag in changed_tags:
+                self.compose_values.pop(unraid_tag, None)
+            self.compose_values.update(converter.render_compose_tags(docker_compose, changed_tags))
+
+        for group in CONFIG_GROUPS:
+            if group in changed_keys or group not in self.config_groups:
+                self.config_groups[group] = converter.render_config_group(group, docker_compose)
+                rendered.append(group)
+
+        return rendered + self._refresh_fragments(converter)
+
+    def update_options(self,
+                       converter: UnraidTemplateConverter,
+                       icon_url: str = "",
+                       description: str = "",
+                       web_port: str = "",
+                       app_fields: Dict[str, str] = None) -> List[str]:
+        """
+        Actualiza las opciones de la plantilla y regenera solo las etiquetas afectadas.
+
+        Returns:
+            Lista de fragmentos regenerados.
+        """
+        options = {
+            'icon_url': icon_url,
+            'description': description,
+            'web_port': web_port,
+            'app_fields': dict(app_fields or {}),
+        }
+        previous, self.options = self.options, options
+
+        if any(previous.get(key) != options[key] for key in ('icon_url', 'description', 'app_fields')):
+            self.app_values = converter.render_app_tags(icon_url, description, app_fields)
+        if previous.get('web_port') != web_port:
+            self.webui_values = converter.render_webui(web_port)
+
+        return self._refresh_fragments(converter)
+
+    def render(self, converter: UnraidTemplateConverter) -> str:
+        """Une los fragmentos actuales en la plantilla completa."""
+        if not self.date_values:
+            self.date_values = converter.render_date_installed()
+            self._refresh_fragments(converter)
+        return converter.assemble_template(self.fragments, self.config_groups)
+
+    def _refresh_fragments(self, converter: UnraidTemplateConverter) -> List[str]:
+        """Regenera los fragmentos de cabecera cuyo valor final ha cambiado."""
+        tag_values = {**self.compose_values, **self.app_values, **self.date_values, **self.webui_values}
+
+        if not self.fragments:
+            self.fragments = converter.render_tag_fragments(tag_values)
+            changed = list(self.fragments)
+        else:
+            changed = [
+                unraid_tag for unraid_tag in set(tag_values) | set(self.tag_values)
+                if tag_values.get(unraid_tag) != self.tag_values.get(unraid_tag)
+            ]
+            self.fragments.update(converter.render_tag_fragments(tag_values, changed))
+
+        self.tag_values = tag_values
+        self.last_rendered = changed
+        if DEBUG_ENABLED:
+            logger.debug("Fragmentos regenerados en la vista previa: %s", changed)
+        return changed
@@ -0,0 +1,220 @@
+"""
+Módulo con el perfilado bajo demanda de los manejadores de eventos.
+
+Con PROFILING=1 (o con PROFILING_ADMIN_TOKEN, que permite activarlo desde
+/admin/profiling sin reiniciar) los manejadores decorados con @profiled se
+ejecutan bajo cProfile. Las ejecuciones que superan PROFILE_THRESHOLD_MS se
+guardan en PROFILE_DIR como ficheros .prof (pstats), conservando solo los
+PROFILE_KEEP más recientes.
+
+El coste está acotado: solo se perfila una ejecución a la vez, una fracción
+PROFILE_SAMPLE_RATE de las llamadas, y si el perfilado no está disponible el
+decorador devuelve la función original. En los manejadores asíncronos el perfil
+se pausa en cada await/yield y solo recoge sus tramos síncronos: el trabajo de
+otras sesiones que el bucle de eventos intercala mientras tanto no entra en el
+perfil, y las esperas (el ejecutor del conversor, las peticiones HTTP) tampoco.
+El umbral se compara con la duración total de la ejecución.
+"""
+import cProfile
+import functools
+import inspect
+import os
+import random
+import re
+import threading
+import time
+import types
+from typing import Any, Callable, Dict, Optional
+
+from unposer.utils.config import (
+    PROFILE_DIR,
+    PROFILE_KEEP,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_THRESHOLD_MS,
+    PROFILING,
+    PROFILING_ADMIN_TOKEN,
+)
+from unposer.utils.utils import setup_logger, trace_id_var
+
+logger = setup_logger(__name__)
+
+
+class Profiler:
+    """Estado del perfilado: activación, ejecución en curso y volcado de perfiles."""
+
+    def __init__(self, enabled: bool, threshold_ms: float, sample_rate: float, directory: str, keep: int):
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.keep = keep
+        self.profiled = 0
+        self.dumped = 0
+        self._busy = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """Empieza a perfilar si está activado, toca por muestreo y no hay otro perfil en curso."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Hay otra herramienta de perfilado activa en el proceso
+            self._busy.release()
+            return None
+        return profile
+
+    def stop(self, profile: cProfile.Profile, name: str, start: float):
+        """Detiene el perfil y lo guarda si la ejecución ha sido lenta."""
+        profile.disable()
+        self._busy.release()
+        self.profiled += 1
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+        try:
+            path = self._dump(profile, name, elapsed_ms)
+        except OSError as e:
+            logger.error("No se pudo guardar el perfil de %s: %s", name, e)
+            return
+        logger.warning("%s tardó %.0f ms; perfil guardado en %s", name, elapsed_ms, path)
+
+    def _dump(self, profile: cProfile.Profile, name: str, elapsed_ms: float) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        trace_id = trace_id_var.get("----")
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9_]', '', name)}-{trace_id}-{elapsed_ms:.0f}ms.prof"
+        path = os.path.join(self.directory, filename)
+        profile.dump_stats(path)
+        self.dumped += 1
+        self._rotate()
+        return path
+
+    def _rotate(self):
+        """Borra los perfiles más antiguos por encima de PROFILE_KEEP."""
+        profiles = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".prof")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in profiles[:max(len(profiles) - self.keep, 0)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold_ms,
+            'sample_rate': self.sample_rate,
+            'directory': self.directory,
+            'profiled': self.profiled,
+            'dumped': self.dumped,
+        }
+
+
+profiler = Profiler(bool(PROFILING), PROFILE_THRESHOLD_MS, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_KEEP)
+
+# Sin PROFILING ni token de administración los manejadores no se envuelven
+PROFILING_AVAILABLE = bool(PROFILING or PROFILING_ADMIN_TOKEN)
+
+
+def _resume(profile: cProfile.Profile):
+    try:
+        profile.enable()
+    except ValueError:
+        pass  # Otra herramienta de perfilado ha tomado el hilo mientras tanto
+
+
+@types.coroutine
+def _drive(coro, profile: cProfile.Profile):
+    """Ejecuta una corrutina perfilando solo sus tramos síncronos (entre suspensiones)."""
+    value, error = None, None
+    while True:
+        _resume(profile)
+        try:
+            yielded = coro.throw(error) if error is not None else coro.send(value)
+        except StopIteration as e:
+            return e.value
+        finally:
+            profile.disable()
+        try:
+            value, error = (yield yielded), None
+        except BaseException as e:
+            value, error = None, e
+
+
+def profiled(fn: Callable) -> Callable:
+    """
+    Perfila un manejador de eventos (función, corrutina o generador, síncrono o asíncrono).
+
+    Debe aplicarse debajo de @rx.event para que Reflex vea el envoltorio con el mismo
+    tipo de función que el original.
+    """
+    if not PROFILING_AVAILABLE:
+        return fn
+    name = fn.__name__
+
+    if inspect.isasyncgenfunction(fn):
+        @functools.wraps(fn)
+        async def async_gen_wrapper(*args, **kwargs):
+            profile = profiler.start()
+            if profile is None:
+                async for item in fn(*args, **kwargs):
+                    yield item
+                return
+            # El perfil se pausa en cada suspensión: solo se reanuda dentro del generador
+            profile.disable()
+            start = time.perf_counter()
+            generator = fn(*args, **kwargs)
+            try:
+                while True:
+                    try:
+                        item = await _drive(generator.__anext__(), profile)
+                    except StopAsyncIteration:
+                        break
+                    yield item
+            finally:
+                await generator.aclose()
+                profiler.stop(profile, name, start)
+        return async_gen_wrapper
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            profile = profiler.start()
+            if profile is None:
+                return await fn(*args, **kwargs)
+            # El perfil se pausa en cada suspensión: solo se reanuda dentro de la corrutina
+            profile.disable()
+            start = time.perf_counter()
+            try:
+                return await _drive(fn(*args, **kwargs), profile)
+            finally:
+                profiler.stop(profile, name, start)
+        return async_wrapper
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def gen_wrapper(*args, **kwargs):
+            profile = profiler.start()
+            start = time.perf_counter()
+            try:
+                yield from fn(*args, **kwargs)
+            finally:
+                if profile is not None:
+                    profiler.stop(profile, name, start)
+        return gen_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = profiler.start()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profiler.stop(profile, name, start)
+    return wrapper
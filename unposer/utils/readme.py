@@ -0,0 +1,126 @@
+"""
+Módulo para extraer un Docker Compose del README de un repositorio.
+"""
+import re
+from typing import Optional
+
+from unposer.utils.converter import UnraidTemplateConverter
+from unposer.utils.httpclient import http_get
+from unposer.utils.limits import read_response_limited
+from unposer.utils.metrics import FUNCTION_SECONDS
+
+
+@FUNCTION_SECONDS.time(function="_extract_docker_compose_from_readme")
+def extract_docker_compose_from_readme(readme_text: str, converter: UnraidTemplateConverter) -> Optional[str]:
+    """
+    Extrae un bloque docker-compose válido desde el contenido del README.
+
+    Args:
+        readme_text: Contenido del archivo README.md
+        converter: Conversor usado para validar los bloques encontrados
+
+    Returns:
+        Texto del docker-compose si se encuentra, None en caso contrario
+    """
+    # Estrategia 1: Buscar bloques de código markdown explícitamente marcados
+    code_patterns = [
+        # Formato markdown estándar para bloques de código
+        r'```ya?ml\s+([\s\S]*?)```',                    # Bloque de código YAML 
+        r'```docker[\-\s]?compose\s+([\s\S]*?)```',     # Bloque de código docker-compose
+        r'```\s+version:[\s\S]*?services:[\s\S]*?```',  # Bloque con formato docker-compose sin especificación
+        r'```\s+services:[\s\S]*?```',                  # docker-compose moderno (sin version)
+
+        # Formatos HTML para bloques de código
+        r'<pre>\s*version:[\s\S]*?services:[\s\S]*?</pre>',
+        r'<pre>\s*services:[\s\S]*?</pre>',
+        r'<code>\s*version:[\s\S]*?services:[\s\S]*?</code>',
+        r'<code>\s*services:[\s\S]*?</code>',
+
+        # Bloques que contienen claves docker-compose típicas
+        r'```[\s\S]*?services:[\s\S]*?image:[\s\S]*?```',
+        r'<pre>[\s\S]*?services:[\s\S]*?image:[\s\S]*?</pre>'
+    ]
+
+    # Buscar todos los bloques de código que coincidan con los patrones
+    potential_blocks = []
+
+    for pattern in code_patterns:
+        matches = re.findall(pattern, readme_text)
+        if matches:
+            # Tenemos que manejar grupos de captura o bloques completos
+            for match in matches:
+                if isinstance(match, str):
+                    # Si el patrón captura todo el bloque incluyendo los delimitadores
+                    if match.strip().startswith('```') or match.strip().startswith('<pre>'):
+                        # Extraer solo el contenido entre los delimitadores
+                        content = re.sub(r'^```\w*\s*|\s*```$', '', match.strip())
+                        content = re.sub(r'^<pre>\s*|\s*</pre>$', '', content.strip())
+                        content = re.sub(r'^<code>\s*|\s*</code>$', '', content.strip())
+                    else:
+                        content = match.strip()
+                else:
+                    # El primer grupo capturado es el contenido
+                    content = match[0].strip() if match else ""
+
+                potential_blocks.append(content)
+
+    # Estrategia 2: Buscar URL a archivos docker-compose en el README
+    docker_compose_urls = re.findall(r'(https?://[^\s\)\"\']+(?:docker-compose\.ya?ml))', readme_text)
+    for url in docker_compose_urls:
+        try:
+            url_response = http_get(url, stream=True)
+            if url_response.status_code == 200:
+                potential_blocks.append(read_response_limited(url_response))
+        except:
+            continue
+
+    # Filtrar y validar bloques para encontrar docker-compose válidos
+    for block in potential_blocks:
+        try:
+            # Solo si tiene al menos 2 líneas y contiene "services:" o "image:"
+            if len(block.strip().split('\n')) >= 2 and ('services:' in block or 'image:' in block):
+                compose_data = converter.parse_docker_compose(block)
+                if 'image' in compose_data:
+                    return block
+        except Exception:
+            continue
+
+    # Estrategia 3: Intentar extraer bloques de código indentados que no están marcados explícitamente
+    # Buscamos patrones que parezcan docker-compose pero no están en bloques de código formales
+    indented_block_patterns = [
+        r'(?:^|\n)(\s+services:[\s\S]*?)(?=\n\S|\Z)',  # Bloques indentados que comienzan con services:
+        r'(?:^|\n)(\s+version:[\s\S]*?services:[\s\S]*?)(?=\n\S|\Z)'  # Bloques indentados que comienzan con version:
+    ]
+
+    for pattern in indented_block_patterns:
+        matches = re.findall(pattern, readme_text)
+        for match in matches:
+            try:
+                # Desindentamos para normalizar
+                lines = match.splitlines()
+                if not lines:
+                    continue
+
+                # Encontrar la indentación mínima
+                min_indent = float('inf')
+                for line in lines:
+                    if line.strip():  # Solo líneas no vacías
+                        current_indent = len(line) - len(line.lstrip())
+                        min_indent = min(min_indent, current_indent)
+
+                if min_indent == float('inf'):
+                    continue
+
+                # Desidentar todas las líneas
+                normalized_lines = [line[min_indent:] if len(line) >= min_indent else line for line in lines]
+                normalized_block = '\n'.join(normalized_lines)
+
+                # Validar como docker-compose
+                compose_data = converter.parse_docker_compose(normalized_block)
+                if 'image' in compose_data:
+                    return normalized_block
+            except Exception:
+                continue
+
+    # No se encontró un bloque docker-compose válido
+    return None
@@ -0,0 +1,193 @@
+"""
+Módulo para parsear referencias de imágenes Docker según la gramática de distribution/reference.
+
+    referencia := nombre [ ":" tag ] [ "@" digest ]
+    nombre     := [ dominio "/" ] componente ( "/" componente )*
+    dominio    := host [ ":" puerto ]
+
+El primer componente es el registro si contiene '.' o ':', es `localhost` o tiene
+mayúsculas; si no, la imagen es de Docker Hub (`docker.io`) y las de un solo
+componente son oficiales (`library/`). Así `nginx`, `library/nginx` y
+`docker.io/library/nginx` son la misma imagen, y `registry:5000/team/app:tag` es la
+imagen team/app del registro registry:5000.
+
+parse_image_reference está memoizado: la conversión por lotes de catálogos grandes
+lo llama miles de veces con las mismas imágenes.
+"""
+import re
+from functools import lru_cache
+from typing import Optional
+
+DOCKER_HUB = "docker.io"
+# Nombres antiguos de Docker Hub
+DOCKER_HUB_ALIASES = {"index.docker.io", "registry-1.docker.io"}
+# Registros que sirven las mismas imágenes que Docker Hub (lscr.io/linuxserver/x = linuxserver/x)
+DOCKER_HUB_MIRRORS = {"lscr.io"}
+OFFICIAL_NAMESPACE = "library"
+# Registros de GitHub: la ruta de la imagen empieza por usuario/repositorio
+GITHUB_REGISTRIES = {"ghcr.io", "docker.pkg.github.com"}
+MAX_NAME_LENGTH = 255
+
+_DOMAIN_COMPONENT = r"(?:[a-zA-Z0-9]|[a-zA-Z0-9][a-zA-Z0-9-]*[a-zA-Z0-9])"
+_DOMAIN = re.compile(
+    rf"(?:{_DOMAIN_COMPONENT}(?:\.{_DOMAIN_COMPONENT})*|\[[a-fA-F0-9:]+\])(?::[0-9]+)?"
+)
+_PATH_COMPONENT = re.compile(r"[a-z0-9]+(?:(?:[._]|__|-+)[a-z0-9]+)*")
+_TAG = re.compile(r"[\w][\w.-]{0,127}")
+_DIGEST = re.compile(r"[A-Za-z][A-Za-z0-9]*(?:[-_+.][A-Za-z][A-Za-z0-9]*)*:[0-9a-fA-F]{32,}")
+
+
+class InvalidReference(ValueError):
+    """La referencia de la imagen no cumple la gramática."""
+
+
+class ImageReference:
+    """Referencia de una imagen ya normalizada (inmutable)."""
+
+    __slots__ = ("registry", "path", "tag", "digest")
+
+    def __init__(self, registry: str, path: str, tag: Optional[str] = None, digest: Optional[str] = None):
+        object.__setattr__(self, "registry", registry)
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "tag", tag)
+        object.__setattr__(self, "digest", digest)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ImageReference es inmutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("ImageReference es inmutable")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ImageReference):
+            return NotImplemented
+        return (self.registry, self.path, self.tag, self.digest) == (other.registry, other.path, other.tag, other.digest)
+
+    def __hash__(self) -> int:
+        return hash((self.registry, self.path, self.tag, self.digest))
+
+    def __repr__(self) -> str:
+        return f"ImageReference({str(self)!r})"
+
+    def __str__(self) -> str:
+        reference = f"{self.registry}/{self.path}"
+        if self.tag:
+            reference += f":{self.tag}"
+        if self.digest:
+            reference += f"@{self.digest}"
+        return reference
+
+    @property
+    def name(self) -> str:
+        """Último componente de la ruta (plex en linuxserver/plex)."""
+        return self.path.rsplit("/", 1)[-1]
+
+    @property
+    def namespace(self) -> str:
+        """Ruta sin el último componente (library para las imágenes oficiales)."""
+        return self.path.rpartition("/")[0]
+
+    @property
+    def is_docker_hub(self) -> bool:
+        """True si la imagen se sirve desde Docker Hub o uno de sus espejos."""
+        return self.registry == DOCKER_HUB or self.registry in DOCKER_HUB_MIRRORS
+
+    @property
+    def is_official(self) -> bool:
+        """True si es una imagen oficial de Docker Hub (library/...)."""
+        return self.is_docker_hub and self.namespace == OFFICIAL_NAMESPACE
+
+    @property
+    def repository(self) -> str:
+        """Repositorio sin tag ni digest, con el registro completo (docker.io/library/nginx)."""
+        return f"{self.registry}/{self.path}"
+
+    @property
+    def familiar_name(self) -> str:
+        """
+        Repositorio abreviado como lo escribe Docker: sin docker.io ni library/.
+
+        Las imágenes de los espejos de Docker Hub usan el nombre de Docker Hub
+        (lscr.io/linuxserver/plex -> linuxserver/plex).
+        """
+        if not self.is_docker_hub:
+            return self.repository
+        if self.namespace == OFFICIAL_NAMESPACE:
+            return self.name
+        return self.path
+
+
+def _split_domain(name: str):
+    """Separa el dominio del nombre (None si el primer componente no es un registro)."""
+    first, slash, rest = name.partition("/")
+    if not slash:
+        return None, name
+    if "." in first or ":" in first or first == "localhost" or first != first.lower():
+        return first, rest
+    return None, name
+
+
+@lru_cache(maxsize=4096)
+def parse_image_reference(image: str) -> ImageReference:
+    """
+    Parsea y normaliza una referencia de imagen.
+
+    Raises:
+        InvalidReference: Si la referencia no cumple la gramática.
+    """
+    reference = image.strip() if isinstance(image, str) else ""
+    if not reference:
+        raise InvalidReference("La referencia de la imagen está vacía")
+
+    name, at, digest = reference.partition("@")
+    if at and not _DIGEST.fullmatch(digest):
+        raise InvalidReference(f"Digest no válido en {reference}")
+
+    # El tag va tras el último ':' si no queda ningún '/' detrás (si no, es el puerto del registro)
+    tag = None
+    colon = name.rfind(":")
+    if colon > name.rfind("/"):
+        name, tag = name[:colon], name[colon + 1:]
+        if not _TAG.fullmatch(tag):
+            raise InvalidReference(f"Tag no válido en {reference}")
+
+    if len(name) > MAX_NAME_LENGTH:
+        raise InvalidReference(f"El nombre de {reference} supera {MAX_NAME_LENGTH} caracteres")
+
+    registry, path = _split_domain(name)
+    if registry is None:
+        registry = DOCKER_HUB
+    elif not _DOMAIN.fullmatch(registry):
+        raise InvalidReference(f"Registro no válido en {reference}")
+    registry = DOCKER_HUB if registry in DOCKER_HUB_ALIASES else registry
+
+    components = path.split("/")
+    if not all(_PATH_COMPONENT.fullmatch(component) for component in components):
+        raise InvalidReference(f"Nombre no válido en {reference}")
+    if registry == DOCKER_HUB and len(components) == 1:
+        path = f"{OFFICIAL_NAMESPACE}/{path}"
+
+    return ImageReference(registry, path, tag, digest or None)
+
+
+def guess_github_repository(image: str) -> Optional[str]:
+    """
+    Deduce el usuario/repositorio de GitHub de una imagen (None si no se puede deducir).
+
+    - ghcr.io/usuario/repo[/paquete] -> usuario/repo
+    - Docker Hub usuario/repo -> usuario/repo (las imágenes oficiales no tienen repositorio propio)
+    - linuxserver/x (también en lscr.io y ghcr.io) -> linuxserver/docker-x
+    - Otros registros: None
+    """
+    try:
+        reference = parse_image_reference(image)
+    except InvalidReference:
+        return None
+    components = reference.path.split("/")
+    if len(components) < 2 or reference.is_official:
+        return None
+    if not (reference.is_docker_hub or reference.registry in GITHUB_REGISTRIES):
+        return None
+    if components[0] == "linuxserver":
+        return f"linuxserver/docker-{reference.name}"
+    return f"{components[0]}/{components[1]}"
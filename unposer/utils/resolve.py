@@ -0,0 +1,420 @@
+"""
+Módulo con la resolución de un Docker Compose repartido en varios ficheros.
+
+Antes de convertir un compose se cargan y se combinan, como hace docker compose:
+los ficheros de override (docker-compose.override.yml junto al principal), los
+`include` de primer nivel, los `extends` de cada servicio (del mismo fichero o de
+otro) y sus `env_file`. Después se hace una única pasada de interpolación
+(`${VAR}`, `${VAR:-defecto}`, `${VAR-defecto}`, `${VAR:+alternativo}`, `$VAR` y
+`$$`) sobre el árbol ya combinado, con las variables del `.env` del proyecto.
+Las variables del entorno del backend nunca se usan: el compose puede venir de
+cualquier usuario.
+
+Los ficheros se piden a una función de lectura (disco, repositorio de GitHub...)
+y cada uno se lee y se parsea una sola vez por resolución. Sin función de lectura
+(texto pegado en la interfaz) solo se resuelven los extends del propio fichero y
+la interpolación.
+"""
+import copy
+import os
+import posixpath
+import re
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import yaml
+
+from unposer.utils.limits import ComposeLimitError, safe_load_limited
+from unposer.utils.utils import DEBUG_ENABLED, setup_logger
+
+logger = setup_logger(__name__)
+
+# Máximo de ficheros que se leen y de niveles de include/extends por resolución
+MAX_FILES = 32
+MAX_DEPTH = 8
+
+# Claves que se combinan como diccionarios (KEY=VALUE) y listas que se acumulan sin repetir
+MAPPING_KEYS = ('environment', 'labels', 'sysctls', 'annotations', 'extra_hosts')
+APPENDED_KEYS = ('ports', 'expose', 'dns', 'dns_search', 'cap_add', 'cap_drop', 'devices', 'security_opt',
+                 'secrets', 'configs', 'external_links', 'links', 'group_add', 'tmpfs')
+# Claves que se sustituyen completas aunque sean listas
+REPLACED_KEYS = ('command', 'entrypoint')
+
+_VARIABLE = re.compile(
+    r'\$(?:(?P<escaped>\$)'
+    r'|\{(?P<braced>[A-Za-z_][A-Za-z0-9_]*)(?:(?P<op>:?[-?+])(?P<arg>(?:[^{}$]|\$\{[^{}]*\}|\$(?!\{))*))?\}'
+    r'|(?P<named>[A-Za-z_][A-Za-z0-9_]*))'
+)
+
+
+def parse_env_file(text: str) -> Dict[str, str]:
+    """Variables de un fichero .env (KEY=VALUE, comentarios con #, comillas opcionales)."""
+    variables = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('export '):
+            line = line[len('export '):].lstrip()
+        key, has_value, value = line.partition('=')
+        key = key.strip()
+        if not key:
+            continue
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+            value = value[1:-1]
+        elif ' #' in value:
+            value = value.split(' #', 1)[0].rstrip()
+        variables[key] = value if has_value else ""
+    return variables
+
+
+def _as_mapping(value: Any, separator: str = '=') -> Dict[str, Any]:
+    """environment/labels/... en forma de lista (KEY=VALUE) o diccionario -> diccionario."""
+    if isinstance(value, dict):
+        return {str(key): item for key, item in value.items()}
+    mapping = {}
+    for entry in value if isinstance(value, list) else [value]:
+        if entry is None:
+            continue
+        key, has_value, item = str(entry).partition(separator)
+        mapping[key.strip()] = item if has_value else None
+    return mapping
+
+
+def _volume_target(volume: Any) -> Any:
+    """Ruta del contenedor de un volumen (identifica el volumen al combinar)."""
+    if isinstance(volume, dict):
+        return volume.get('target', repr(volume))
+    parts = str(volume).split(':')
+    return parts[1] if len(parts) > 1 else parts[0]
+
+
+def merge_service(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Combina dos definiciones de un servicio (override tiene preferencia)."""
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if key not in merged or merged[key] is None or value is None:
+            merged[key] = copy.deepcopy(value)
+        elif key in MAPPING_KEYS:
+            separator = ':' if key == 'extra_hosts' and isinstance(value, list) else '='
+            combined = _as_mapping(merged[key], separator)
+            combined.update(_as_mapping(value, separator))
+            merged[key] = combined
+        elif key == 'volumes' and isinstance(value, list) and isinstance(merged[key], list):
+            volumes = {_volume_target(volume): volume for volume in merged[key]}
+            volumes.update({_volume_target(volume): copy.deepcopy(volume) for volume in value})
+            merged[key] = list(volumes.values())
+        elif key in APPENDED_KEYS and isinstance(value, list) and isinstance(merged[key], list):
+            merged[key] = merged[key] + [item for item in copy.deepcopy(value) if item not in merged[key]]
+        elif key not in REPLACED_KEYS and isinstance(value, dict) and isinstance(merged[key], dict):
+            merged[key] = merge_service(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def merge_compose(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Combina dos documentos compose (servicios por nombre, resto de secciones por clave)."""
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if key == 'services' and isinstance(value, dict) and isinstance(merged.get(key), dict):
+            services = merged[key]
+            for name, service in value.items():
+                if isinstance(services.get(name), dict) and isinstance(service, dict):
+                    services[name] = merge_service(services[name], service)
+                else:
+                    services[name] = copy.deepcopy(service)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = {**merged[key], **copy.deepcopy(value)}
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def _add_included(document: Dict[str, Any], included: Dict[str, Any]):
+    """
+    Añade a un documento lo definido en un fichero incluido.
+
+    Lo del documento tiene preferencia y sus servicios van primero (el primer servicio
+    es el que convierte la interfaz).
+    """
+    for key, value in included.items():
+        if not isinstance(value, dict):
+            document.setdefault(key, value)
+        elif isinstance(document.get(key), dict):
+            for name, item in value.items():
+                document[key].setdefault(name, item)
+        elif key not in document or document[key] is None:
+            document[key] = value
+
+
+def override_paths(path: str) -> List[str]:
+    """Ficheros de override de un compose (docker-compose.yml -> docker-compose.override.yml/.yaml)."""
+    directory, filename = posixpath.split(path)
+    stem, extension = posixpath.splitext(filename)
+    if extension not in ('.yml', '.yaml') or stem.endswith('.override'):
+        return []
+    return [posixpath.join(directory, f"{stem}.override{ext}") for ext in ('.yml', '.yaml')]
+
+
+class ComposeResolver:
+    """Resuelve un compose con sus ficheros relacionados leídos mediante `read`."""
+
+    def __init__(self, read: Callable[[str], Optional[str]] = None):
+        """
+        Args:
+            read: Función que recibe una ruta relativa (estilo POSIX, normalizada) y devuelve
+                el texto del fichero o None si no existe.
+        """
+        self._read = read
+        self._texts: Dict[str, Optional[str]] = {}
+        self._documents: Dict[str, Any] = {}
+        # Ficheros leídos (además del principal), los que no existen y los avisos de la resolución
+        self.used: List[str] = []
+        self.missing: Set[str] = set()
+        self.warnings: List[str] = []
+
+    def read(self, path: str) -> Optional[str]:
+        """Texto de un fichero relacionado (memorizado; None si no existe o no se puede leer)."""
+        if path in self._texts:
+            return self._texts[path]
+        text = None
+        if self._read is not None and path and not path.startswith(('/', '../')) and path != '..':
+            if len(self._texts) >= MAX_FILES:
+                raise ComposeLimitError(f"El Docker Compose supera el máximo de {MAX_FILES} ficheros relacionados.")
+            text = self._read(path)
+        self._texts[path] = text
+        if text is None:
+            self.missing.add(path)
+        else:
+            self.used.append(path)
+        return text
+
+    def load(self, path: str) -> Optional[Dict[str, Any]]:
+        """Documento YAML de un fichero relacionado (memorizado; se devuelve una copia)."""
+        if path not in self._documents:
+            text = self.read(path)
+            document = safe_load_limited(text) if text is not None else None
+            self._documents[path] = document if isinstance(document, dict) else None
+        return copy.deepcopy(self._documents[path])
+
+    @staticmethod
+    def _join(directory: str, path: str) -> str:
+        return posixpath.normpath(posixpath.join(directory, str(path))) if not posixpath.isabs(str(path)) else str(path)
+
+    def resolve(self, text: str, path: str = "docker-compose.yml") -> Dict[str, Any]:
+        """
+        Carga el compose principal y sus ficheros relacionados y devuelve el documento combinado e interpolado.
+
+        Raises:
+            ValueError: Si el compose no es un diccionario YAML.
+            ComposeLimitError: Si supera algún límite de recursos.
+        """
+        path = posixpath.normpath(path.lstrip('/')) if path else "docker-compose.yml"
+        document = safe_load_limited(text)
+        if not isinstance(document, dict):
+            raise ValueError("El archivo Docker Compose no tiene un formato válido")
+
+        project_dir = posixpath.dirname(path)
+        for override_path in override_paths(path) if self._read is not None else []:
+            override = self.load(override_path)
+            if override:
+                document = merge_compose(document, override)
+
+        document = self._resolve_document(document, project_dir, 0)
+
+        variables = {}
+        if self._read is not None:
+            env_text = self.read(posixpath.join(project_dir, '.env') if project_dir else '.env')
+            if env_text is not None:
+                variables = parse_env_file(env_text)
+        return self.interpolate(document, variables)
+
+    def _resolve_document(self, document: Dict[str, Any], directory: str, depth: int) -> Dict[str, Any]:
+        """Resuelve los include, extends y env_file de un documento cuyas rutas son relativas a `directory`."""
+        if depth > MAX_DEPTH:
+            raise ComposeLimitError(f"El Docker Compose supera el máximo de {MAX_DEPTH} niveles de include/extends.")
+
+        includes = document.pop('include', None) or []
+        services = document.get('services')
+        if isinstance(services, dict):
+            for name in list(services):
+                services[name] = self._resolve_service(services, name, directory, depth, set())
+
+        for entry in includes if isinstance(includes, list) else [includes]:
+            paths = entry.get('path') if isinstance(entry, dict) else entry
+            for include_path in paths if isinstance(paths, list) else [paths]:
+                if not include_path:
+                    continue
+                include_path = self._join(directory, include_path)
+                included = self.load(include_path)
+                if included is None:
+                    self.warnings.append(f"No se pudo cargar el include {include_path}")
+                    continue
+                included = self._resolve_document(included, posixpath.dirname(include_path), depth + 1)
+                _add_included(document, included)
+        return document
+
+    def _resolve_service(self, services: Dict[str, Any], name: str, directory: str, depth: int,
+                         visiting: set) -> Any:
+        """
+        Servicio con sus extends y env_file ya aplicados.
+
+        Se trabaja sobre una copia: services[name] no cambia, de forma que un servicio que
+        sirve de base a otro (a extiende b, b extiende c) se puede volver a resolver entero.
+        """
+        service = services[name]
+        if not isinstance(service, dict):
+            return service
+        service = dict(service)
+        if name in visiting:
+            raise ValueError(f"El servicio '{name}' se extiende a sí mismo")
+
+        extends = service.pop('extends', None)
+        if extends:
+            if isinstance(extends, str):
+                extends = {'service': extends}
+            base_name = extends.get('service')
+            base = None
+            if extends.get('file'):
+                base_path = self._join(directory, extends['file'])
+                base_document = self.load(base_path)
+                if base_document is not None and isinstance(base_document.get('services'), dict) \
+                        and base_name in base_document['services']:
+                    if depth + 1 > MAX_DEPTH:
+                        raise ComposeLimitError(f"El Docker Compose supera el máximo de {MAX_DEPTH} niveles de include/extends.")
+                    base = self._resolve_service(base_document['services'], base_name,
+                                                 posixpath.dirname(base_path), depth + 1, set())
+            elif base_name in services and base_name != name:
+                base = self._resolve_service(services, base_name, directory, depth, visiting | {name})
+            if isinstance(base, dict):
+                service = merge_service(base, service)
+            else:
+                self.warnings.append(f"No se encontró el servicio '{base_name}' que extiende '{name}'")
+
+        env_files = service.pop('env_file', None)
+        if env_files:
+            environment = {}
+            for env_file in env_files if isinstance(env_files, list) else [env_files]:
+                env_path = env_file.get('path') if isinstance(env_file, dict) else env_file
+                if not env_path:
+                    continue
+                env_text = self.read(self._join(directory, env_path))
+                if env_text is None:
+                    if not isinstance(env_file, dict) or env_file.get('required', True):
+                        self.warnings.append(f"No se pudo cargar el env_file {env_path} del servicio '{name}'")
+                    continue
+                # Los valores de env_file son literales: se protegen de la interpolación
+                environment.update({key: value.replace('$', '$$') for key, value in parse_env_file(env_text).items()})
+            if environment:
+                service = merge_service({'environment': environment}, service)
+        return service
+
+    def interpolate(self, document: Any, variables: Dict[str, str]) -> Any:
+        """Sustituye las variables en todos los valores de texto del documento (una sola pasada)."""
+        unset = set()
+
+        def substitute(match: re.Match) -> str:
+            if match.group('escaped'):
+                return '$'
+            name = match.group('braced') or match.group('named')
+            value = variables.get(name)
+            op = match.group('op')
+            arg = _VARIABLE.sub(substitute, match.group('arg') or '')
+            if op in (':-', '-'):
+                if value is None or (op == ':-' and value == ''):
+                    return arg
+                return value
+            if op in (':+', '+'):
+                return arg if value is not None and (op == '+' or value != '') else ''
+            if value is None or (op == ':?' and value == ''):
+                unset.add(name)
+                return ''
+            return value
+
+        def walk(node: Any) -> Any:
+            if isinstance(node, str):
+                return _VARIABLE.sub(substitute, node) if '$' in node else node
+            if isinstance(node, dict):
+                return {key: walk(value) for key, value in node.items()}
+            if isinstance(node, list):
+                return [walk(item) for item in node]
+            return node
+
+        result = walk(document)
+
+        # environment: - VAR (sin valor) toma el valor de las variables del proyecto
+        services = result.get('services') if isinstance(result, dict) else None
+        for service in services.values() if isinstance(services, dict) else []:
+            if isinstance(service, dict) and isinstance(service.get('environment'), (list, dict)):
+                environment = _as_mapping(service['environment'])
+                service['environment'] = [
+                    f"{key}={_scalar(value) if value is not None else variables[key]}"
+                    if value is not None or key in variables else key
+                    for key, value in environment.items()
+                ]
+
+        if unset:
+            self.warnings.append(f"Variables sin valor: {', '.join(sorted(unset))}")
+            if DEBUG_ENABLED:
+                logger.debug("Variables sin valor en el Docker Compose: %s", sorted(unset))
+        return result
+
+
+def _scalar(value: Any) -> str:
+    """Valor de una variable de entorno como texto (los booleanos de YAML en minúsculas, como docker compose)."""
+    return str(value).lower() if isinstance(value, bool) else str(value)
+
+
+def resolve_compose(text: str, path: str = "docker-compose.yml", read: Callable[[str], Optional[str]] = None) -> Dict[str, Any]:
+    """Resuelve un compose (ver ComposeResolver.resolve)."""
+    return ComposeResolver(read).resolve(text, path)
+
+
+def resolve_compose_text(text: str, path: str = "docker-compose.yml",
+                         read: Callable[[str], Optional[str]] = None) -> Tuple[str, ComposeResolver]:
+    """
+    Resuelve un compose con sus ficheros relacionados y lo devuelve como un único documento.
+
+    Si no se ha usado ningún otro fichero se devuelve el texto original (se conserva el
+    formato y la interpolación se hará al convertirlo).
+
+    Returns:
+        (texto del compose, resolutor con los ficheros usados, los que faltan y los avisos)
+    """
+    resolver = ComposeResolver(read)
+    document = resolver.resolve(text, path)
+    if not resolver.used:
+        return text, resolver
+    # Los $ ya resueltos se escapan para que la interpolación al convertir no los toque
+    return yaml.safe_dump(escape_dollars(document), sort_keys=False, allow_unicode=True, default_flow_style=False), resolver
+
+
+def escape_dollars(node: Any) -> Any:
+    """Escapa los $ de los valores de texto ($ -> $$)."""
+    if isinstance(node, str):
+        return node.replace('$', '$$')
+    if isinstance(node, dict):
+        return {key: escape_dollars(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [escape_dollars(item) for item in node]
+    return node
+
+
+class LocalReader:
+    """Lectura de ficheros relacionados dentro de una carpeta (nunca fuera de ella)."""
+
+    def __init__(self, root: str, max_bytes: int = None):
+        self.root = os.path.realpath(root)
+        self.max_bytes = max_bytes
+
+    def __call__(self, path: str) -> Optional[str]:
+        full_path = os.path.realpath(os.path.join(self.root, *path.split('/')))
+        if os.path.commonpath([self.root, full_path]) != self.root:
+            logger.warning("Fichero fuera de la carpeta del compose ignorado: %s", path)
+            return None
+        try:
+            with open(full_path, "r", encoding="utf-8") as f:
+                return f.read() if self.max_bytes is None else f.read(self.max_bytes + 1)
+        except (OSError, UnicodeDecodeError):
+            return None
@@ -0,0 +1,429 @@
+"""
+Módulo con la conversión inversa: plantillas de Unraid a Docker Compose.
+
+Cada <Container> se reconstruye como un servicio: las etiquetas Config de tipo
+Variable, Label, Path, Port y Device vuelven a environment, labels, volumes,
+ports y devices; Repository, Network, Privileged, PostArgs y CPUset a sus claves
+del compose, y los flags de ExtraParams que tienen equivalente (--restart,
+--cap-add, --memory, --ulimit...) a las suyas. Lo que el compose no puede
+expresar (icono, descripción, WebUI y los flags sin equivalente) se conserva en
+la extensión x-unraid del servicio.
+
+En lote se convierte una carpeta `templates-user` completa, con un pool de
+procesos, a un único compose con todos los servicios o a un compose por
+contenedor. El compose único se escribe servicio a servicio según llegan:
+
+    python -m unposer.utils.reverse /boot/config/plugins/dockerMan/templates-user --output docker-compose.yml
+    python -m unposer.utils.reverse ./plantillas --split --output ./composes
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import re
+import shlex
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import yaml
+
+from unposer.utils.reference import InvalidReference, parse_image_reference
+from unposer.utils.storage import write_file
+from unposer.utils.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Tipo de Config -> clave del compose
+CONFIG_KEYS = {
+    'Variable': 'environment',
+    'Label': 'labels',
+    'Path': 'volumes',
+    'Port': 'ports',
+    'Device': 'devices',
+}
+
+# Etiquetas de la plantilla sin equivalente en el compose que se guardan en x-unraid
+UNRAID_ONLY_TAGS = ['Shell', 'Support', 'Project', 'Overview', 'Category', 'WebUI', 'TemplateURL', 'Icon',
+                    'DonateText', 'DonateLink', 'Requires']
+
+# Flags de ExtraParams: booleanos, con valor, repetibles y clave=valor
+EXTRA_BOOL_FLAGS = {
+    '--tty': 'tty',
+    '-t': 'tty',
+    '--init': 'init',
+    '--read-only': 'read_only',
+    '--interactive': 'stdin_open',
+    '-i': 'stdin_open',
+    '--privileged': 'privileged',
+}
+EXTRA_VALUE_FLAGS = {
+    '--restart': 'restart',
+    '--hostname': 'hostname',
+    '-h': 'hostname',
+    '--user': 'user',
+    '-u': 'user',
+    '--memory': 'mem_limit',
+    '-m': 'mem_limit',
+    '--memory-reservation': 'mem_reservation',
+    '--memory-swap': 'memswap_limit',
+    '--cpus': 'cpus',
+    '--cpu-shares': 'cpu_shares',
+    '--cpuset-cpus': 'cpuset',
+    '--shm-size': 'shm_size',
+    '--pids-limit': 'pids_limit',
+    '--stop-signal': 'stop_signal',
+    '--pid': 'pid',
+    '--ipc': 'ipc',
+    '--workdir': 'working_dir',
+    '-w': 'working_dir',
+    '--entrypoint': 'entrypoint',
+    '--mac-address': 'mac_address',
+    '--runtime': 'runtime',
+    '--network': 'network_mode',
+    '--net': 'network_mode',
+}
+EXTRA_LIST_FLAGS = {
+    '--cap-add': 'cap_add',
+    '--cap-drop': 'cap_drop',
+    '--add-host': 'extra_hosts',
+    '--dns': 'dns',
+    '--dns-search': 'dns_search',
+    '--security-opt': 'security_opt',
+    '--group-add': 'group_add',
+    '--tmpfs': 'tmpfs',
+    '--device': 'devices',
+    '--env': 'environment',
+    '-e': 'environment',
+    '--label': 'labels',
+    '-l': 'labels',
+    '--volume': 'volumes',
+    '-v': 'volumes',
+    '--publish': 'ports',
+    '-p': 'ports',
+}
+EXTRA_DICT_FLAGS = {
+    '--sysctl': 'sysctls',
+    '--ulimit': 'ulimits',
+}
+# Orden de las claves en el servicio generado
+SERVICE_KEY_ORDER = ['image', 'container_name', 'hostname', 'command', 'entrypoint', 'network_mode', 'privileged',
+                     'restart', 'environment', 'labels', 'volumes', 'ports', 'devices']
+
+
+class ReverseError(ValueError):
+    """La plantilla no es un <Container> de Unraid válido."""
+
+
+def _text(element: Optional[ET.Element]) -> str:
+    return (element.text or "").strip() if element is not None else ""
+
+
+def _config_value(element: ET.Element) -> str:
+    """Valor de una etiqueta Config: su texto o el Default (la primera opción si es una lista a|b)."""
+    value = (element.text or "").strip()
+    if value:
+        return value
+    return element.get("Default", "").split("|")[0].strip()
+
+
+def _config_entry(config_type: str, target: str, value: str, mode: str) -> Optional[str]:
+    """Entrada del compose (formato corto) de una etiqueta Config."""
+    if config_type in ('Variable', 'Label'):
+        return f"{target}={value}" if target else None
+    if config_type == 'Path':
+        if not target or not value:
+            return None
+        return f"{value}:{target}:{mode}" if mode and mode != "rw" else f"{value}:{target}"
+    if config_type == 'Port':
+        if not target:
+            return None
+        port = f"{value}:{target}" if value else target
+        return f"{port}/{mode}" if mode and mode != "tcp" else port
+    if config_type == 'Device':
+        if not value:
+            return None
+        return value if not target or target == value else f"{value}:{target}"
+    return None
+
+
+def _duration(value: str) -> str:
+    """Segundos de --stop-timeout en el formato de duración del compose."""
+    return f"{value}s" if value.isdigit() else value
+
+
+def _ulimit(value: str) -> Tuple[str, Any]:
+    """nofile=1024:2048 -> ('nofile', {'soft': 1024, 'hard': 2048}); nproc=65535 -> ('nproc', 65535)."""
+    name, _, limits = value.partition("=")
+    soft, _, hard = limits.partition(":")
+    to_int = lambda number: int(number) if number.lstrip("-").isdigit() else number
+    if hard:
+        return name, {'soft': to_int(soft), 'hard': to_int(hard)}
+    return name, to_int(soft)
+
+
+def parse_extra_params(extra_params: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Traduce los flags de docker run de ExtraParams a claves del compose.
+
+    Returns:
+        (claves del compose, flags sin equivalente)
+    """
+    service: Dict[str, Any] = {}
+    unmapped: List[str] = []
+    try:
+        tokens = shlex.split(extra_params)
+    except ValueError:
+        return service, [extra_params]
+
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        index += 1
+        flag, has_value, value = token.partition("=") if token.startswith("--") else (token, "", "")
+        if flag in EXTRA_BOOL_FLAGS and not has_value:
+            service[EXTRA_BOOL_FLAGS[flag]] = True
+            continue
+        if flag == '--stop-timeout' or flag in EXTRA_VALUE_FLAGS or flag in EXTRA_LIST_FLAGS or flag in EXTRA_DICT_FLAGS:
+            if not has_value:
+                if index >= len(tokens):
+                    unmapped.append(token)
+                    continue
+                value = tokens[index]
+                index += 1
+            if flag == '--stop-timeout':
+                service['stop_grace_period'] = _duration(value)
+            elif flag in EXTRA_VALUE_FLAGS:
+                service[EXTRA_VALUE_FLAGS[flag]] = value
+            elif flag in EXTRA_LIST_FLAGS:
+                service.setdefault(EXTRA_LIST_FLAGS[flag], []).append(value)
+            elif flag == '--ulimit':
+                name, limit = _ulimit(value)
+                service.setdefault('ulimits', {})[name] = limit
+            else:
+                key, _, setting = value.partition("=")
+                service.setdefault(EXTRA_DICT_FLAGS[flag], {})[key] = setting
+            continue
+        unmapped.append(token)
+    return service, unmapped
+
+
+def _image_name(image: str) -> str:
+    """Nombre de la imagen sin registro, ruta, tag ni digest (para las plantillas sin <Name>)."""
+    try:
+        return parse_image_reference(image).name
+    except InvalidReference:
+        return image.rsplit('/', 1)[-1].split('@', 1)[0].split(':')[0]
+
+
+def service_key(name: str) -> str:
+    """Nombre de servicio válido en el compose a partir del nombre del contenedor."""
+    key = re.sub(r'[^a-z0-9_.-]+', '-', name.lower()).strip('-.')
+    return key or "app"
+
+
+def template_to_service(source) -> Tuple[str, Dict[str, Any]]:
+    """
+    Reconstruye el servicio del compose de una plantilla (ruta o fichero binario).
+
+    Returns:
+        (nombre del servicio, servicio)
+
+    Raises:
+        ReverseError: Si no es un XML válido o no es un <Container> con Repository.
+    """
+    try:
+        root = ET.parse(source).getroot()
+    except ET.ParseError as e:
+        raise ReverseError(f"XML no válido: {e}")
+    if root.tag != 'Container':
+        raise ReverseError("La plantilla no tiene la etiqueta <Container>")
+
+    image = _text(root.find('Repository'))
+    if not image:
+        raise ReverseError("La plantilla no tiene <Repository>")
+    name = _text(root.find('Name')) or _image_name(image)
+
+    service: Dict[str, Any] = {'image': image, 'container_name': name}
+    post_args = _text(root.find('PostArgs'))
+    if post_args:
+        service['command'] = post_args
+    network = _text(root.find('Network'))
+    if network:
+        service['network_mode'] = network
+    if _text(root.find('Privileged')).lower() == 'true':
+        service['privileged'] = True
+    cpuset = _text(root.find('CPUset'))
+    if cpuset:
+        service['cpuset'] = cpuset
+
+    for config in root.iter('Config'):
+        config_type = config.get('Type', '')
+        key = CONFIG_KEYS.get(config_type)
+        if key is None:
+            continue
+        entry = _config_entry(config_type, config.get('Target', '').strip(), _config_value(config),
+                              (config.get('Mode') or '').strip().lower())
+        if entry is not None:
+            service.setdefault(key, []).append(entry)
+
+    extra, unmapped = parse_extra_params(_text(root.find('ExtraParams')))
+    for key, value in extra.items():
+        if isinstance(value, list):
+            service.setdefault(key, []).extend(value)
+        elif isinstance(value, dict):
+            service.setdefault(key, {}).update(value)
+        else:
+            service.setdefault(key, value)
+
+    unraid = {tag: _text(root.find(tag)) for tag in UNRAID_ONLY_TAGS if _text(root.find(tag))}
+    if unmapped:
+        unraid['ExtraParams'] = ' '.join(shlex.quote(token) for token in unmapped)
+
+    ordered = {key: service.pop(key) for key in SERVICE_KEY_ORDER if key in service}
+    ordered.update(service)
+    if unraid:
+        ordered['x-unraid'] = unraid
+    return service_key(name), ordered
+
+
+def template_text_to_service(template: str) -> Tuple[str, Dict[str, Any]]:
+    """template_to_service sobre el texto de una plantilla."""
+    return template_to_service(io.BytesIO(template.encode("utf-8")))
+
+
+def dump_compose(services: Dict[str, Dict[str, Any]]) -> str:
+    """Docker Compose (YAML) con los servicios indicados."""
+    return yaml.safe_dump({'services': services}, sort_keys=False, allow_unicode=True, default_flow_style=False)
+
+
+def service_fragment(key: str, service: Dict[str, Any]) -> str:
+    """Servicio en YAML ya indentado bajo services:, para escribir el compose por partes."""
+    fragment = yaml.safe_dump({key: service}, sort_keys=False, allow_unicode=True, default_flow_style=False)
+    return "".join(f"  {line}" for line in fragment.splitlines(keepends=True))
+
+
+def unique_key(key: str, used: set) -> str:
+    """Evita servicios repetidos añadiendo un sufijo (-2, -3...)."""
+    candidate = key
+    counter = 2
+    while candidate in used:
+        candidate = f"{key}-{counter}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+def _reverse_file(path: str) -> Tuple[str, Optional[Tuple[str, Dict[str, Any]]], str]:
+    """Trabajo del pool: (ruta, (servicio, datos) o None, error)."""
+    try:
+        return path, template_to_service(path), ""
+    except (ReverseError, OSError) as e:
+        return path, None, str(e)
+
+
+def template_paths(directory: str) -> List[str]:
+    """Plantillas (.xml) de una carpeta, ordenadas por nombre."""
+    return [
+        os.path.join(directory, name) for name in sorted(os.listdir(directory))
+        if name.endswith(".xml") and not name.startswith(".") and os.path.isfile(os.path.join(directory, name))
+    ]
+
+
+def reverse_templates(paths: Iterable[str], workers: int = None) -> Iterator[Tuple[str, Optional[Tuple[str, Dict[str, Any]]], str]]:
+    """
+    Convierte varias plantillas en un pool de procesos y las devuelve en el orden de las rutas.
+
+    Yields:
+        (ruta, (servicio, datos) o None si falló, mensaje de error)
+    """
+    paths = list(paths)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+    if workers == 1:
+        yield from map(_reverse_file, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        yield from pool.map(_reverse_file, paths, chunksize=max(1, len(paths) // (workers * 4)))
+
+
+def write_compose(results: Iterable[Tuple[str, Optional[Tuple[str, Dict[str, Any]]], str]], output: str) -> Tuple[int, List[str]]:
+    """
+    Escribe un único compose con todos los servicios, uno a uno según llegan.
+
+    Se escribe en un temporal junto a `output` que sustituye al final al fichero
+    (nunca queda un compose a medias).
+
+    Returns:
+        (servicios escritos, errores)
+    """
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(output)}.", suffix=".tmp")
+    used, errors = set(), []
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("services:\n")
+            for path, result, error in results:
+                if result is None:
+                    errors.append(f"{os.path.basename(path)}: {error}")
+                    continue
+                key, service = result
+                f.write(service_fragment(unique_key(key, used), service))
+            if not used:
+                f.seek(0)
+                f.truncate()
+                f.write("services: {}\n")
+        os.replace(tmp_path, output)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(used), errors
+
+
+def write_split(results: Iterable[Tuple[str, Optional[Tuple[str, Dict[str, Any]]], str]], output_dir: str) -> Tuple[int, List[str]]:
+    """
+    Escribe un compose por contenedor (<servicio>.yml) en una carpeta.
+
+    Returns:
+        (servicios escritos, errores)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    used, errors = set(), []
+    for path, result, error in results:
+        if result is None:
+            errors.append(f"{os.path.basename(path)}: {error}")
+            continue
+        key, service = result
+        key = unique_key(key, used)
+        write_file(os.path.join(output_dir, f"{key}.yml"), dump_compose({key: service}))
+    return len(used), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("templates", nargs="+", help="Carpeta templates-user o plantillas .xml")
+    parser.add_argument("--output", default="docker-compose.yml",
+                        help="Compose de salida (o carpeta de salida con --split)")
+    parser.add_argument("--split", action="store_true", help="Un compose por contenedor")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos del pool (por defecto, uno por núcleo)")
+    args = parser.parse_args()
+
+    paths = []
+    for source in args.templates:
+        paths.extend(template_paths(source) if os.path.isdir(source) else [source])
+    if not paths:
+        parser.error("No se encontraron plantillas .xml")
+
+    results = reverse_templates(paths, args.workers)
+    if args.split:
+        written, errors = write_split(results, args.output)
+    else:
+        written, errors = write_compose(results, args.output)
+    for error in errors:
+        print(f"Error: {error}")
+    print(f"{written} servicios escritos en {args.output} ({len(errors)} errores)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Módulo con la caducidad de las sesiones y la contabilidad de su memoria.
+
+Reflex guarda el estado de cada sesión en memoria sin límite de tiempo (modos
+memory y disk). Un recolector periódico:
+
+- elimina las sesiones sin conexión que llevan más de SESSION_IDLE_TTL segundos
+  sin eventos;
+- si el tamaño estimado del conjunto supera SESSION_MEMORY_BUDGET, expulsa
+  sesiones sin conexión empezando por las que más ocupan y más tiempo llevan sin
+  uso, hasta volver por debajo del límite.
+
+En modo disk una sesión expulsada por memoria sigue en disco y se recupera en su
+siguiente evento; la caducidad por inactividad borra también sus ficheros. En
+modo memory la sesión expulsada empieza de cero. Con Redis la caducidad la aplica
+el propio Redis (redis_token_expiration) y el recolector no hace nada.
+"""
+import asyncio
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from reflex.state import BaseState, _substate_key
+
+from unposer.utils.config import SESSION_IDLE_TTL, SESSION_MEMORY_BUDGET, SESSION_SWEEP_INTERVAL
+from unposer.utils.metrics import REGISTRY, Counter
+from unposer.utils.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Segundos tras los que se vuelve a medir una sesión aunque no haya recibido eventos
+# (las tareas en segundo plano modifican el estado sin pasar por el middleware)
+REMEASURE_AFTER = 300
+
+SESSIONS_EVICTED = REGISTRY.register(Counter(
+    "unposer_sessions_evicted_total",
+    "Sesiones eliminadas de la memoria del backend por motivo (idle / memory).",
+    ["reason"],
+))
+
+
+def _sizeof(value: Any, seen: set) -> int:
+    """Tamaño aproximado en bytes de un valor y de lo que contiene (cada objeto una vez)."""
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(_sizeof(k, seen) + _sizeof(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(_sizeof(item, seen) for item in value)
+    # Objetos propios guardados en el estado (p. ej. TemplatePreview)
+    if hasattr(value, "__dict__") and not isinstance(value, (type, BaseState)):
+        return size + _sizeof(vars(value), seen)
+    return size
+
+
+def measure_state(state: BaseState) -> Tuple[int, Dict[str, int]]:
+    """
+    Estima la memoria de un estado y de sus subestados.
+
+    Devuelve el total en bytes y el desglose por variable ("Estado.variable").
+    Los valores compartidos entre variables (la misma plantilla en varias) se
+    cuentan solo en la primera.
+    """
+    seen = set()
+    breakdown = {}
+    pending = [state]
+    while pending:
+        current = pending.pop()
+        name = type(current).__name__
+        for var in type(current).base_vars:
+            if var in current.__dict__:
+                breakdown[f"{name}.{var}"] = _sizeof(current.__dict__[var], seen)
+        for var, value in current._backend_vars.items():
+            breakdown[f"{name}.{var}"] = _sizeof(value, seen)
+        pending.extend(current.substates.values())
+    return sum(breakdown.values()), breakdown
+
+
+class SessionReaper:
+    """Registra la actividad de las sesiones y libera las inactivas o las que exceden la memoria."""
+
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL, memory_budget: int = SESSION_MEMORY_BUDGET,
+                 interval: float = SESSION_SWEEP_INTERVAL):
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget
+        self.interval = interval
+        self.app = None
+        # token -> instante (monotonic) del último evento
+        self._last_seen: Dict[str, float] = {}
+        # token -> (instante de la medida, bytes, desglose)
+        self._sizes: Dict[str, Tuple[float, int, Dict[str, int]]] = {}
+
+    def touch(self, token: str):
+        """Marca la sesión como usada ahora (lo llama el middleware en cada evento)."""
+        if token:
+            self._last_seen[token] = time.monotonic()
+
+    def _manager(self):
+        """Gestor de estados de Reflex si guarda las sesiones en este proceso, o None."""
+        if self.app is None or self.app._state_manager is None:
+            return None
+        manager = self.app.state_manager
+        return manager if isinstance(getattr(manager, "states", None), dict) else None
+
+    def _connected(self) -> set:
+        namespace = self.app.event_namespace if self.app is not None else None
+        return set(namespace.token_to_sid) if namespace is not None else set()
+
+    def _measure(self, token: str, state: BaseState, now: float) -> Tuple[int, Dict[str, int]]:
+        """Tamaño de una sesión, reutilizando la última medida si no ha cambiado."""
+        cached = self._sizes.get(token)
+        last_seen = self._last_seen.get(token, now)
+        if cached is not None and cached[0] >= last_seen and now - cached[0] < REMEASURE_AFTER:
+            return cached[1], cached[2]
+        size, breakdown = measure_state(state)
+        self._sizes[token] = (now, size, breakdown)
+        return size, breakdown
+
+    def _sessions(self, manager, now: float) -> List[Dict[str, Any]]:
+        connected = self._connected()
+        sessions = []
+        for token, state in list(manager.states.items()):
+            # Sesiones cargadas sin pasar por el middleware (p. ej. tras un reinicio en modo disk)
+            last_seen = self._last_seen.setdefault(token, now)
+            size, breakdown = self._measure(token, state, now)
+            sessions.append({
+                "token": token,
+                "bytes": size,
+                "breakdown": breakdown,
+                "idle": now - last_seen,
+                "connected": token in connected,
+            })
+        return sessions
+
+    def _evict(self, manager, token: str, reason: str) -> bool:
+        """Quita una sesión de la memoria salvo que esté procesando un evento."""
+        lock = manager._states_locks.get(token)
+        if lock is not None and lock.locked():
+            return False
+        state = manager.states.pop(token, None)
+        manager._states_locks.pop(token, None)
+        self._last_seen.pop(token, None)
+        self._sizes.pop(token, None)
+        if reason == "idle" and state is not None and hasattr(manager, "token_path"):
+            self._remove_files(manager, token, state)
+        SESSIONS_EVICTED.inc(reason=reason)
+        return True
+
+    @staticmethod
+    def _remove_files(manager, token: str, state: BaseState):
+        """Borra del disco los ficheros de una sesión caducada (modo disk)."""
+        pending = [state]
+        while pending:
+            current = pending.pop()
+            manager.token_path(_substate_key(token, current)).unlink(missing_ok=True)
+            pending.extend(current.substates.values())
+
+    def _purge_files(self, manager) -> int:
+        """Borra los ficheros de sesiones caducadas que ya no están en memoria (modo disk)."""
+        removed = 0
+        cutoff = time.time() - self.idle_ttl
+        try:
+            paths = list(manager.states_directory.glob("*.pkl"))
+        except OSError:
+            return 0
+        for path in paths:
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def sweep(self) -> Dict[str, int]:
+        """Aplica la caducidad por inactividad y el límite de memoria una vez."""
+        manager = self._manager()
+        if manager is None:
+            return {"idle": 0, "memory": 0, "files": 0}
+        now = time.monotonic()
+        sessions = self._sessions(manager, now)
+        evicted = {"idle": 0, "memory": 0, "files": 0}
+
+        idle = [s for s in sessions if not s["connected"]]
+        if self.idle_ttl > 0:
+            for session in [s for s in idle if s["idle"] >= self.idle_ttl]:
+                if self._evict(manager, session["token"], "idle"):
+                    evicted["idle"] += 1
+                    sessions.remove(session)
+                    idle.remove(session)
+            if hasattr(manager, "states_directory"):
+                evicted["files"] = self._purge_files(manager)
+
+        total = sum(s["bytes"] for s in sessions)
+        if self.memory_budget > 0 and total > self.memory_budget:
+            # Primero las que más ocupan y más tiempo llevan sin uso
+            for session in sorted(idle, key=lambda s: s["bytes"] * max(s["idle"], 1.0), reverse=True):
+                if total <= self.memory_budget:
+                    break
+                if self._evict(manager, session["token"], "memory"):
+                    evicted["memory"] += 1
+                    total -= session["bytes"]
+            if total > self.memory_budget:
+                logger.warning("Las sesiones conectadas ocupan %d bytes, por encima del límite de %d",
+                               total, self.memory_budget)
+
+        # Actividad de tokens que ya no tienen estado (p. ej. eventos rechazados)
+        for token in set(self._last_seen) - set(manager.states):
+            self._last_seen.pop(token, None)
+            self._sizes.pop(token, None)
+
+        if evicted["idle"] or evicted["memory"]:
+            logger.info("Sesiones liberadas: %d inactivas, %d por memoria (%d en memoria, %d bytes)",
+                        evicted["idle"], evicted["memory"], len(manager.states), total)
+        return evicted
+
+    async def run(self):
+        """Tarea del ciclo de vida de la aplicación: ejecuta sweep() periódicamente."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error("Error al liberar sesiones: %s", e)
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        """Resumen para la vista de administración: totales y las sesiones más grandes."""
+        manager = self._manager()
+        summary = {
+            "idle_ttl": self.idle_ttl,
+            "memory_budget": self.memory_budget,
+            "evicted": {labels["reason"]: value for _, labels, value in SESSIONS_EVICTED.samples()},
+        }
+        if manager is None:
+            summary["mode"] = "redis" if self.app is not None and self.app._state_manager is not None else "none"
+            return summary
+        now = time.monotonic()
+        sessions = sorted(self._sessions(manager, now), key=lambda s: s["bytes"], reverse=True)
+        summary.update({
+            "mode": "disk" if hasattr(manager, "token_path") else "memory",
+            "sessions": len(sessions),
+            "connected": sum(1 for s in sessions if s["connected"]),
+            "total_bytes": sum(s["bytes"] for s in sessions),
+            "largest": [
+                {
+                    # Solo un prefijo: el token completo permite suplantar la sesión
+                    "session": s["token"][:8],
+                    "bytes": s["bytes"],
+                    "idle_seconds": round(s["idle"], 1),
+                    "connected": s["connected"],
+                    "vars": dict(sorted(s["breakdown"].items(), key=lambda item: item[1], reverse=True)[:5]),
+                }
+                for s in sessions[:limit]
+            ],
+        })
+        return summary
+
+    def collector(self):
+        """Colector de /metrics con el número de sesiones en memoria y su tamaño estimado."""
+        manager = self._manager()
+        if manager is None:
+            return
+        sizes = [cached[1] for token, cached in self._sizes.items() if token in manager.states]
+        yield ("unposer_sessions_in_memory", "gauge", "Sesiones con estado en la memoria del backend.",
+               [({}, len(manager.states))])
+        yield ("unposer_session_state_bytes", "gauge",
+               "Tamaño estimado del estado de las sesiones medidas en el último barrido.", [({}, sum(sizes))])
+
+
+reaper = SessionReaper()
+
+
+def register_session_reaper(app):
+    """Activa el recolector de sesiones de la aplicación y sus métricas."""
+    reaper.app = app
+    app.register_lifespan_task(reaper.run)
+    REGISTRY.register_collector(reaper.collector)
@@ -0,0 +1,81 @@
+"""
+Módulo con la caché compartida entre los procesos del backend (Redis).
+
+Con REDIS_URL definido el estado de las sesiones se guarda en Redis (lo gestiona
+Reflex) y este módulo reutiliza la misma instancia para compartir entre workers
+las plantillas generadas y las respuestas de GitHub. Sin REDIS_URL las funciones
+no hacen nada y cada proceso usa solo sus cachés locales.
+
+Un fallo de Redis nunca interrumpe una conversión: se registra y la caché
+compartida se desactiva durante unos segundos.
+"""
+import json
+import threading
+import time
+from typing import Any, Optional
+
+from unposer.utils.config import REDIS_URL
+from unposer.utils.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+KEY_PREFIX = "unposer:"
+# Segundos sin usar Redis tras un error
+RETRY_AFTER = 30
+
+_client = None
+_client_lock = threading.Lock()
+_retry_at = 0.0
+
+
+def shared_cache_enabled() -> bool:
+    return bool(REDIS_URL)
+
+
+def _get_client():
+    """Cliente de Redis (síncrono, seguro entre hilos) o None si no está disponible."""
+    global _client
+    if not REDIS_URL or time.monotonic() < _retry_at:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+
+                _client = redis.Redis.from_url(REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _client
+
+
+def _disable(error: Exception):
+    global _retry_at
+    _retry_at = time.monotonic() + RETRY_AFTER
+    logger.warning("Caché compartida no disponible durante %s s: %s", RETRY_AFTER, error)
+
+
+def shared_get(namespace: str, key: str) -> Optional[Any]:
+    """Devuelve el valor guardado (deserializado de JSON) o None."""
+    client = _get_client()
+    if client is None:
+        return None
+    try:
+        raw = client.get(f"{KEY_PREFIX}{namespace}:{key}")
+    except Exception as e:
+        _disable(e)
+        return None
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def shared_set(namespace: str, key: str, value: Any, ttl: int):
+    """Guarda un valor serializable en JSON con caducidad en segundos."""
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        client.set(f"{KEY_PREFIX}{namespace}:{key}", json.dumps(value, ensure_ascii=False), ex=ttl)
+    except Exception as e:
+        _disable(e)
@@ -0,0 +1,102 @@
+"""
+Módulo con la escritura de plantillas en disco.
+
+Cada fichero se escribe de forma atómica (fichero temporal en la misma carpeta,
+fsync y renombrado), de modo que dockerMan nunca lee una plantilla a medias, y no
+se reescribe si el contenido no cambia (se compara el hash con el fichero
+existente). La escritura en lote renombra todos los ficheros y sincroniza la
+carpeta una sola vez. Las variantes asíncronas ejecutan la escritura en un hilo
+para no bloquear el bucle de eventos.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import Dict
+
+# Permisos de las plantillas nuevas (las existentes conservan los suyos)
+DEFAULT_MODE = 0o644
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_digest(path: str) -> str:
+    """Hash del contenido de un fichero o cadena vacía si no existe."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    except FileNotFoundError:
+        return ""
+
+
+def _fsync_dir(directory: str):
+    """Sincroniza la carpeta para que los renombrados sobrevivan a un corte."""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_temp(path: str, data: bytes) -> str:
+    """Escribe los datos en un temporal junto a `path` (con fsync) y devuelve su ruta."""
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = DEFAULT_MODE
+        os.chmod(tmp_path, mode)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path
+
+
+def write_files(directory: str, files: Dict[str, str]) -> Dict[str, bool]:
+    """
+    Escribe varios ficheros de texto en una carpeta de forma atómica.
+
+    Args:
+        directory: Carpeta de destino (se crea si no existe).
+        files: Nombre de fichero -> contenido.
+
+    Returns:
+        Nombre de fichero -> True si se escribió o False si ya tenía ese contenido.
+    """
+    os.makedirs(directory, exist_ok=True)
+    written = {}
+    for filename, content in files.items():
+        path = os.path.join(directory, filename)
+        data = content.encode("utf-8")
+        if _file_digest(path) == _digest(data):
+            written[filename] = False
+            continue
+        os.replace(_write_temp(path, data), path)
+        written[filename] = True
+    if any(written.values()):
+        _fsync_dir(directory)
+    return written
+
+
+def write_file(path: str, content: str) -> bool:
+    """Escribe un fichero de texto de forma atómica; devuelve False si no cambiaba."""
+    directory, filename = os.path.split(os.path.abspath(path))
+    return write_files(directory, {filename: content})[filename]
+
+
+async def save_file(path: str, content: str) -> bool:
+    """write_file fuera del bucle de eventos."""
+    return await asyncio.to_thread(write_file, path, content)
+
+
+async def save_files(directory: str, files: Dict[str, str]) -> Dict[str, bool]:
+    """write_files fuera del bucle de eventos."""
+    return await asyncio.to_thread(write_files, directory, files)
@@ -0,0 +1,86 @@
+"""
+Módulo para la sincronización incremental de los editores (Docker Compose y plantilla).
+
+El navegador no envía el documento completo en cada pulsación: envía un parche
+con el rango modificado y el texto de reemplazo, calculado sobre la última versión
+confirmada por el servidor. Si las versiones no coinciden, el servidor pide una
+resincronización completa.
+"""
+from typing import Any, Dict
+
+import reflex as rx
+from reflex.vars.function import FunctionStringVar
+
+from unposer.utils.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class SyncConflict(Exception):
+    """El parche no se puede aplicar sobre la versión actual del documento."""
+
+
+def apply_patch(document: str, version: int, patch: Dict[str, Any]) -> str:
+    """
+    Aplica un parche del editor sobre el documento del servidor.
+
+    Args:
+        document: Texto actual del documento en el servidor.
+        version: Versión actual del documento en el servidor.
+        patch: Parche enviado por el navegador con las claves
+            seq, base, full, start, end, text y length.
+
+    Returns:
+        El nuevo texto del documento.
+
+    Raises:
+        SyncConflict: Si el parche se calculó sobre otra versión o no es coherente.
+    """
+    text = str(patch.get("text") or "")
+
+    # Un parche completo reemplaza el documento sin comprobar la versión (resincronización)
+    if patch.get("full"):
+        return text
+
+    if patch.get("base") != version:
+        raise SyncConflict(f"Versión base {patch.get('base')} distinta de la del servidor {version}")
+
+    try:
+        start = int(patch["start"])
+        end = int(patch["end"])
+    except (KeyError, TypeError, ValueError):
+        raise SyncConflict("El parche no contiene un rango válido")
+
+    if not 0 <= start <= end <= len(document):
+        raise SyncConflict(f"Rango {start}-{end} fuera del documento ({len(document)} caracteres)")
+
+    new_document = f"{document[:start]}{text}{document[end:]}"
+
+    # La longitud final la calcula el navegador y detecta cualquier desajuste de la base
+    if "length" in patch and patch["length"] != len(new_document):
+        raise SyncConflict(f"Longitud esperada {patch['length']}, obtenida {len(new_document)}")
+
+    return new_document
+
+
+def sync_patch(editor_id: str, value: rx.Var, version: rx.Var, ack: rx.Var, full_text: rx.Var, full_version: rx.Var) -> rx.Var:
+    """
+    Construye la expresión del navegador que calcula el parche de un editor.
+
+    Args:
+        editor_id: Identificador del editor en el script de sincronización.
+        value: Valor actual del editor.
+        version: Versión del documento confirmada por el servidor.
+        ack: Último parche del navegador confirmado por el servidor.
+        full_text: Último texto completo enviado por el servidor al editor.
+        full_version: Versión en la que se envió ese texto completo.
+    """
+    return FunctionStringVar.create("window.unposerSync.diff").call(
+        editor_id, value, version, ack, full_text, full_version
+    )
+
+
+def request_full_sync(editor_id: str, callback) -> rx.event.EventSpec:
+    """Pide al navegador el contenido completo del editor para resincronizar."""
+    logger.debug("Solicitando resincronización completa del editor %s", editor_id)
+    return rx.call_script(f"window.unposerSync.full('{editor_id}')", callback=callback)
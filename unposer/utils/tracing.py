@@ -0,0 +1,92 @@
+"""
+Módulo con las trazas por evento y la medición de tramos (spans).
+
+Los tramos miden una etapa concreta de una traza: inicio, fin, duración y número
+de peticiones HTTP salientes realizadas dentro de ella. Este módulo no depende de
+Reflex para poder usarse también en los procesos del ejecutor del conversor.
+"""
+import contextlib
+import contextvars
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from unposer.utils.config import SLOW_SPAN_MS
+from unposer.utils.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+current_span_var: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """Tramo medido de una traza."""
+
+    __slots__ = ("name", "attrs", "parent", "start", "end", "http_calls")
+
+    def __init__(self, name: str, parent: "Span" = None, attrs: Dict[str, Any] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.parent = parent
+        self.start = time.time()
+        self.end = None
+        self.http_calls = 0
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.time()) - self.start) * 1000
+
+    def finish(self) -> bool:
+        """Cierra el tramo; devuelve False si ya estaba cerrado."""
+        if self.end is not None:
+            return False
+        self.end = time.time()
+        return True
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": round(self.duration_ms, 2),
+            "http_calls": self.http_calls,
+            **self.attrs,
+        }
+
+
+def log_span(span: Span):
+    """Registra un tramo cerrado; los lentos se registran como aviso."""
+    slow = span.duration_ms >= SLOW_SPAN_MS
+    if not slow and not logger.isEnabledFor(logging.DEBUG):
+        return
+    message = f"{span.name} terminado en {span.duration_ms:.1f} ms ({span.http_calls} peticiones HTTP)"
+    if slow:
+        logger.warning(f"Tramo lento: {message}", extra={"span": span.as_dict()})
+    else:
+        logger.debug(message, extra={"span": span.as_dict()})
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs):
+    """Mide un tramo dentro de la traza actual (anidable, válido en código síncrono y asíncrono)."""
+    current = Span(name, current_span_var.get(), attrs)
+    token = current_span_var.set(current)
+    try:
+        yield current
+    finally:
+        current.finish()
+        try:
+            current_span_var.reset(token)
+        except ValueError:
+            # Cerrado desde otro contexto (por ejemplo, un generador finalizado en otra tarea)
+            current_span_var.set(current.parent)
+        log_span(current)
+
+
+def count_http_call():
+    """Suma una petición HTTP saliente al tramo actual y a sus ancestros."""
+    current = current_span_var.get()
+    while current is not None:
+        current.http_calls += 1
+        current = current.parent
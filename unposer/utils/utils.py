@@ -1,10 +1,13 @@
 import contextvars
+import json
 import logging
-import random
+import re
+import secrets
+from datetime import datetime
 
 from colorama import Fore, Style, init
 
-from unposer.utils.config import DEBUG
+from unposer.utils.config import DEBUG, LOG_FORMAT
 
 # Inicializar colorama
 # Asegura que los códigos ANSI no se eliminen en macOS.
@@ -18,29 +21,64 @@ COLORS = {
     logging.CRITICAL: Fore.RED + Style.BRIGHT,
 }
 
+# Nivel de depuración fijado al arrancar: las rutas calientes comprueban esta constante
+# antes de llamar a logger.debug, de modo que sin DEBUG no se evalúa ni se formatea nada
+DEBUG_ENABLED = DEBUG > 0
+
+# Identificadores de la traza (uno por evento de Reflex) y de la sesión que la origina
 trace_id_var = contextvars.ContextVar("trace_id")
+session_id_var = contextvars.ContextVar("session_id")
 class TraceIdFilter(logging.Filter):
     def filter(self, record):
         record.trace_id = trace_id_var.get("----")
+        record.session_id = session_id_var.get("----")
         return True
 class ColoredFormatter(logging.Formatter):
-    def format(self, record):
-        # Aplicar color según el nivel del log
+    def formatMessage(self, record):
+        # Aplicar color según el nivel del log sin modificar el registro original
         color = COLORS.get(record.levelno, Fore.WHITE)
-        record.msg = f"{color}{record.msg}{Style.RESET_ALL}"
-        return super().format(record)
+        message = record.message
+        record.message = f"{color}{message}{Style.RESET_ALL}"
+        try:
+            return super().formatMessage(record)
+        finally:
+            record.message = message
+class JsonFormatter(logging.Formatter):
+    """Formato JSON (una línea por registro) para los agregadores de logs."""
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "session": getattr(record, "session_id", "----"),
+            "trace_id": getattr(record, "trace_id", "----"),
+            "message": record.getMessage(),
+        }
+        span = getattr(record, "span", None)
+        if span:
+            entry["span"] = span
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
 
 def setup_logger(name: str):
     logger = logging.getLogger(name)
 
-    if DEBUG == 0:
+    if not DEBUG_ENABLED:
         logger.setLevel(logging.INFO)
     else:  # DEBUG 1 o 2
         logger.setLevel(logging.DEBUG)
 
     if not logger.hasHandlers():
         handler = logging.StreamHandler()
-        formatter = ColoredFormatter("[%(asctime)s] [%(trace_id)s] [%(levelname)s] %(message)s", datefmt="%d-%m-%Y %H:%M:%S")
+        if LOG_FORMAT == "json":
+            formatter = JsonFormatter()
+        else:
+            formatter = ColoredFormatter(
+                "[%(asctime)s] [%(session_id)s/%(trace_id)s] [%(levelname)s] %(message)s",
+                datefmt="%d-%m-%Y %H:%M:%S",
+                defaults={"session_id": "----", "trace_id": "----"},
+            )
         handler.setFormatter(formatter)
         handler.addFilter(TraceIdFilter())
         logger.addHandler(handler)
@@ -61,6 +99,19 @@ def setup_logger(name: str):
 
     return logger
 
-def generate_trace_id():
-    trace_id_var.set(random.randint(1000, 9999))
+def generate_trace_id(session_id: str = None) -> str:
+    """Genera un identificador de traza para el contexto actual (y opcionalmente fija la sesión)."""
+    trace_id = secrets.token_hex(4)
+    trace_id_var.set(trace_id)
+    if session_id is not None:
+        session_id_var.set(session_id)
+    return trace_id
+
 
+def template_filename(template: str) -> str:
+    """Nombre de fichero de una plantilla a partir de su etiqueta <Name> (my-<nombre>.xml)."""
+    name_match = re.search(r'<Name>([^<]+)</Name>', template or "")
+    if not name_match:
+        return "unraid-template.xml"
+    clean_name = re.sub(r'[^\w\-\.]', '_', name_match.group(1))
+    return f"my-{clean_name}.xml"
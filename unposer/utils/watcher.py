@@ -0,0 +1,346 @@
+"""
+Módulo con el modo carpeta vigilada: convierte los Docker Compose de un directorio
+en plantillas de Unraid y las mantiene al día.
+
+Con WATCH_DIR definido el backend revisa cada WATCH_INTERVAL segundos los ficheros
+.yml/.yaml del directorio (y sus subdirectorios) y escribe sus plantillas en
+TEMPLATES_DIR, la misma carpeta en la que guarda la interfaz. Un manifiesto en esa
+carpeta guarda el hash de cada compose (ya resuelto con sus include, extends,
+env_file, .env y override) y las plantillas que generó: solo se reconvierten los
+ficheros cuyo contenido o el de sus ficheros relacionados cambia (también si
+aparece uno que no existía, como un .env o un override nuevos), o todos si
+cambian los mapeos del conversor. Los ficheros de override no se convierten
+solos. Un fichero se procesa cuando lleva WATCH_DEBOUNCE segundos sin cambios
+(las ráfagas de un checkout se agrupan) y como máximo se convierten
+WATCH_CONCURRENCY ficheros a la vez. Al borrar un compose se borran sus plantillas.
+
+También se puede ejecutar una sola pasada, por ejemplo en CI:
+
+    python -m unposer.utils.watcher /ruta/composes [--output plantillas] [--once]
+"""
+import argparse
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from unposer.utils.cache import generate_template_cached
+from unposer.utils.config import TEMPLATES_DIR, WATCH_CONCURRENCY, WATCH_DEBOUNCE, WATCH_DIR, WATCH_INTERVAL
+from unposer.utils.converter import UnraidTemplateConverter
+from unposer.utils.executor import ConverterTimeout, resolve_compose_file_job, run_converter, split_services_job
+from unposer.utils.storage import save_file, save_files
+from unposer.utils.utils import generate_trace_id, setup_logger, template_filename
+
+logger = setup_logger(__name__)
+
+MANIFEST_NAME = ".unposer-manifest.json"
+LOCK_NAME = ".unposer-watch.lock"
+COMPOSE_EXTENSIONS = (".yml", ".yaml")
+OVERRIDE_SUFFIXES = (".override.yml", ".override.yaml")
+
+
+class FolderWatcher:
+    """Mantiene las plantillas de TEMPLATES_DIR sincronizadas con los compose de un directorio."""
+
+    def __init__(self, watch_dir: str, output_dir: str = TEMPLATES_DIR, interval: float = WATCH_INTERVAL,
+                 debounce: float = WATCH_DEBOUNCE, concurrency: int = WATCH_CONCURRENCY,
+                 mapping_version: str = None):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.interval = interval
+        self.debounce = debounce
+        self.concurrency = max(concurrency, 1)
+        self.mapping_version = mapping_version or UnraidTemplateConverter().mapping_version
+        self.manifest_path = os.path.join(self.output_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+        if self.manifest.get("mapping_version") != self.mapping_version:
+            # Con otros mapeos hay que reconvertir todo: se olvidan los hashes (no las plantillas generadas)
+            for entry in self.manifest["files"].values():
+                entry.pop("hash", None)
+        # Ruta relativa -> (mtime_ns, tamaño) de la última revisión, para detectar ráfagas
+        self._observed: Dict[str, Tuple[int, int]] = {}
+        # Ruta relativa -> instante (monotonic) del último cambio visto sin procesar
+        self._pending: Dict[str, float] = {}
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if isinstance(manifest, dict) and isinstance(manifest.get("files"), dict):
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"mapping_version": "", "files": {}}
+
+    async def _save_manifest(self):
+        """Guarda el manifiesto de forma atómica (nunca queda a medias)."""
+        self.manifest["mapping_version"] = self.mapping_version
+        await save_file(self.manifest_path, json.dumps(self.manifest, indent=1, ensure_ascii=False, sort_keys=True))
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """Ficheros compose del directorio vigilado con su (mtime_ns, tamaño)."""
+        found = {}
+        for root, dirs, files in os.walk(self.watch_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if name.startswith(".") or not name.endswith(COMPOSE_EXTENSIONS) or name.endswith(OVERRIDE_SUFFIXES):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found[os.path.relpath(path, self.watch_dir)] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def poll(self) -> List[str]:
+        """
+        Revisa el directorio y devuelve los ficheros listos para procesar: los que
+        cambiaron (o desaparecieron) y llevan al menos `debounce` segundos estables.
+        """
+        now = time.monotonic()
+        current = self.scan()
+        files = self.manifest["files"]
+
+        for rel, stat in current.items():
+            entry = files.get(rel)
+            if entry is not None and "hash" in entry and (entry.get("mtime_ns"), entry.get("size")) == stat \
+                    and self._deps_unchanged(entry):
+                continue
+            # Cambio nuevo o que sigue en curso: se reinicia la espera
+            if rel not in self._pending or self._observed.get(rel) != stat:
+                self._pending[rel] = now
+        for rel in files:
+            if rel not in current and rel not in self._pending:
+                self._pending[rel] = now
+        self._observed = current
+
+        ready = [rel for rel, changed_at in self._pending.items() if now - changed_at >= self.debounce]
+        for rel in ready:
+            del self._pending[rel]
+        return sorted(ready)
+
+    def _dep_stats(self, used: List[str]) -> Dict[str, List[int]]:
+        """(mtime_ns, tamaño) de los ficheros relacionados de un compose (rutas relativas al vigilado)."""
+        deps = {}
+        for dep in used:
+            dep_rel = os.path.normpath(dep)
+            try:
+                stat = os.stat(os.path.join(self.watch_dir, dep_rel))
+            except OSError:
+                continue
+            deps[dep_rel] = [stat.st_mtime_ns, stat.st_size]
+        return deps
+
+    def _absent(self, missing: List[str]) -> List[str]:
+        """Ficheros relacionados que el compose buscó y no existen (rutas relativas al vigilado)."""
+        absent = []
+        for dep in missing:
+            dep_rel = os.path.normpath(dep)
+            if os.path.isabs(dep_rel) or dep_rel.split(os.sep)[0] == os.pardir:
+                continue
+            # Los que existen pero no se pudieron leer no cuentan: no cambiarán al aparecer
+            if not os.path.lexists(os.path.join(self.watch_dir, dep_rel)):
+                absent.append(dep_rel)
+        return absent
+
+    def _deps_unchanged(self, entry: Dict[str, Any]) -> bool:
+        """Comprueba que ninguno de los ficheros relacionados de un compose ha cambiado ni ha aparecido."""
+        for dep_rel, stat in entry.get("deps", {}).items():
+            try:
+                current = os.stat(os.path.join(self.watch_dir, dep_rel))
+            except OSError:
+                return False
+            if [current.st_mtime_ns, current.st_size] != stat:
+                return False
+        for dep_rel in entry.get("absent", []):
+            if os.path.lexists(os.path.join(self.watch_dir, dep_rel)):
+                return False
+        return True
+
+    def _owners(self, filename: str, exclude: str) -> List[str]:
+        return [rel for rel, entry in self.manifest["files"].items()
+                if rel != exclude and filename in entry.get("outputs", [])]
+
+    def _remove_outputs(self, rel: str, outputs: List[str]):
+        """Borra las plantillas que generó un compose y que ningún otro genera."""
+        for filename in outputs:
+            if self._owners(filename, rel):
+                continue
+            try:
+                os.remove(os.path.join(self.output_dir, filename))
+                logger.info("Plantilla eliminada: %s (%s)", filename, rel)
+            except FileNotFoundError:
+                pass
+
+    async def _convert(self, rel: str, compose_text: str) -> List[str]:
+        """Convierte todos los servicios de un compose y escribe sus plantillas."""
+        templates = {}
+        for service, service_text in await run_converter(split_services_job, compose_text):
+            template = await generate_template_cached(self.mapping_version, service_text)
+            if not template:
+                raise ValueError(f"No se pudo generar la plantilla del servicio '{service}'")
+            filename = template_filename(template)
+            owners = self._owners(filename, rel)
+            if owners:
+                logger.warning("La plantilla %s también la genera %s; se sobrescribe con %s", filename, owners[0], rel)
+            templates[filename] = template
+        # Todas las plantillas del compose en un lote (un único fsync de la carpeta)
+        await save_files(self.output_dir, templates)
+        return list(templates)
+
+    async def process_file(self, rel: str):
+        """Reconvierte un compose si su contenido o los mapeos cambiaron; si ya no existe, borra sus plantillas."""
+        files = self.manifest["files"]
+        entry = files.get(rel)
+        path = os.path.join(self.watch_dir, rel)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            stat = os.stat(path)
+        except FileNotFoundError:
+            if entry is not None:
+                self._remove_outputs(rel, entry.get("outputs", []))
+                del files[rel]
+            return
+
+        generate_trace_id("watch")
+        # El hash es el del compose resuelto: cambia también si cambian sus ficheros relacionados
+        compose_text, resolve_error = None, None
+        try:
+            compose_text, used, missing, warnings = await run_converter(
+                resolve_compose_file_job, self.watch_dir, rel.replace(os.sep, "/"))
+            for warning in warnings:
+                logger.warning("%s: %s", rel, warning)
+            digest = hashlib.sha256(compose_text.encode("utf-8")).hexdigest()
+            deps = self._dep_stats(used)
+            absent = self._absent(missing)
+        except (ValueError, yaml.YAMLError, ConverterTimeout) as e:
+            resolve_error = str(e)
+            digest = hashlib.sha256(content).hexdigest()
+            deps, absent = {}, []
+        except Exception as e:
+            logger.warning("Conversión de %s aplazada: %s", rel, e)
+            self._pending[rel] = time.monotonic()
+            return
+
+        new_entry = {"hash": digest, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "outputs": []}
+        if deps:
+            new_entry["deps"] = deps
+        if absent:
+            new_entry["absent"] = absent
+        if entry is not None and entry.get("hash") == digest:
+            # Mismo contenido (p. ej. un checkout que solo cambia la fecha)
+            new_entry.update({"outputs": entry.get("outputs", []), "error": entry.get("error")})
+            files[rel] = {key: value for key, value in new_entry.items() if value is not None}
+            return
+
+        start = time.perf_counter()
+        try:
+            if resolve_error is not None:
+                raise ValueError(resolve_error)
+            new_entry["outputs"] = await self._convert(rel, compose_text)
+            logger.info("Plantillas de %s: %s (%.0f ms)", rel, ", ".join(new_entry["outputs"]),
+                        (time.perf_counter() - start) * 1000)
+        except (ValueError, yaml.YAMLError, ConverterTimeout) as e:
+            # Error del propio fichero: se recuerda el hash para no reintentar hasta que cambie
+            new_entry["error"] = str(e)
+            logger.warning("No se pudo convertir %s: %s", rel, e)
+        except Exception as e:
+            # Error pasajero (conversor ocupado...): se reintenta en la siguiente revisión
+            logger.warning("Conversión de %s aplazada: %s", rel, e)
+            self._pending[rel] = time.monotonic()
+            return
+        if entry is not None:
+            self._remove_outputs(rel, [name for name in entry.get("outputs", []) if name not in new_entry["outputs"]])
+        files[rel] = new_entry
+
+    async def process(self, rels: List[str]) -> int:
+        """Procesa varios ficheros con como máximo `concurrency` conversiones a la vez."""
+        if not rels:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(rel: str):
+            async with semaphore:
+                await self.process_file(rel)
+
+        await asyncio.gather(*(bounded(rel) for rel in rels))
+        await self._save_manifest()
+        return len(rels)
+
+    async def run_once(self) -> int:
+        """Una pasada completa sin esperas (modo --once)."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        debounce, self.debounce = self.debounce, 0
+        try:
+            return await self.process(self.poll())
+        finally:
+            self.debounce = debounce
+
+    async def run(self):
+        """Vigila el directorio indefinidamente."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        logger.info("Vigilando %s (plantillas en %s)", self.watch_dir, self.output_dir)
+        while True:
+            try:
+                await self.process(self.poll())
+            except Exception as e:
+                logger.error("Error en la carpeta vigilada: %s", e)
+            await asyncio.sleep(self.interval)
+
+
+def _acquire_lock(output_dir: str) -> Optional[int]:
+    """Bloqueo de un único vigilante por carpeta (con varios workers solo vigila uno)."""
+    os.makedirs(output_dir, exist_ok=True)
+    fd = os.open(os.path.join(output_dir, LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+async def watch_folder():
+    """Tarea del ciclo de vida de la aplicación para WATCH_DIR."""
+    lock = await asyncio.to_thread(_acquire_lock, TEMPLATES_DIR)
+    if lock is None:
+        logger.info("Otro proceso ya vigila %s", WATCH_DIR)
+        return
+    try:
+        await FolderWatcher(WATCH_DIR).run()
+    finally:
+        os.close(lock)
+
+
+def register_folder_watcher(app):
+    """Activa la carpeta vigilada si se ha definido WATCH_DIR."""
+    if WATCH_DIR:
+        app.register_lifespan_task(watch_folder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("watch_dir", nargs="?", default=WATCH_DIR, help="Directorio con los Docker Compose")
+    parser.add_argument("--output", default=TEMPLATES_DIR, help="Directorio de las plantillas")
+    parser.add_argument("--once", action="store_true", help="Una sola pasada y terminar")
+    args = parser.parse_args()
+    if not args.watch_dir:
+        parser.error("Indica el directorio a vigilar (o define WATCH_DIR)")
+
+    watcher = FolderWatcher(args.watch_dir, args.output)
+    if args.once:
+        processed = asyncio.run(watcher.run_once())
+        print(f"{processed} ficheros procesados")
+    else:
+        asyncio.run(watcher.run())
+
+
+if __name__ == "__main__":
+    main()
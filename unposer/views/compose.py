@@ -1,6 +1,8 @@
 import reflex as rx
 
 from unposer.state.MainState import MainState
+from unposer.utils.config import SYNC_DEBOUNCE_MS
+from unposer.utils.sync import sync_patch
 
 
 def compose_tab() -> rx.Component:
@@ -23,8 +25,19 @@ def compose_tab() -> rx.Component:
                     height="30rem",
                     width="100%",
                     radius="large",
-                    on_change=MainState.set_docker_compose,
-                    value=MainState.docker_compose_text,
+                    # El editor solo se recarga cuando el servidor reemplaza el documento
+                    key=MainState.docker_compose_base,
+                    default_value=MainState.docker_compose_text,
+                    on_change=lambda value: MainState.patch_docker_compose(
+                        sync_patch(
+                            "compose",
+                            value,
+                            MainState.docker_compose_version,
+                            MainState.docker_compose_ack,
+                            MainState.docker_compose_text,
+                            MainState.docker_compose_base,
+                        )
+                    ).debounce(SYNC_DEBOUNCE_MS),
                     font_family="monospace",
                 ),
                 width="100%",
@@ -96,11 +109,25 @@ def compose_tab() -> rx.Component:
                                     "Cargar Compose"
                                 ),
                                 on_click=MainState.load_docker_compose_from_github,
-                                is_loading=MainState.is_loading_compose,
-                                disabled=MainState.is_loading_compose
+                            ),
+                            rx.cond(
+                                MainState.is_loading_compose,
+                                rx.button(
+                                    "Cancelar",
+                                    on_click=MainState.cancel_github_import,
+                                    color_scheme="red",
+                                    variant="soft",
+                                ),
                             ),
                             width="100%",
                         ),
+                        rx.cond(
+                            MainState.is_loading_compose,
+                            rx.text(
+                                f"{MainState.import_stage} · {MainState.import_requests} peticiones · {MainState.import_elapsed} s",
+                                size="1",
+                            ),
+                        ),
                         rx.blockquote(
                             "Si cargas el Compose desde un repositorio este se utilizará para más funciones.",
                             size="1",
@@ -150,6 +177,8 @@ def compose_tab() -> rx.Component:
                 rx.button(
                     "Siguiente",
                     on_click=lambda: MainState.validate_tab_change("options"),
+                    loading=MainState.is_converting,
+                    disabled=MainState.is_converting,
                     size="3",
                 ),
                 spacing="4",
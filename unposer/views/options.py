@@ -195,6 +195,30 @@ def options_tab() -> rx.Component:
                 mb=6,
             ),
             
+            # Vista previa en vivo
+            rx.box(
+                rx.hstack(
+                    rx.heading("Vista previa en vivo", size="4", mb=2),
+                    MainState.create_info_hover("Muestra la plantilla mientras editas las opciones. Solo se regeneran las partes que cambian."),
+                    rx.switch(
+                        checked=MainState.live_preview,
+                        on_change=MainState.set_live_preview,
+                    ),
+                    spacing="2",
+                    align="center",
+                ),
+                rx.cond(
+                    MainState.live_preview,
+                    rx.code_block(
+                        MainState.preview_xml,
+                        language="markup",
+                        width="100%",
+                    ),
+                ),
+                width="100%",
+                mb=6,
+            ),
+
             rx.hstack(
                 rx.button(
                     "Anterior",
@@ -205,6 +229,8 @@ def options_tab() -> rx.Component:
                 rx.button(
                     "Siguiente",
                     on_click=lambda: MainState.validate_tab_change("template"),
+                    loading=MainState.is_converting,
+                    disabled=MainState.is_converting,
                     size="3",
                 ),
                 spacing="4",
@@ -2,6 +2,8 @@ import reflex as rx
 from reflex_monaco import monaco
 
 from unposer.state.MainState import MainState
+from unposer.utils.config import SYNC_DEBOUNCE_MS
+from unposer.utils.sync import sync_patch
 
 def template_tab() -> rx.Component:
     # Pestaña 3: Plantilla Unraid
@@ -12,8 +14,19 @@ def template_tab() -> rx.Component:
             rx.box(
                 monaco(
                     default_language='xml',
+                    # El editor solo se recarga cuando el servidor regenera la plantilla
+                    key=MainState.unraid_template_base,
                     default_value=MainState.unraid_template,
-                    on_change=MainState.update_unraid_template,
+                    on_change=lambda value: MainState.patch_unraid_template(
+                        sync_patch(
+                            "template",
+                            value,
+                            MainState.unraid_template_version,
+                            MainState.unraid_template_ack,
+                            MainState.unraid_template,
+                            MainState.unraid_template_base,
+                        )
+                    ).debounce(SYNC_DEBOUNCE_MS),
                     height='500px',
                     width='100%',
                 ),
@@ -39,13 +52,75 @@ def template_tab() -> rx.Component:
                     ),
                     rx.menu.content(
                         rx.menu.item("En el equipo local", on_click=lambda: MainState.download_template_local()),
+                        rx.menu.item("Todos los servicios en un ZIP", on_click=lambda: MainState.download_template_bundle()),
                         rx.menu.separator(),
                         rx.menu.item("En la carpeta de plantillas de Unraid", disabled=False, on_click=lambda: MainState.save_template_unraid()),
+                        rx.cond(
+                            MainState.library_conflicts.length() > 0,
+                            rx.menu.item("Sobrescribir en la carpeta de plantillas", color_scheme="red", on_click=lambda: MainState.save_template_unraid(True)),
+                        ),
                     ),
                 ),
                 spacing="4",
                 mt=4,
             ),
+            # Conflictos con las plantillas ya guardadas en la carpeta de plantillas
+            rx.cond(
+                MainState.library_conflicts.length() > 0,
+                rx.callout.root(
+                    rx.callout.icon(rx.icon("triangle-alert")),
+                    rx.vstack(
+                        rx.foreach(MainState.library_conflicts, lambda conflict: rx.callout.text(conflict)),
+                        spacing="1",
+                    ),
+                    color_scheme="orange",
+                    width="100%",
+                ),
+            ),
+            # Biblioteca de plantillas
+            rx.vstack(
+                rx.hstack(
+                    rx.heading("Biblioteca de plantillas", size="4"),
+                    MainState.create_info_hover("Plantillas guardadas en la carpeta de plantillas de Unraid. Busca por nombre, repositorio o fichero."),
+                    spacing="1",
+                    align="center",
+                ),
+                rx.input(
+                    placeholder="Buscar plantillas...",
+                    default_value=MainState.library_query,
+                    on_change=lambda value: MainState.search_library(value).debounce(SYNC_DEBOUNCE_MS),
+                    on_focus=lambda: MainState.search_library(MainState.library_query),
+                    width="100%",
+                ),
+                rx.cond(
+                    MainState.library_results.length() > 0,
+                    rx.table.root(
+                        rx.table.header(
+                            rx.table.row(
+                                rx.table.column_header_cell("Nombre"),
+                                rx.table.column_header_cell("Repositorio"),
+                                rx.table.column_header_cell("Puertos"),
+                                rx.table.column_header_cell("Fichero"),
+                            ),
+                        ),
+                        rx.table.body(
+                            rx.foreach(
+                                MainState.library_results,
+                                lambda entry: rx.table.row(
+                                    rx.table.cell(entry["name"]),
+                                    rx.table.cell(entry["repository"]),
+                                    rx.table.cell(entry["ports"]),
+                                    rx.table.cell(entry["filename"]),
+                                ),
+                            ),
+                        ),
+                        size="1",
+                        width="100%",
+                    ),
+                ),
+                width="100%",
+                spacing="2",
+            ),
             align_items="center",
             spacing="5",
             py=4,